@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare CSV compression codecs: generation time, ingest time and bytes on disk."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from benchmark_ecommerce import run_measured
+from ecommerce_io import COMPRESSIONS, csv_name
+
+DEFAULT_SCALE_FACTORS = (1.0, 10.0)
+TABLES = ("customers", "products", "orders", "order_items", "payments")
+
+
+def run_codec(compression: str, scale_factor: float, work_dir: Path) -> Dict[str, object]:
+    dataset_dir = work_dir / "dataset"
+    db_path = work_dir / "ecommerce.db"
+    python = sys.executable
+
+    generate_seconds, generate_rss, _ = run_measured(
+        [python, "generate_ecommerce_dataset.py", "--output-dir", str(dataset_dir),
+         "--scale-factor", str(scale_factor), "--stream", "--compression", compression]
+    )
+    dataset_bytes = sum(
+        (dataset_dir / csv_name(table, compression)).stat().st_size for table in TABLES
+    )
+    ingest_seconds, ingest_rss, _ = run_measured(
+        [python, "ingest_ecommerce_sqlite.py", "--dataset-dir", str(dataset_dir),
+         "--database", str(db_path), "--bulk", "--quiet"]
+    )
+    return {
+        "compression": compression,
+        "scale_factor": scale_factor,
+        "dataset_bytes": dataset_bytes,
+        "generate_seconds": round(generate_seconds, 4),
+        "ingest_seconds": round(ingest_seconds, 4),
+        "generate_peak_rss_mb": generate_rss,
+        "ingest_peak_rss_mb": ingest_rss,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scale-factors",
+        type=float,
+        nargs="+",
+        default=list(DEFAULT_SCALE_FACTORS),
+        help="Scale factors to benchmark.",
+    )
+    parser.add_argument(
+        "--codecs",
+        nargs="+",
+        choices=COMPRESSIONS,
+        default=list(COMPRESSIONS),
+        help="Compression settings to compare; 'none' is the plain CSV baseline.",
+    )
+    parser.add_argument("--json", type=Path, default=None, help="Also write results to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    results: List[Dict[str, object]] = []
+    for scale_factor in args.scale_factors:
+        plain_bytes = None
+        for compression in args.codecs:
+            with tempfile.TemporaryDirectory() as work_dir:
+                result = run_codec(compression, scale_factor, Path(work_dir))
+            if compression == "none":
+                plain_bytes = result["dataset_bytes"]
+            if plain_bytes:
+                result["ratio"] = round(plain_bytes / result["dataset_bytes"], 2)
+            results.append(result)
+            ratio = f"{result['ratio']:.2f}x" if "ratio" in result else "-"
+            print(
+                f"sf={scale_factor:<8g} {compression:<5} {result['dataset_bytes'] / 1048576:>9.2f} MiB "
+                f"ratio={ratio:<7} generate={result['generate_seconds']:>8.3f}s "
+                f"ingest={result['ingest_seconds']:>8.3f}s"
+            )
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
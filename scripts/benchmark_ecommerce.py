@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark: generate, ingest and query the dataset at several sizes.
+
+The "build" phase times build_ecommerce_sqlite.py, which generates straight
+into SQLite, against the generate + ingest pair.
+
+Each phase runs as its own subprocess so wall time and peak RSS are measured
+per phase. Results are written as JSON; with --baseline the run fails when a
+tracked metric is worse than the stored run by more than --threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_SCALE_FACTORS = (1.0, 10.0)
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_QUERY_REPEATS = 3
+# Timings below this many seconds are too noisy to gate on.
+DEFAULT_MIN_SECONDS = 0.05
+TABLES = ("customers", "products", "orders", "order_items", "payments")
+TRACKED_METRICS = ("seconds", "peak_rss_mb", "db_bytes")
+INGEST_MODES = ("safe", "bulk")
+
+# Aggregates the dashboards run against the fact tables; "{subtotal}" and
+# "{total_amount}" follow the database's money mode.
+AGGREGATE_QUERIES = {
+    "revenue_by_city": """
+        SELECT city, COUNT(*), SUM({total_amount}) FROM orders GROUP BY city ORDER BY 3 DESC
+    """,
+    "daily_sales_by_category": """
+        SELECT substr(o.order_date, 1, 10), p.category, SUM(oi.quantity), SUM(oi.{subtotal})
+        FROM orders AS o
+        JOIN order_items AS oi ON oi.order_id = o.order_id
+        JOIN products AS p ON p.product_id = oi.product_id
+        GROUP BY 1, 2
+    """,
+    "payment_method_success": """
+        SELECT payment_method, COUNT(*), AVG(payment_status = 'success')
+        FROM payments GROUP BY payment_method
+    """,
+    "top_products": """
+        SELECT oi.product_id, SUM(oi.{subtotal}) AS revenue
+        FROM order_items AS oi GROUP BY oi.product_id ORDER BY revenue DESC LIMIT 10
+    """,
+}
+
+
+def run_measured(command: Sequence[str]) -> Tuple[float, Optional[float], str]:
+    """Run a command; return (wall seconds, its peak RSS in MiB or None, stdout).
+
+    The child is reaped with os.wait4 so the RSS belongs to this command alone,
+    not to the largest child seen so far.
+    """
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        started = time.perf_counter()
+        process = subprocess.Popen(list(command), cwd=SCRIPTS_DIR, stdout=stdout, stderr=stderr)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            returncode = os.waitstatus_to_exitcode(status)
+            process.returncode = returncode
+            rss = rss_mb(usage.ru_maxrss)
+        else:  # pragma: no cover - Windows
+            returncode = process.wait()
+            rss = None
+        elapsed = time.perf_counter() - started
+        stdout.seek(0)
+        stderr.seek(0)
+        if returncode != 0:
+            raise RuntimeError(
+                f"{' '.join(command)} failed with exit code {returncode}:\n{stderr.read().decode()}"
+            )
+        return elapsed, rss, stdout.read().decode()
+
+
+def rss_mb(max_rss: int) -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def count_csv_rows(dataset_dir: Path) -> int:
+    total = 0
+    for table in TABLES:
+        with (dataset_dir / f"{table}.csv").open("rb") as handle:
+            total += sum(1 for _ in handle) - 1
+    return total
+
+
+def phase_result(
+    scale_factor: float, phase: str, rows: int, seconds: float, rss: Optional[float], **extra: object
+) -> Dict[str, object]:
+    return {
+        "scale_factor": scale_factor,
+        "phase": phase,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "peak_rss_mb": rss,
+        **extra,
+    }
+
+
+def run_queries(db_path: Path, repeats: int) -> List[Dict[str, object]]:
+    """Time the canonical join (streamed) and each aggregate; median of repeats."""
+    from ecommerce_db import connect_read_only, schema_money_mode
+    from query_ecommerce_sqlite import stream_rows
+
+    connection = connect_read_only(db_path)
+    cents = schema_money_mode(connection) == "cents"
+    columns = {
+        "subtotal": "subtotal_cents" if cents else "subtotal",
+        "total_amount": "total_amount_cents" if cents else "total_amount",
+    }
+    workloads = {"canonical_join": lambda: sum(1 for _ in stream_rows(connection))}
+    for name, sql in AGGREGATE_QUERIES.items():
+        workloads[name] = lambda sql=sql: len(connection.execute(sql.format(**columns)).fetchall())
+
+    results = []
+    try:
+        for name, workload in workloads.items():
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                rows = workload()
+                timings.append(time.perf_counter() - started)
+            results.append({"query": name, "rows": rows, "seconds": statistics.median(timings)})
+    finally:
+        connection.close()
+    return results
+
+
+def benchmark_scale(
+    scale_factor: float, work_dir: Path, ingest_mode: str, repeats: int
+) -> List[Dict[str, object]]:
+    dataset_dir = work_dir / "dataset"
+    db_path = work_dir / "ecommerce.db"
+    python = sys.executable
+    results = []
+
+    seconds, rss, _ = run_measured(
+        [python, "generate_ecommerce_dataset.py", "--output-dir", str(dataset_dir),
+         "--scale-factor", str(scale_factor), "--stream"]
+    )
+    rows = count_csv_rows(dataset_dir)
+    results.append(
+        phase_result(scale_factor, "generate", rows, seconds, rss,
+                     dataset_bytes=sum(path.stat().st_size for path in dataset_dir.glob("*.csv")))
+    )
+
+    ingest_command = [python, "ingest_ecommerce_sqlite.py", "--dataset-dir", str(dataset_dir),
+                      "--database", str(db_path), "--quiet"]
+    if ingest_mode == "bulk":
+        ingest_command.append("--bulk")
+    seconds, rss, _ = run_measured(ingest_command)
+    results.append(
+        phase_result(scale_factor, "ingest", rows, seconds, rss,
+                     mode=ingest_mode, db_bytes=db_path.stat().st_size)
+    )
+
+    _, rss, stdout = run_measured(
+        [python, Path(__file__).name, "--query-worker", str(db_path), "--repeats", str(repeats)]
+    )
+    for query in json.loads(stdout):
+        results.append(
+            phase_result(scale_factor, f"query:{query['query']}", query["rows"],
+                         query["seconds"], rss)
+        )
+
+    built_path = work_dir / "built.db"
+    seconds, rss, _ = run_measured(
+        [python, "build_ecommerce_sqlite.py", "--database", str(built_path),
+         "--scale-factor", str(scale_factor), "--quiet"]
+    )
+    results.append(
+        phase_result(scale_factor, "build", rows, seconds, rss, db_bytes=built_path.stat().st_size)
+    )
+    return results
+
+
+def result_key(result: Dict[str, object]) -> Tuple[object, ...]:
+    return result["scale_factor"], result["phase"]
+
+
+def find_regressions(
+    results: Sequence[Dict[str, object]],
+    baseline: Sequence[Dict[str, object]],
+    threshold: float,
+    metrics: Sequence[str] = TRACKED_METRICS,
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> List[str]:
+    """Describe every tracked metric (lower is better) worse than baseline * (1 + threshold)."""
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        for metric in metrics:
+            before, after = old.get(metric), result.get(metric)
+            if before is None or after is None or before <= 0:
+                continue
+            if metric == "seconds" and max(before, after) < min_seconds:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append(
+                    f"sf={result['scale_factor']:g} {result['phase']} {metric}: "
+                    f"{before} -> {after} (+{(after / before - 1) * 100:.1f}%)"
+                )
+    return regressions
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scale-factors",
+        type=float,
+        nargs="+",
+        default=list(DEFAULT_SCALE_FACTORS),
+        help="Dataset sizes to benchmark.",
+    )
+    parser.add_argument(
+        "--ingest-mode",
+        choices=INGEST_MODES,
+        default="bulk",
+        help="Ingestion mode to benchmark.",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=DEFAULT_QUERY_REPEATS,
+        help="Runs per query; the median is reported.",
+    )
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this file.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Results file from an earlier run (--json) to compare against.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed fractional regression per tracked metric, e.g. 0.10 for 10%%.",
+    )
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        choices=TRACKED_METRICS,
+        default=list(TRACKED_METRICS),
+        help="Metrics checked against the baseline.",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=DEFAULT_MIN_SECONDS,
+        help="Ignore timing regressions when both runs are faster than this.",
+    )
+    parser.add_argument("--query-worker", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    if args.threshold < 0:
+        parser.error("--threshold cannot be negative")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.query_worker is not None:
+        print(json.dumps(run_queries(args.query_worker, args.repeats)))
+        return
+
+    results: List[Dict[str, object]] = []
+    for scale_factor in args.scale_factors:
+        with tempfile.TemporaryDirectory() as work_dir:
+            scale_results = benchmark_scale(scale_factor, Path(work_dir), args.ingest_mode, args.repeats)
+        for result in scale_results:
+            rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.1f} MiB"
+            print(
+                f"sf={scale_factor:<6g} {result['phase']:<30} rows={result['rows']:<10} "
+                f"{result['seconds']:>9.3f}s {result['rows_per_sec'] or 0:>12.1f} rows/s  rss={rss}"
+            )
+        results.extend(scale_results)
+
+    report = {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = find_regressions(
+            results, baseline, args.threshold, args.metrics, args.min_seconds
+        )
+        if regressions:
+            print("Regressions against baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"No tracked metric regressed more than {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
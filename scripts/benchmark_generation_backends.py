@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Compare order/order_item/payment generation throughput across backends."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from generate_ecommerce_dataset import (
+    CUSTOMER_FIELDS,
+    CustomerRefs,
+    ProductRefs,
+    dataset_size,
+    iter_customers,
+    iter_order_bundles,
+    write_csv,
+    write_order_tables,
+)
+from generate_ecommerce_numpy import np, write_order_tables_numpy
+
+DEFAULT_SCALE_FACTORS = (1.0, 10.0, 50.0)
+
+
+def count_rows(path: Path) -> int:
+    with path.open("rb") as handle:
+        return sum(1 for _ in handle) - 1
+
+
+def run_backend(backend: str, scale_factor: float, work_dir: Path) -> Dict[str, object]:
+    size = dataset_size(scale_factor)
+    write_csv(work_dir / "customers.csv", CUSTOMER_FIELDS, iter_customers(size.customers))
+    customer_refs = CustomerRefs(size.customers)
+    products = ProductRefs(size.category_plan)
+    paths = (work_dir / "orders.csv", work_dir / "order_items.csv", work_dir / "payments.csv")
+
+    started = time.perf_counter()
+    if backend == "numpy":
+        write_order_tables_numpy(*paths, customer_refs, products, size.orders, size.item_range)
+    else:
+        write_order_tables(
+            *paths, iter_order_bundles(customer_refs, products, size.orders, size.item_range)
+        )
+    elapsed = time.perf_counter() - started
+
+    rows = sum(count_rows(path) for path in paths)
+    return {
+        "backend": backend,
+        "scale_factor": scale_factor,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scale-factors",
+        type=float,
+        nargs="+",
+        default=list(DEFAULT_SCALE_FACTORS),
+        help="Scale factors to benchmark.",
+    )
+    parser.add_argument("--json", type=Path, default=None, help="Also write results to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    backends = ["python"] + (["numpy"] if np is not None else [])
+    if np is None:
+        print("numpy is not installed; benchmarking the python backend only")
+
+    results: List[Dict[str, object]] = []
+    for scale_factor in args.scale_factors:
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as work_dir:
+                result = run_backend(backend, scale_factor, Path(work_dir))
+            results.append(result)
+            print(
+                f"sf={scale_factor:<8g} {backend:<7} rows={result['rows']:<10} "
+                f"{result['seconds']:>9.3f}s {result['rows_per_sec']:>12.1f} rows/s"
+            )
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""Generate the ecommerce dataset straight into SQLite, without CSV in between.
+
+Rows from the streaming generator are converted to insert tuples in memory
+and loaded the same way ingest_ecommerce_sqlite.py --bulk loads CSV files: a
+fresh database file, one transaction with BULK_PRAGMAS, indexes built after
+the load and a final foreign_key_check, followed by the usual verifications.
+Amounts and timestamps never go through text unless --csv-dir also asks for
+the CSV files, which are then written from the same rows.
+
+--backend numpy draws orders, order_items and payments with the vectorised
+generator in generate_ecommerce_numpy.py and inserts its row tuples as they
+are, with amounts and timestamps computed from integer arrays.
+"""
+
+import argparse
+import calendar
+import sqlite3
+import time
+from contextlib import ExitStack
+from operator import itemgetter
+from pathlib import Path
+
+from ecommerce_checks import parse_threshold
+import ecommerce_instrumentation as instrumentation
+from ecommerce_compact import SCHEMA_LAYOUTS, TIMESTAMP_COLUMNS, SurrogateKeys, epoch_from_text
+from ecommerce_query_cache import bump_load_generation
+from ecommerce_rollups import rebuild_rollups
+from generate_ecommerce_dataset import (
+    CUSTOMER_FIELDS,
+    ID_STYLES,
+    ORDER_FIELDS,
+    ORDER_ITEM_FIELDS,
+    PAYMENT_FIELDS,
+    PRODUCT_FIELDS,
+    CustomerRefs,
+    ProductRefs,
+    csv_row_writer,
+    dataset_size,
+    iter_customers,
+    iter_order_bundles,
+    iter_products,
+)
+from ingest_ecommerce_sqlite import (
+    DEFAULT_CHECK_WORKERS,
+    DEFAULT_CHUNK_SIZE,
+    MONEY_COLUMNS,
+    MONEY_MODES,
+    TABLE_COLUMNS,
+    build_indexes,
+    check_foreign_keys,
+    configure_bulk_connection,
+    enable_foreign_keys,
+    insert_sql,
+    print_check_result,
+    print_load_metrics,
+    remove_database_files,
+    reset_schema,
+    run_verifications,
+    seed_watermarks,
+    timed_phase,
+)
+
+CSV_FIELDS = {
+    "customers": CUSTOMER_FIELDS,
+    "products": PRODUCT_FIELDS,
+    "orders": ORDER_FIELDS,
+    "order_items": ORDER_ITEM_FIELDS,
+    "payments": PAYMENT_FIELDS,
+}
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+BACKENDS = ("python", "numpy")
+
+
+def cents_to_float(cents):
+    # Correctly rounded, so the REAL equals the one parsed from the decimal text.
+    return cents / 100
+
+
+def epoch_list(seconds):
+    return seconds.tolist()
+
+
+def timestamp_value(layout):
+    """Converter for a generated timestamp (datetime or text) to its stored value."""
+    if layout == "compact":
+
+        def to_epoch(value):
+            if isinstance(value, str):
+                return epoch_from_text(value)
+            return calendar.timegm(value.timetuple())
+
+        return to_epoch
+
+    def to_text(value):
+        return value if isinstance(value, str) else value.strftime(TIMESTAMP_FORMAT)
+
+    return to_text
+
+
+def tuple_converter(table_name, money_mode="decimal", layout="text"):
+    """Turn one generated row dict into the insert tuple for table_name.
+
+    The generator already yields int cents when money_mode is "cents"; Decimal
+    amounts become floats, which is what the REAL columns store anyway.
+    """
+    columns = TABLE_COLUMNS[table_name]
+    pick = itemgetter(*columns)
+    conversions = []
+    for index, column in enumerate(columns):
+        if column in MONEY_COLUMNS and money_mode != "cents":
+            conversions.append((index, float))
+        elif column == TIMESTAMP_COLUMNS.get(table_name):
+            conversions.append((index, timestamp_value(layout)))
+
+    def convert(row):
+        values = list(pick(row))
+        for index, convert_value in conversions:
+            values[index] = convert_value(values[index])
+        return values
+
+    return convert
+
+
+class TableLoader:
+    """Buffers converted rows for one table until the caller flushes them."""
+
+    def __init__(self, connection, table_name, money_mode, layout, keys=None, csv_writer=None):
+        self.connection = connection
+        self.table_name = table_name
+        self.sql = insert_sql(table_name, money_mode)
+        self.convert = tuple_converter(table_name, money_mode, layout)
+        self.keys = keys
+        self.csv_writer = csv_writer
+        self.pending = []
+        self.rows = 0
+
+    def add(self, row):
+        if self.csv_writer is not None:
+            self.csv_writer(row)
+        self.pending.append(self.convert(row))
+
+    def extend(self, rows):
+        """Queue rows that are already insert tuples."""
+        self.pending.extend(rows)
+
+    def flush(self):
+        if not self.pending:
+            return
+        rows = self.pending
+        if self.keys is not None:
+            rows = list(self.keys.translate(self.table_name, TABLE_COLUMNS[self.table_name], rows))
+        started, cpu = time.perf_counter(), time.process_time()
+        self.connection.executemany(self.sql, rows)
+        instrumentation.current().record(
+            f"{self.table_name}:insert",
+            time.perf_counter() - started,
+            time.process_time() - cpu,
+            len(rows),
+        )
+        self.rows += len(rows)
+        self.pending = []
+
+
+def load_generated_rows(
+    connection,
+    scale_factor=1.0,
+    money_mode="decimal",
+    id_style="uuid",
+    layout="text",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    csv_dir=None,
+    progress=None,
+    backend="python",
+):
+    """Generate every table and insert it in FK order; returns {table: rows}.
+
+    Runs inside the caller's transaction. The rows match
+    generate_ecommerce_dataset.py --stream (or --backend numpy) with the same
+    options; csv_dir is only supported by the python backend.
+    """
+    size = dataset_size(scale_factor)
+    keys = SurrogateKeys(connection) if layout == "compact" else None
+    with ExitStack() as stack:
+
+        def loader(table_name):
+            csv_writer = None
+            if csv_dir is not None:
+                csv_writer = csv_row_writer(
+                    stack, csv_dir / f"{table_name}.csv", CSV_FIELDS[table_name], money_mode
+                )
+            return TableLoader(connection, table_name, money_mode, layout, keys, csv_writer)
+
+        def load(table_name, rows):
+            started = time.perf_counter()
+            table = loader(table_name)
+            with instrumentation.current().stage(f"load:{table_name}") as stage:
+                for row in rows:
+                    table.add(row)
+                    if len(table.pending) >= chunk_size:
+                        table.flush()
+                table.flush()
+                stage.rows = table.rows
+            if progress is not None:
+                progress(table_name, table.rows, time.perf_counter() - started, final=True)
+            return table.rows
+
+        counts = {}
+        counts["customers"] = load("customers", iter_customers(size.customers, id_style=id_style))
+        counts["products"] = load(
+            "products", iter_products(size.category_plan, id_style, money_mode)
+        )
+        customer_refs = CustomerRefs(size.customers, id_style)
+        products = ProductRefs(size.category_plan, id_style, money_mode)
+
+        started = time.perf_counter()
+        orders, items, payments = (
+            loader(table_name) for table_name in ("orders", "order_items", "payments")
+        )
+        with instrumentation.current().stage("load:orders+order_items+payments") as stage:
+            # Each batch of orders is flushed (and keyed) before the rows that reference it.
+            if backend == "numpy":
+                from generate_ecommerce_numpy import format_timestamps, iter_order_rows_numpy
+
+                chunks = iter_order_rows_numpy(
+                    customer_refs,
+                    products,
+                    size.orders,
+                    size.item_range,
+                    chunk_size,
+                    amount=int if money_mode == "cents" else cents_to_float,
+                    timestamps=epoch_list if layout == "compact" else format_timestamps,
+                    id_style=id_style,
+                )
+                for order_rows, item_rows, payment_rows in chunks:
+                    orders.extend(order_rows)
+                    items.extend(item_rows)
+                    payments.extend(payment_rows)
+                    for table in (orders, items, payments):
+                        table.flush()
+            else:
+                bundles = iter_order_bundles(
+                    customer_refs, products, size.orders, size.item_range, id_style=id_style
+                )
+                for order, order_items, payment in bundles:
+                    orders.add(order)
+                    for item in order_items:
+                        items.add(item)
+                    payments.add(payment)
+                    if len(items.pending) >= chunk_size:
+                        for table in (orders, items, payments):
+                            table.flush()
+                for table in (orders, items, payments):
+                    table.flush()
+            stage.rows = orders.rows + items.rows + payments.rows
+        for table in (orders, items, payments):
+            counts[table.table_name] = table.rows
+            if progress is not None:
+                progress(table.table_name, table.rows, time.perf_counter() - started, final=True)
+    return counts
+
+
+def print_progress(table_name, rows_done, elapsed, final=False):
+    rate = rows_done / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{table_name}: generated and loaded {rows_done} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)",
+        flush=True,
+    )
+
+
+def parse_args(argv=None):
+    root_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=root_dir / "database" / "ecommerce.db",
+        help="SQLite file to (re)create.",
+    )
+    parser.add_argument(
+        "--scale-factor",
+        type=float,
+        default=1.0,
+        help="Scale every table proportionally; 1.0 yields 1500 customers and 1500 orders.",
+    )
+    parser.add_argument(
+        "--money",
+        choices=MONEY_MODES,
+        default="decimal",
+        help="Store amounts as REAL columns or as exact INTEGER <column>_cents columns.",
+    )
+    parser.add_argument(
+        "--id-style",
+        choices=ID_STYLES,
+        default="uuid",
+        help="Seeded version-4 UUID ids, or integer ids counting up from 1 per table.",
+    )
+    parser.add_argument(
+        "--schema",
+        choices=SCHEMA_LAYOUTS,
+        default="text",
+        help="Table layout, as for ingest_ecommerce_sqlite.py --schema.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="python",
+        help="Row generator for orders, order_items and payments (numpy is vectorised).",
+    )
+    parser.add_argument(
+        "--csv-dir",
+        type=Path,
+        default=None,
+        help="Also write the five CSV files to this directory.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Rows inserted per executemany() batch.",
+    )
+    parser.add_argument(
+        "--rollups",
+        action="store_true",
+        help="Build the daily rollup tables (see ecommerce_rollups.py).",
+    )
+    parser.add_argument(
+        "--wal",
+        action="store_true",
+        help="Leave the database in WAL mode.",
+    )
+    parser.add_argument(
+        "--check-workers",
+        type=int,
+        default=DEFAULT_CHECK_WORKERS,
+        help="Run data-quality checks concurrently on this many read-only connections.",
+    )
+    parser.add_argument(
+        "--check-threshold",
+        action="append",
+        default=[],
+        metavar="CHECK.KEY=VALUE",
+        help="Override a check threshold, e.g. payment_success_rate.expected=0.9 (repeatable).",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not report per-table progress and rows/sec.",
+    )
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.validate_arguments(parser, args)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.check_workers < 1:
+        parser.error("--check-workers must be at least 1")
+    if args.backend == "numpy" and args.csv_dir is not None:
+        parser.error("--csv-dir requires --backend python")
+    if args.schema == "compact" and args.rollups:
+        parser.error("--schema compact cannot be combined with --rollups")
+    args.thresholds = {}
+    for text in args.check_threshold:
+        try:
+            name, key, value = parse_threshold(text)
+        except ValueError as error:
+            parser.error(str(error))
+        args.thresholds.setdefault(name, {})[key] = value
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    instrument = instrumentation.from_arguments(args, "build_ecommerce_sqlite")
+    with instrumentation.activate(instrument, args.instrument):
+        run(args)
+
+
+def run(args):
+    db_path = args.database
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.csv_dir is not None:
+        args.csv_dir.mkdir(parents=True, exist_ok=True)
+    remove_database_files(db_path)
+
+    metrics = {}
+    started = time.perf_counter()
+    connection = sqlite3.connect(db_path)
+    try:
+        configure_bulk_connection(connection)
+        reset_schema(connection, args.money, args.schema)
+        try:
+            with timed_phase(metrics, "load"):
+                counts = load_generated_rows(
+                    connection,
+                    args.scale_factor,
+                    args.money,
+                    args.id_style,
+                    args.schema,
+                    args.chunk_size,
+                    args.csv_dir,
+                    None if args.quiet else print_progress,
+                    args.backend,
+                )
+            with timed_phase(metrics, "indexes"):
+                build_indexes(connection, args.money)
+            if args.rollups:
+                with timed_phase(metrics, "rollups"):
+                    rebuild_rollups(connection, args.money)
+            with timed_phase(metrics, "foreign_key_check"):
+                check_foreign_keys(connection)
+            with timed_phase(metrics, "commit"):
+                if args.schema == "text":
+                    seed_watermarks(connection)
+                bump_load_generation(connection)
+                connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        enable_foreign_keys(connection)
+        if args.wal:
+            connection.execute("PRAGMA journal_mode = WAL")
+        with timed_phase(metrics, "verify"):
+            run_verifications(
+                connection,
+                counts,
+                args.money,
+                db_path=db_path,
+                thresholds=args.thresholds,
+                max_workers=args.check_workers,
+                report=None if args.quiet else print_check_result,
+            )
+    finally:
+        connection.close()
+    metrics["total"] = time.perf_counter() - started
+
+    print(f"Created SQLite database at {db_path}")
+    print_load_metrics("direct", metrics, counts, db_path)
+
+
+if __name__ == "__main__":
+    main()
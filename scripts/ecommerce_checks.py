@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Set-based data-quality checks for the ecommerce SQLite database.
+
+Each check is one or two aggregate queries registered with register_check().
+run_checks() executes them concurrently, each on its own read-only connection,
+and returns per-check results with timings.
+"""
+
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ecommerce_db import connect_read_only, money_column
+
+CHECKS = {}
+
+CheckContext = namedtuple(
+    "CheckContext",
+    ["money_mode", "thresholds", "scope_table", "sample_every", "expected_counts"],
+)
+CheckResult = namedtuple("CheckResult", ["name", "passed", "seconds", "error"])
+
+
+def register_check(name, **default_thresholds):
+    """Register func(connection, context) as check `name`; it raises ValueError on failure."""
+
+    def decorator(func):
+        CHECKS[name] = (func, default_thresholds)
+        return func
+
+    return decorator
+
+
+def order_filter(column, context):
+    """SQL predicate limiting `column` (an order id) to the scoped and sampled orders."""
+    predicates = []
+    if context.scope_table is not None:
+        predicates.append(f"{column} IN (SELECT order_id FROM {context.scope_table})")
+    if context.sample_every:
+        predicates.append(
+            f"{column} IN (SELECT order_id FROM orders WHERE rowid % {int(context.sample_every)} = 0)"
+        )
+    return " AND ".join(predicates) or "1 = 1"
+
+
+@register_check("row_counts")
+def check_row_counts(connection, context):
+    if not context.expected_counts or context.scope_table or context.sample_every:
+        return
+    for table_name, expected in context.expected_counts.items():
+        actual = connection.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        if actual != expected:
+            raise ValueError(
+                f"Row count mismatch for {table_name}: expected {expected}, found {actual}"
+            )
+
+
+@register_check("order_totals", tolerance=0.005)
+def check_order_totals(connection, context):
+    """Compare each order total with SUM(subtotal) of its items in one grouped join.
+
+    Integer cents are compared exactly; REAL amounts within `tolerance`.
+    """
+    subtotal = money_column("subtotal", context.money_mode)
+    total_amount = money_column("total_amount", context.money_mode)
+    if context.money_mode == "cents":
+        differs = f"t.items_total != o.{total_amount}"
+    else:
+        differs = f"ABS(t.items_total - o.{total_amount}) > {float(context.thresholds['tolerance'])}"
+
+    missing = [
+        order_id
+        for (order_id,) in connection.execute(
+            f"""
+            SELECT o.order_id FROM orders AS o
+            WHERE {order_filter("o.order_id", context)}
+            AND NOT EXISTS (SELECT 1 FROM order_items AS oi WHERE oi.order_id = o.order_id)
+            LIMIT 5
+            """
+        )
+    ]
+    if missing:
+        raise ValueError("Orders missing order_items: " + ", ".join(map(str, missing)))
+
+    mismatches = [
+        order_id
+        for (order_id,) in connection.execute(
+            f"""
+            SELECT o.order_id
+            FROM orders AS o
+            JOIN (
+                SELECT order_id, SUM({subtotal}) AS items_total
+                FROM order_items
+                WHERE {order_filter("order_id", context)}
+                GROUP BY order_id
+            ) AS t ON t.order_id = o.order_id
+            WHERE {differs}
+            LIMIT 5
+            """
+        )
+    ]
+    if mismatches:
+        raise ValueError("Order total mismatch detected for IDs: " + ", ".join(map(str, mismatches)))
+
+
+@register_check("payment_success_rate", expected=0.92, tolerance=0.01, sigmas=4.0)
+def check_payment_success_rate(connection, context):
+    """Compare the share of successful payments with `expected`.
+
+    The allowed deviation is `tolerance` or `sigmas` binomial standard errors
+    of the payments counted, whichever is wider, so small datasets and
+    --sample-every subsets are held to what their size can show.
+    """
+    if context.scope_table is not None:
+        return
+    success, total = connection.execute(
+        f"""
+        SELECT SUM(LOWER(TRIM(payment_status)) = 'success'), COUNT(*)
+        FROM payments
+        WHERE {order_filter("order_id", context)}
+        """
+    ).fetchone()
+    if not total:
+        raise ValueError("Payments table is empty; cannot verify success rate.")
+
+    expected = float(context.thresholds["expected"])
+    standard_error = math.sqrt(expected * (1 - expected) / total)
+    allowed = max(
+        float(context.thresholds["tolerance"]),
+        float(context.thresholds["sigmas"]) * standard_error,
+    )
+    ratio = success / total
+    if abs(ratio - expected) > allowed:
+        raise ValueError(
+            f"Payment success ratio {ratio:.5f} of {total} payments outside "
+            f"{expected} +/- {allowed:.5f}"
+        )
+
+
+@register_check("rollup_totals", tolerance=0.01)
+def check_rollup_totals(connection, context):
+    """Compare the grand totals of each rollup table with its fact table.
+
+    Always runs unscoped, since a stale rollup may sit on a day no order in
+    the current delta touches. Skipped when sampling or without rollups.
+    """
+    if context.sample_every:
+        return
+    (rollups,) = connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'city_revenue_daily'"
+    ).fetchone()
+    if not rollups:
+        return
+    revenue = money_column("revenue", context.money_mode)
+    subtotal = money_column("subtotal", context.money_mode)
+    total_amount = money_column("total_amount", context.money_mode)
+    amount = money_column("amount", context.money_mode)
+    comparisons = (
+        ("city_revenue_daily", f"SUM({revenue})", "orders", f"SUM({total_amount})"),
+        ("daily_sales_by_category", f"SUM({revenue})", "order_items", f"SUM({subtotal})"),
+        ("product_sales_daily", f"SUM({revenue})", "order_items", f"SUM({subtotal})"),
+        ("payment_method_stats", "SUM(payments)", "payments", "COUNT(*)"),
+        ("payment_method_stats", f"SUM({amount})", "payments", f"SUM({amount})"),
+    )
+    tolerance = float(context.thresholds["tolerance"])
+    for rollup, rollup_total, fact, fact_total in comparisons:
+        (expected,) = connection.execute(f"SELECT {fact_total} FROM {fact}").fetchone()
+        (actual,) = connection.execute(f"SELECT {rollup_total} FROM {rollup}").fetchone()
+        if abs((actual or 0) - (expected or 0)) > tolerance:
+            raise ValueError(
+                f"Rollup {rollup} total {actual} does not match {fact} total {expected}"
+            )
+
+
+def check_context(name, money_mode="decimal", thresholds=None, scope_table=None,
+                  sample_every=None, expected_counts=None):
+    _, defaults = CHECKS[name]
+    merged = dict(defaults)
+    merged.update((thresholds or {}).get(name, {}))
+    return CheckContext(money_mode, merged, scope_table, sample_every, expected_counts)
+
+
+def run_check(name, connection, context):
+    func, _ = CHECKS[name]
+    started = time.perf_counter()
+    try:
+        func(connection, context)
+    except ValueError as error:
+        return CheckResult(name, False, time.perf_counter() - started, str(error))
+    return CheckResult(name, True, time.perf_counter() - started, None)
+
+
+def run_checks(
+    db_path=None,
+    connection=None,
+    names=None,
+    money_mode="decimal",
+    thresholds=None,
+    scope_table=None,
+    sample_every=None,
+    expected_counts=None,
+    max_workers=4,
+):
+    """Run registered checks and return their CheckResults in registration order.
+
+    With db_path every check gets its own read-only connection on a thread pool
+    (sqlite3 releases the GIL while a query runs). With only `connection` the
+    checks run one after another on it.
+    """
+    names = list(CHECKS) if names is None else list(names)
+    contexts = {
+        name: check_context(
+            name, money_mode, thresholds, scope_table, sample_every, expected_counts
+        )
+        for name in names
+    }
+
+    if db_path is None:
+        return [run_check(name, connection, contexts[name]) for name in names]
+
+    def run_isolated(name):
+        read_only = connect_read_only(db_path)
+        try:
+            return run_check(name, read_only, contexts[name])
+        finally:
+            read_only.close()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run_isolated, names))
+
+
+def raise_for_failures(results):
+    failures = [result for result in results if not result.passed]
+    if failures:
+        raise ValueError("; ".join(f"{result.name}: {result.error}" for result in failures))
+
+
+def parse_threshold(text):
+    """Parse "check.key=value" into (check, key, float value); key must be a known threshold."""
+    target, _, value = text.partition("=")
+    name, _, key = target.partition(".")
+    if not value or name not in CHECKS or key not in CHECKS[name][1]:
+        raise ValueError(f"Invalid check threshold {text!r}; expected <check>.<key>=<value>")
+    return name, key, float(value)
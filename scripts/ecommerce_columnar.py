@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""Memory-mapped columnar storage for the ecommerce tables.
+
+Each table is a directory holding one binary file per column plus _meta.json:
+
+* int64 columns (quantities, money as integer cents, epoch-second timestamps)
+  are native-endian ``array("q")`` dumps in ``<column>.bin``;
+* dictionary-encoded columns (categories, cities, statuses, ...) store uint32
+  codes in ``<column>.bin`` and the distinct values in _meta.json;
+* free-text columns store UTF-8 bytes back to back in ``<column>.bin`` and
+  ``rows + 1`` int64 byte offsets in ``<column>.offsets``.
+
+ColumnarTable maps the files read-only, so fixed-width columns are exposed as
+zero-copy memoryviews and nothing is parsed until a value is decoded.
+"""
+
+from __future__ import annotations
+
+import calendar
+import json
+import mmap
+import sys
+import time
+from array import array
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+COLUMNAR_DIR = "columnar"
+META_FILE = "_meta.json"
+FORMAT_VERSION = 1
+DEFAULT_FLUSH_ROWS = 65_536
+DEFAULT_BATCH_ROWS = 50_000
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+INT64 = "q"
+CODE = "I"
+COLUMN_KINDS = ("int64", "money", "timestamp", "dict", "string")
+
+TABLE_SCHEMAS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "customers": (
+        ("customer_id", "string"),
+        ("full_name", "string"),
+        ("email", "string"),
+        ("phone", "string"),
+        ("address", "string"),
+        ("city", "dict"),
+        ("state", "dict"),
+        ("country", "dict"),
+        ("created_at", "timestamp"),
+    ),
+    "products": (
+        ("product_id", "string"),
+        ("name", "string"),
+        ("category", "dict"),
+        ("sub_category", "dict"),
+        ("price", "money"),
+        ("stock_quantity", "int64"),
+        ("added_at", "timestamp"),
+    ),
+    "orders": (
+        ("order_id", "string"),
+        ("customer_id", "string"),
+        ("order_date", "timestamp"),
+        ("total_amount", "money"),
+        ("status", "dict"),
+        ("city", "dict"),
+        ("state", "dict"),
+        ("country", "dict"),
+    ),
+    "order_items": (
+        ("order_item_id", "string"),
+        ("order_id", "string"),
+        ("product_id", "string"),
+        ("quantity", "int64"),
+        ("item_price", "money"),
+        ("subtotal", "money"),
+    ),
+    "payments": (
+        ("payment_id", "string"),
+        ("order_id", "string"),
+        ("payment_method", "dict"),
+        ("amount", "money"),
+        ("payment_status", "dict"),
+        ("transaction_timestamp", "timestamp"),
+    ),
+}
+
+if array(CODE).itemsize != 4:  # pragma: no cover - every mainstream platform has 4-byte "I"
+    raise ImportError("ecommerce_columnar needs a 4-byte unsigned int array type code")
+
+
+def table_dir(root: Path, table: str) -> Path:
+    return root / COLUMNAR_DIR / table
+
+
+def money_cents(value: object) -> int:
+    """Integer cents for an int (already cents), Decimal or decimal string amount."""
+    if isinstance(value, int):
+        return value
+    cents = Decimal(value if isinstance(value, Decimal) else str(value)).scaleb(2)
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Amount {value!r} has sub-cent precision")
+    return int(cents)
+
+
+def epoch_seconds(value: object) -> int:
+    if isinstance(value, str):
+        value = datetime.strptime(value, TIMESTAMP_FORMAT)
+    return calendar.timegm(value.timetuple())
+
+
+def timestamp_text(seconds: int) -> str:
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(seconds))
+
+
+class _FixedColumn:
+    """int64 or dictionary-code column buffered in an array and appended to disk."""
+
+    def __init__(self, directory: Path, name: str, kind: str) -> None:
+        self.kind = kind
+        self.handle = (directory / f"{name}.bin").open("wb")
+        self.buffer = array(CODE if kind == "dict" else INT64)
+        self.codes: Dict[str, int] = {}
+        self.encode = {"money": money_cents, "timestamp": epoch_seconds, "int64": int}.get(kind)
+
+    def append(self, value: object) -> None:
+        if self.kind == "dict":
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.codes)
+            self.buffer.append(code)
+        else:
+            self.buffer.append(self.encode(value))
+
+    def flush(self) -> None:
+        self.buffer.tofile(self.handle)
+        del self.buffer[:]
+
+    def close(self) -> None:
+        self.flush()
+        self.handle.close()
+
+    def meta(self) -> Dict[str, object]:
+        if self.kind == "dict":
+            return {"dictionary": list(self.codes)}
+        return {}
+
+
+class _StringColumn:
+    """Variable-length UTF-8 column: a byte blob plus rows + 1 int64 offsets."""
+
+    kind = "string"
+
+    def __init__(self, directory: Path, name: str) -> None:
+        self.handle = (directory / f"{name}.bin").open("wb")
+        self.offsets_handle = (directory / f"{name}.offsets").open("wb")
+        self.chunks: List[bytes] = []
+        self.offsets = array(INT64, [0])
+        self.position = 0
+
+    def append(self, value: object) -> None:
+        data = str(value).encode("utf-8")
+        self.chunks.append(data)
+        self.position += len(data)
+        self.offsets.append(self.position)
+
+    def flush(self) -> None:
+        self.handle.write(b"".join(self.chunks))
+        self.offsets.tofile(self.offsets_handle)
+        self.chunks.clear()
+        del self.offsets[:]
+
+    def close(self) -> None:
+        self.flush()
+        self.handle.close()
+        self.offsets_handle.close()
+
+    def meta(self) -> Dict[str, object]:
+        return {}
+
+
+class ColumnarTableWriter:
+    """Stream row dicts (as built by the generator) into a columnar table directory.
+
+    Money may be int cents, Decimal or text; timestamps datetime or text. The
+    metadata file is written last, so a directory without _meta.json is an
+    interrupted write.
+    """
+
+    def __init__(self, directory: Path, table: str, flush_rows: int = DEFAULT_FLUSH_ROWS) -> None:
+        self.directory = directory
+        self.table = table
+        self.flush_rows = flush_rows
+        self.rows = 0
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / META_FILE
+        if meta_path.exists():
+            meta_path.unlink()
+        self.columns = [
+            (name, _StringColumn(directory, name) if kind == "string" else _FixedColumn(directory, name, kind))
+            for name, kind in TABLE_SCHEMAS[table]
+        ]
+
+    def writerow(self, row: Dict[str, object]) -> None:
+        for name, column in self.columns:
+            column.append(row[name])
+        self.rows += 1
+        if self.rows % self.flush_rows == 0:
+            for _, column in self.columns:
+                column.flush()
+
+    def close(self, write_meta: bool = True) -> None:
+        for _, column in self.columns:
+            column.close()
+        if not write_meta:
+            return
+        meta = {
+            "version": FORMAT_VERSION,
+            "table": self.table,
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "columns": [dict(name=name, kind=column.kind, **column.meta()) for name, column in self.columns],
+        }
+        (self.directory / META_FILE).write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+
+    def __enter__(self) -> "ColumnarTableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(write_meta=exc_type is None)
+
+
+class ColumnarTable:
+    """Read-only, memory-mapped view of one columnar table directory.
+
+    column() returns zero-copy memoryviews into the mapped files; release any
+    slices taken from them before close().
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        meta_path = directory / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Columnar table metadata not found: {meta_path}")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version in {meta_path}: {meta.get('version')}")
+        if meta.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{meta_path} was written on a {meta.get('byteorder')}-endian machine")
+        self.table: str = meta["table"]
+        self.rows: int = meta["rows"]
+        self.kinds: Dict[str, str] = {column["name"]: column["kind"] for column in meta["columns"]}
+        self.dictionaries: Dict[str, List[str]] = {
+            column["name"]: column["dictionary"] for column in meta["columns"] if column["kind"] == "dict"
+        }
+        self._maps: List[mmap.mmap] = []
+        self._views: List[memoryview] = []
+        self._cache: Dict[str, memoryview] = {}
+
+    def _map(self, path: Path, typecode: str) -> memoryview:
+        key = f"{path.name}:{typecode}"
+        if key in self._cache:
+            return self._cache[key]
+        if path.stat().st_size == 0:
+            view = memoryview(array(typecode))
+        else:
+            with path.open("rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mapped)
+            raw = memoryview(mapped)
+            self._views.append(raw)
+            view = raw if typecode == "B" else raw.cast(typecode)
+        self._views.append(view)
+        self._cache[key] = view
+        return view
+
+    def kind(self, name: str) -> str:
+        try:
+            return self.kinds[name]
+        except KeyError:
+            raise KeyError(f"{self.table} has no column {name!r}") from None
+
+    def column(self, name: str) -> memoryview:
+        """Zero-copy int64 values or uint32 dictionary codes for a fixed-width column."""
+        kind = self.kind(name)
+        if kind == "string":
+            raise ValueError(f"{self.table}.{name} is variable-length; use string_buffers()")
+        return self._map(self.directory / f"{name}.bin", CODE if kind == "dict" else INT64)
+
+    def string_buffers(self, name: str) -> Tuple[memoryview, memoryview]:
+        """(int64 offsets, UTF-8 blob) for a variable-length column, both zero-copy."""
+        if self.kind(name) != "string":
+            raise ValueError(f"{self.table}.{name} is not a variable-length column")
+        return (
+            self._map(self.directory / f"{name}.offsets", INT64),
+            self._map(self.directory / f"{name}.bin", "B"),
+        )
+
+    def values(self, name: str, start: int = 0, stop: Optional[int] = None) -> List[object]:
+        """Decode rows [start, stop) of one column: str for text, int for the rest."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        kind = self.kind(name)
+        if kind == "string":
+            offsets, blob = self.string_buffers(name)
+            bounds = offsets[start:stop + 1].tolist()
+            base = bounds[0] if bounds else 0
+            data = bytes(blob[base:bounds[-1]]) if bounds else b""
+            return [
+                data[begin - base:end - base].decode("utf-8")
+                for begin, end in zip(bounds, bounds[1:])
+            ]
+        codes = self.column(name)[start:stop]
+        if kind == "dict":
+            return list(map(self.dictionaries[name].__getitem__, codes))
+        return codes.tolist()
+
+    def iter_batches(
+        self, names: Sequence[str], batch_rows: int = DEFAULT_BATCH_ROWS
+    ) -> Iterator[List[List[object]]]:
+        """Yield [column values, ...] for the named columns, batch_rows rows at a time."""
+        for start in range(0, self.rows, batch_rows):
+            yield [self.values(name, start, start + batch_rows) for name in names]
+
+    def close(self) -> None:
+        self._cache.clear()
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+
+    def __enter__(self) -> "ColumnarTable":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def open_table(root: Path, table: str) -> ColumnarTable:
+    return ColumnarTable(table_dir(root, table))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Compact storage layout for the ecommerce database.
+
+The default ("text") layout keys every table on the generator's TEXT ids and
+stores timestamps as "YYYY-MM-DD HH:MM:SS" text. The compact layout keeps the
+same tables and column names but uses INTEGER PRIMARY KEY surrogates (the
+rowid itself, so key lookups need no separate index), INTEGER foreign keys and
+epoch-second timestamps. Every join then compares 8-byte integers instead of
+36-byte strings, and date-range predicates compare integers.
+
+Surrogate keys are assigned 1, 2, ... in load order. The original id of every
+row is kept in <table>_id_map(id, external_id), indexed both ways, so rows can
+still be found by the ids in the source files.
+"""
+
+from datetime import date
+from functools import lru_cache
+
+SCHEMA_LAYOUTS = ("text", "compact")
+DEFAULT_FLUSH_ROWS = 50_000
+
+KEY_COLUMNS = {
+    "customers": "customer_id",
+    "products": "product_id",
+    "orders": "order_id",
+    "order_items": "order_item_id",
+    "payments": "payment_id",
+}
+TIMESTAMP_COLUMNS = {
+    "customers": "created_at",
+    "products": "added_at",
+    "orders": "order_date",
+    "payments": "transaction_timestamp",
+}
+# Foreign key columns translated from source ids to surrogate keys.
+REFERENCES = {
+    "orders": {"customer_id": "customers"},
+    "order_items": {"order_id": "orders", "product_id": "products"},
+    "payments": {"order_id": "orders"},
+}
+REFERENCED_TABLES = {parent for columns in REFERENCES.values() for parent in columns.values()}
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def id_map_table(table_name):
+    return f"{table_name}_id_map"
+
+
+def create_id_map_tables(connection):
+    for table_name in KEY_COLUMNS:
+        connection.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {id_map_table(table_name)}(
+                id INTEGER PRIMARY KEY,
+                external_id TEXT NOT NULL UNIQUE
+            )
+            """
+        )
+
+
+def drop_id_map_tables(connection):
+    for table_name in KEY_COLUMNS:
+        connection.execute(f"DROP TABLE IF EXISTS {id_map_table(table_name)}")
+
+
+def schema_layout(connection):
+    """Return "compact" or "text" for an existing database, or None without tables."""
+    types = {row[1]: row[2].upper() for row in connection.execute("PRAGMA table_info(orders)")}
+    if not types:
+        return None
+    return "compact" if types.get("order_date") == "INTEGER" else "text"
+
+
+@lru_cache(maxsize=8192)
+def day_seconds(day):
+    """Epoch seconds of midnight UTC on a YYYY-MM-DD day."""
+    return (date(int(day[:4]), int(day[5:7]), int(day[8:10])).toordinal() - EPOCH_ORDINAL) * 86400
+
+
+def epoch_from_text(value):
+    """Epoch seconds for "YYYY-MM-DD HH:MM:SS"; the day part is cached."""
+    if len(value) != 19:
+        raise ValueError(f"Timestamp {value!r} is not YYYY-MM-DD HH:MM:SS")
+    return day_seconds(value[:10]) + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+
+
+def surrogate_key(connection, table_name, external_id):
+    row = connection.execute(
+        f"SELECT id FROM {id_map_table(table_name)} WHERE external_id = ?", (external_id,)
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def external_id(connection, table_name, key):
+    row = connection.execute(
+        f"SELECT external_id FROM {id_map_table(table_name)} WHERE id = ?", (key,)
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+class SurrogateKeys:
+    """Assigns surrogate keys during a full load and rewrites foreign keys to them.
+
+    Keys of customers, products and orders stay in memory for the whole load,
+    because later tables refer to them; every assignment is also written to the
+    table's id map in batches of flush_rows.
+    """
+
+    def __init__(self, connection, flush_rows=DEFAULT_FLUSH_ROWS):
+        self.connection = connection
+        self.flush_rows = flush_rows
+        self.keys = {table_name: {} for table_name in REFERENCED_TABLES}
+        self.next_key = {table_name: 1 for table_name in KEY_COLUMNS}
+
+    def load_retained(self, table_names):
+        """Read back the keys of referenced tables outside table_names (partial reloads)."""
+        for table_name, assigned in self.keys.items():
+            if table_name not in table_names:
+                assigned.update(
+                    (source_id, key)
+                    for key, source_id in self.connection.execute(
+                        f"SELECT id, external_id FROM {id_map_table(table_name)}"
+                    )
+                )
+
+    def translate(self, table_name, columns, rows):
+        """Yield rows (in `columns` order, key first) with source ids replaced by keys."""
+        references = [
+            (columns.index(column), parent, self.keys[parent])
+            for column, parent in REFERENCES.get(table_name, {}).items()
+        ]
+        assigned = self.keys.get(table_name)
+        map_sql = f"INSERT INTO {id_map_table(table_name)}(id, external_id) VALUES (?, ?)"
+        pending = []
+        key = self.next_key[table_name]
+        for row in rows:
+            values = list(row)
+            source_id = values[0]
+            values[0] = key
+            pending.append((key, source_id))
+            if assigned is not None:
+                assigned[source_id] = key
+            for index, parent, parent_keys in references:
+                try:
+                    values[index] = parent_keys[values[index]]
+                except KeyError:
+                    raise ValueError(
+                        f"{table_name}.{columns[index]} {values[index]!r} "
+                        f"does not match any {parent} row"
+                    ) from None
+            key += 1
+            yield values
+            if len(pending) >= self.flush_rows:
+                self.connection.executemany(map_sql, pending)
+                pending = []
+        self.next_key[table_name] = key
+        if pending:
+            self.connection.executemany(map_sql, pending)
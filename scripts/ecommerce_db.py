@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""SQLite helpers shared by the ingester, checks, rollups and query tools.
+
+Money columns are named and typed by money mode: "decimal" stores REAL
+amounts under the plain name, "cents" stores INTEGER cents as <name>_cents.
+"""
+
+import sqlite3
+from pathlib import Path
+
+
+def money_column(name, money_mode):
+    if money_mode == "cents":
+        return f"{name}_cents"
+    return name
+
+
+def money_definition(name, money_mode):
+    if money_mode == "cents":
+        return f"{name}_cents INTEGER"
+    return f"{name} REAL"
+
+
+def schema_money_mode(connection):
+    """Return "cents" or "decimal" for an existing database, or None without tables."""
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(orders)")}
+    if "total_amount_cents" in columns:
+        return "cents"
+    if "total_amount" in columns:
+        return "decimal"
+    return None
+
+
+def connect_read_only(db_path):
+    """Read-only connection that may be handed to another thread."""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
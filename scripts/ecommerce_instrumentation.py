@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Stage timing and resource instrumentation shared by the generator and ingester.
+
+Code marks coarse stages with ``current().stage(name)`` and hot loops report
+pre-measured slices with ``current().record(name, wall, cpu, rows)``. Unless a
+script was started with --instrument, current() is a no-op object, so the hooks
+cost one attribute lookup and an empty context manager per stage.
+
+With --instrument REPORT.json the script writes, per stage: calls, wall and CPU
+seconds, rows, rows/sec and RSS (plus the traced Python heap peak when
+--trace-memory is on). --profile adds a cProfile capture: the top functions go
+in the report and the full profile in REPORT.prof.
+
+The OS only reports the process's lifetime RSS high-water mark, so each stage
+records that mark as the stage ended (process_peak_rss_mb) and how far the
+stage raised it (rss_growth_mb). A stage that allocates less than an earlier
+one shows no growth.
+"""
+
+import cProfile
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_TOP = 25
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageStats:
+    __slots__ = ("calls", "wall", "cpu", "rows", "traced_peak", "rss_mb", "rss_growth_mb")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.traced_peak = 0
+        self.rss_mb = None
+        self.rss_growth_mb = None
+
+    def as_dict(self, name):
+        summary = {
+            "name": name,
+            "calls": self.calls,
+            "wall_seconds": round(self.wall, 6),
+            "cpu_seconds": round(self.cpu, 6),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / self.wall, 1) if self.rows and self.wall else None,
+            "process_peak_rss_mb": self.rss_mb,
+            "rss_growth_mb": self.rss_growth_mb,
+        }
+        if self.traced_peak:
+            summary["traced_peak_mb"] = round(self.traced_peak / (1024 * 1024), 2)
+        return summary
+
+
+class StageHandle:
+    """Yielded by stage(); set .rows to attribute processed rows to the stage."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+
+class Instrumentation:
+    enabled = True
+
+    def __init__(self, script, profile=False, trace_memory=False, top=DEFAULT_TOP):
+        self.script = script
+        self.profile = cProfile.Profile() if profile else None
+        self.trace_memory = trace_memory
+        self.top = top
+        self.stages = {}
+        self._traced_stack = []
+        self._started_at = None
+        self._wall = None
+        self._cpu = None
+        self._snapshot = None
+        self.error = None
+
+    def _stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def start(self):
+        self._started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        if self.trace_memory:
+            # Stages reset the tracemalloc peak, so fold their peaks back in.
+            peak = max(
+                [tracemalloc.get_traced_memory()[1]]
+                + [stats.traced_peak for stats in self.stages.values()]
+            )
+            self._snapshot = (tracemalloc.take_snapshot(), peak)
+            tracemalloc.stop()
+        self._wall = time.perf_counter() - self._wall
+        self._cpu = time.process_time() - self._cpu
+
+    @contextmanager
+    def stage(self, name):
+        handle = StageHandle()
+        if self.trace_memory:
+            self._enter_traced()
+        rss_before = peak_rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield handle
+        finally:
+            stats = self._stats(name)
+            stats.calls += 1
+            stats.wall += time.perf_counter() - wall
+            stats.cpu += time.process_time() - cpu
+            stats.rows += handle.rows
+            stats.rss_mb = peak_rss_mb()
+            if stats.rss_mb is not None:
+                growth = round(stats.rss_mb - rss_before, 1)
+                stats.rss_growth_mb = max(stats.rss_growth_mb or 0.0, growth)
+            if self.trace_memory:
+                stats.traced_peak = max(stats.traced_peak, self._exit_traced())
+
+    def _enter_traced(self):
+        if self._traced_stack:
+            self._traced_stack[-1] = max(self._traced_stack[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._traced_stack.append(0)
+
+    def _exit_traced(self):
+        peak = max(self._traced_stack.pop(), tracemalloc.get_traced_memory()[1])
+        if self._traced_stack:
+            self._traced_stack[-1] = max(self._traced_stack[-1], peak)
+        return peak
+
+    def record(self, name, wall, cpu=0.0, rows=0):
+        """Add an already-measured slice (e.g. one executemany batch) to a stage."""
+        stats = self._stats(name)
+        stats.calls += 1
+        stats.wall += wall
+        stats.cpu += cpu
+        stats.rows += rows
+
+    def profile_summary(self):
+        stats = pstats.Stats(self.profile)
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [
+            {
+                "function": f"{Path(filename).name}:{line}({function})",
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            }
+            for (filename, line, function), (_, calls, own, cumulative, _) in entries[:self.top]
+        ]
+
+    def memory_summary(self):
+        snapshot, peak = self._snapshot
+        return {
+            "traced_peak_mb": round(peak / (1024 * 1024), 2),
+            "top_allocations": [
+                {
+                    "location": f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:self.top]
+            ],
+        }
+
+    def report(self):
+        report = {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "started_at": self._started_at,
+            "wall_seconds": round(self._wall, 6),
+            "cpu_seconds": round(self._cpu, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "error": self.error,
+            "stages": [stats.as_dict(name) for name, stats in self.stages.items()],
+        }
+        if self.profile is not None:
+            report["profile"] = self.profile_summary()
+        if self._snapshot is not None:
+            report["tracemalloc"] = self.memory_summary()
+        return report
+
+    def write(self, path):
+        path.write_text(json.dumps(self.report(), indent=2) + "\n", encoding="utf-8")
+        if self.profile is not None:
+            self.profile.dump_stats(str(path.with_suffix(".prof")))
+
+
+class _NullStage:
+    def __enter__(self):
+        return StageHandle()
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullInstrumentation:
+    """Stand-in used when instrumentation is off; every hook does nothing."""
+
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def record(self, name, wall, cpu=0.0, rows=0):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+_current = NULL_INSTRUMENTATION
+
+
+def current():
+    return _current
+
+
+@contextmanager
+def activate(instrumentation, report_path=None):
+    """Make instrumentation current for the block and write its report afterwards.
+
+    The report is written even when the block raises, with the error recorded.
+    """
+    global _current
+    if not instrumentation.enabled:
+        yield instrumentation
+        return
+    previous, _current = _current, instrumentation
+    instrumentation.start()
+    try:
+        yield instrumentation
+    except BaseException as error:
+        instrumentation.error = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        instrumentation.stop()
+        _current = previous
+        if report_path is not None:
+            instrumentation.write(report_path)
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--instrument",
+        type=Path,
+        default=None,
+        metavar="REPORT.json",
+        help="Write a JSON report of per-stage wall/CPU time, rows/sec and peak memory.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="With --instrument, also capture a cProfile of the run (top functions + REPORT.prof).",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="With --instrument, trace Python allocations with tracemalloc (slows the run).",
+    )
+
+
+def validate_arguments(parser, args):
+    if (args.profile or args.trace_memory) and args.instrument is None:
+        parser.error("--profile and --trace-memory require --instrument")
+
+
+def from_arguments(args, script):
+    if args.instrument is None:
+        return NULL_INSTRUMENTATION
+    return Instrumentation(script, profile=args.profile, trace_memory=args.trace_memory)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""CSV file helpers shared by the generator and the ingester.
+
+A table's CSV may be stored plain (<table>.csv) or compressed, with the codec
+chosen by extension: .csv.gz (gzip), .csv.bz2 (bz2) or .csv.xz (lzma).
+open_csv() streams through the codec in either direction, so memory stays
+bounded by the codec's buffers whatever the file size.
+"""
+
+import bz2
+import gzip
+import lzma
+
+# compression name -> (file suffix, module, keyword arguments for open()).
+CODECS = {
+    "none": ("", None, {}),
+    "gzip": (".gz", gzip, {"compresslevel": 6}),
+    "bz2": (".bz2", bz2, {"compresslevel": 9}),
+    "xz": (".xz", lzma, {"preset": 2}),
+}
+COMPRESSIONS = tuple(CODECS)
+# Typical plain/compressed size ratios of generated CSVs, measured with
+# benchmark_compression.py; only used for size estimates.
+TYPICAL_RATIOS = {"none": 1.0, "gzip": 2.35, "bz2": 2.86, "xz": 3.08}
+
+
+def csv_name(table_name, compression="none"):
+    return f"{table_name}.csv{CODECS[compression][0]}"
+
+
+def csv_compression(path):
+    """Compression name implied by a CSV path's extension."""
+    for compression, (suffix, _, _) in CODECS.items():
+        if suffix and path.name.endswith(suffix):
+            return compression
+    return "none"
+
+
+def is_compressed(path):
+    return csv_compression(path) != "none"
+
+
+def estimated_plain_size(path):
+    """Bytes of the CSV once decompressed, estimated for compressed files."""
+    return int(path.stat().st_size * TYPICAL_RATIOS[csv_compression(path)])
+
+
+def open_csv(path, mode="r"):
+    """Open a CSV for csv.reader/csv.writer ("r"/"w") or as bytes ("rb"/"wb")."""
+    _, module, options = CODECS[csv_compression(path)]
+    binary = "b" in mode
+    if module is None:
+        if binary:
+            return open(path, mode)
+        return open(path, mode, newline="", encoding="utf-8")
+    if not mode.startswith("w"):
+        options = {}
+    if binary:
+        return module.open(path, mode, **options)
+    return module.open(path, mode + "t", newline="", encoding="utf-8", **options)
+
+
+def csv_variants(directory, table_name):
+    """Every existing file for table_name in directory, in CODECS order."""
+    return [
+        directory / csv_name(table_name, compression)
+        for compression in COMPRESSIONS
+        if (directory / csv_name(table_name, compression)).exists()
+    ]
+
+
+def find_csv(directory, table_name):
+    """Path of the table's only CSV in directory, plain or compressed."""
+    variants = csv_variants(directory, table_name)
+    if not variants:
+        raise FileNotFoundError(f"No CSV for {table_name} in {directory}")
+    if len(variants) > 1:
+        names = ", ".join(path.name for path in variants)
+        raise ValueError(f"Several CSVs for {table_name} in {directory}: {names}")
+    return variants[0]
+
+
+def remove_stale_variants(directory, table_name, compression):
+    """Delete the table's CSVs with any other compression before it is rewritten."""
+    keep = directory / csv_name(table_name, compression)
+    for path in csv_variants(directory, table_name):
+        if path != keep:
+            path.unlink()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Input manifest recorded by full loads, so unchanged inputs can be skipped.
+
+After a load run with --skip-unchanged the ingester stores one row per table
+in ingest_manifest: the CSV's file name, size, mtime and SHA-256, the rows
+loaded from it, and the settings the tables were built with (manifest schema
+version, money mode and layout). The next run compares the files on disk with
+those rows and reloads only the tables whose input changed, plus every table
+that references them, or nothing at all.
+
+A file whose name, size and mtime all match its row is taken as unchanged
+without reading it. Otherwise it is hashed in HASH_BLOCK_BYTES reads, so a
+touched but identical file still counts as unchanged and memory stays flat
+however large the file is. Compressed files are hashed as stored.
+"""
+
+import hashlib
+from collections import namedtuple
+
+from ecommerce_compact import REFERENCED_TABLES, REFERENCES
+from ecommerce_io import find_csv
+
+MANIFEST_TABLE = "ingest_manifest"
+# Bump when the tables a load produces change shape, so older databases reload fully.
+MANIFEST_SCHEMA_VERSION = 1
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# entries: {table: current file description}; tables: tables to reload, in the
+# caller's order; row_counts: manifest row counts of the tables kept as they
+# are; restat: a kept file was touched, so its recorded mtime is out of date.
+ReloadPlan = namedtuple("ReloadPlan", ["entries", "tables", "row_counts", "restat"])
+
+# Tables that hold foreign keys into each table and must reload with it.
+DEPENDENTS = {
+    parent: {child for child, columns in REFERENCES.items() if parent in columns.values()}
+    for parent in REFERENCED_TABLES
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def create_manifest_table(connection):
+    connection.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE}(
+            table_name TEXT PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            schema_version INTEGER NOT NULL,
+            money_mode TEXT NOT NULL,
+            layout TEXT NOT NULL,
+            recorded_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def drop_manifest_table(connection):
+    connection.execute(f"DROP TABLE IF EXISTS {MANIFEST_TABLE}")
+
+
+def read_manifest(connection):
+    """Return {table: row dict} from the manifest, or {} if none was recorded."""
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (MANIFEST_TABLE,)
+    ).fetchone()
+    if not exists:
+        return {}
+    cursor = connection.execute(f"SELECT * FROM {MANIFEST_TABLE}")
+    names = [column[0] for column in cursor.description]
+    return {row[0]: dict(zip(names, row)) for row in cursor}
+
+
+def scan_inputs(dataset_dir, table_names, manifest=None):
+    """Describe each table's current CSV, hashing only files whose stat changed."""
+    manifest = manifest or {}
+    entries = {}
+    for table_name in table_names:
+        path = find_csv(dataset_dir, table_name)
+        stat = path.stat()
+        entry = {
+            "file_name": path.name,
+            "size_bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        previous = manifest.get(table_name)
+        if previous is not None and all(previous[key] == value for key, value in entry.items()):
+            entry["sha256"] = previous["sha256"]
+        else:
+            entry["sha256"] = file_sha256(path)
+        entries[table_name] = entry
+    return entries
+
+
+def changed_tables(manifest, entries, money_mode, layout):
+    """Tables whose input or build settings differ from the manifest."""
+    settings = {
+        "schema_version": MANIFEST_SCHEMA_VERSION,
+        "money_mode": money_mode,
+        "layout": layout,
+    }
+    changed = set()
+    for table_name, entry in entries.items():
+        previous = manifest.get(table_name)
+        if previous is None or any(previous[key] != value for key, value in settings.items()):
+            changed.add(table_name)
+        elif any(previous[key] != entry[key] for key in ("file_name", "size_bytes", "sha256")):
+            changed.add(table_name)
+    return changed
+
+
+def with_dependents(table_names):
+    """table_names plus every table that references one of them, transitively."""
+    pending = list(table_names)
+    closed = set(pending)
+    while pending:
+        for child in DEPENDENTS.get(pending.pop(), ()):
+            if child not in closed:
+                closed.add(child)
+                pending.append(child)
+    return closed
+
+
+def record_manifest(connection, entries, counts, money_mode, layout):
+    """Store entries with their row counts, inside the load's transaction."""
+    create_manifest_table(connection)
+    connection.executemany(
+        f"""
+        INSERT OR REPLACE INTO {MANIFEST_TABLE}(
+            table_name, file_name, size_bytes, mtime_ns, sha256, row_count,
+            schema_version, money_mode, layout, recorded_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+        """,
+        [
+            (
+                table_name,
+                entry["file_name"],
+                entry["size_bytes"],
+                entry["mtime_ns"],
+                entry["sha256"],
+                counts[table_name],
+                MANIFEST_SCHEMA_VERSION,
+                money_mode,
+                layout,
+            )
+            for table_name, entry in entries.items()
+        ],
+    )
+
+
+def plan_reload(connection, dataset_dir, table_names, money_mode, layout):
+    """Compare the inputs with connection's manifest (None: no database yet)."""
+    manifest = {} if connection is None else read_manifest(connection)
+    entries = scan_inputs(dataset_dir, table_names, manifest)
+    reload = with_dependents(changed_tables(manifest, entries, money_mode, layout))
+    kept = [table_name for table_name in table_names if table_name not in reload]
+    return ReloadPlan(
+        entries,
+        tuple(table_name for table_name in table_names if table_name in reload),
+        {table_name: manifest[table_name]["row_count"] for table_name in kept},
+        any(manifest[name]["mtime_ns"] != entries[name]["mtime_ns"] for name in kept),
+    )
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""LRU result cache for repeated read queries against the ecommerce database.
+
+Entries are keyed on whitespace-normalised SQL plus the bound parameters and
+are bounded by both entry count and estimated byte size. Every lookup first
+compares a cheap validity token (PRAGMA data_version, the connection's own
+total_changes and the load generation the ingester stores in PRAGMA
+user_version); any change empties the cache.
+
+CachedConnection wraps a sqlite3 connection so existing helpers written as
+connection.execute(sql, params).fetchall(), such as the ecommerce_rollups
+queries, are served from the cache unchanged.
+"""
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CACHEABLE_PREFIXES = ("SELECT", "WITH", "VALUES")
+WRITE_KEYWORDS_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b")
+
+# Quoted literals and identifiers are kept verbatim; whitespace and comments
+# elsewhere collapse to a single space.
+SQL_TOKEN_RE = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|((?:--[^\n]*|/\*.*?\*/|\s+)+)""",
+    re.DOTALL,
+)
+
+
+def normalize_sql(sql):
+    def replace(match):
+        return match.group(1) if match.group(1) is not None else " "
+
+    return SQL_TOKEN_RE.sub(replace, sql).strip().rstrip(";").strip()
+
+
+def parameters_key(parameters):
+    if parameters is None:
+        return ()
+    if isinstance(parameters, dict):
+        return tuple(sorted(parameters.items()))
+    return tuple(parameters)
+
+
+def is_cacheable(normalized_sql):
+    """Only plain reads are cached; a WITH ... INSERT/UPDATE/DELETE always runs."""
+    upper = normalized_sql.upper()
+    return upper.startswith(CACHEABLE_PREFIXES) and not WRITE_KEYWORDS_RE.search(upper)
+
+
+def estimate_size(rows):
+    """Approximate bytes held by a list of row tuples."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+def load_generation(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def bump_load_generation(connection):
+    """Advance the load generation inside the loader's open transaction."""
+    connection.execute(f"PRAGMA user_version = {load_generation(connection) + 1}")
+
+
+def validity_token(connection):
+    (data_version,) = connection.execute("PRAGMA data_version").fetchone()
+    return data_version, connection.total_changes, load_generation(connection)
+
+
+class QueryCache:
+    """Thread-safe LRU of fetched result rows for one connection."""
+
+    def __init__(self, connection, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.connection = connection
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._token = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bypassed = 0
+
+    def _check_token(self):
+        token = validity_token(self.connection)
+        if token != self._token:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._token = token
+
+    def _store(self, key, entry, size):
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (entry, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def fetch(self, sql, parameters=()):
+        """Return (rows, description) for a read query, from the cache when valid."""
+        normalized = normalize_sql(sql)
+        if not is_cacheable(normalized):
+            with self._lock:
+                self.bypassed += 1
+            cursor = self.connection.execute(sql, parameters)
+            return cursor.fetchall(), cursor.description
+
+        key = (normalized, parameters_key(parameters))
+        with self._lock:
+            self._check_token()
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+            cursor = self.connection.execute(sql, parameters)
+            entry = (cursor.fetchall(), cursor.description)
+            self._store(key, entry, estimate_size(entry[0]))
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._token = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bypassed": self.bypassed,
+            }
+
+
+class CachedResult:
+    """Cursor-like view over cached rows (fetchone/fetchmany/fetchall/iteration)."""
+
+    def __init__(self, rows, description):
+        self.description = description
+        self._rows = rows
+        self._position = 0
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows) - self._position)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+class CachedConnection:
+    """Connection wrapper whose execute() answers read queries from a QueryCache.
+
+    Writes and PRAGMAs go straight to the wrapped connection; every other
+    attribute is delegated to it.
+    """
+
+    def __init__(self, connection, cache=None, **cache_options):
+        self.connection = connection
+        self.cache = cache if cache is not None else QueryCache(connection, **cache_options)
+
+    def execute(self, sql, parameters=()):
+        if not is_cacheable(normalize_sql(sql)):
+            return self.connection.execute(sql, parameters)
+        rows, description = self.cache.fetch(sql, parameters)
+        return CachedResult(rows, description)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Pre-aggregated daily rollups over the ecommerce fact tables.
+
+The ingester rebuilds the rollup tables after a full load. During incremental
+loads, temporary triggers collect every day whose rows were inserted or
+changed, and refresh_rollups() re-aggregates only those days. The query helpers
+below answer the usual dashboard questions from the rollups alone.
+"""
+
+import argparse
+from pathlib import Path
+
+from ecommerce_db import connect_read_only, money_column, money_definition
+
+ROLLUP_TABLES = (
+    "daily_sales_by_category",
+    "city_revenue_daily",
+    "payment_method_stats",
+    "product_sales_daily",
+)
+DIRTY_DAYS_TABLE = "rollup_dirty_days"
+
+# Payment stats are keyed by transaction day; refreshing a day looks payments
+# up through this index instead of scanning the table.
+ROLLUP_INDEXES = (
+    ("idx_payments_transaction_timestamp", "payments", ("transaction_timestamp",)),
+)
+
+ROLLUP_SCHEMA = """
+CREATE TABLE {exists}daily_sales_by_category(
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    orders INTEGER NOT NULL,
+    items INTEGER NOT NULL,
+    units INTEGER NOT NULL,
+    {revenue} NOT NULL,
+    PRIMARY KEY(day, category)
+) WITHOUT ROWID;
+
+CREATE TABLE {exists}city_revenue_daily(
+    day TEXT NOT NULL,
+    city TEXT NOT NULL,
+    orders INTEGER NOT NULL,
+    {revenue} NOT NULL,
+    PRIMARY KEY(day, city)
+) WITHOUT ROWID;
+
+CREATE TABLE {exists}payment_method_stats(
+    day TEXT NOT NULL,
+    payment_method TEXT NOT NULL,
+    payments INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    {amount} NOT NULL,
+    {success_amount} NOT NULL,
+    PRIMARY KEY(day, payment_method)
+) WITHOUT ROWID;
+
+CREATE TABLE {exists}product_sales_daily(
+    day TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    units INTEGER NOT NULL,
+    {revenue} NOT NULL,
+    PRIMARY KEY(day, product_id)
+) WITHOUT ROWID;
+"""
+
+# "{days_orders}"/"{days_payments}" are empty (full rebuild) or a join restricting the driving
+# table to the dirty days through its timestamp index.
+ROLLUP_INSERTS = {
+    "daily_sales_by_category": """
+        INSERT INTO daily_sales_by_category(day, category, orders, items, units, {revenue})
+        SELECT substr(o.order_date, 1, 10), p.category, COUNT(DISTINCT o.order_id), COUNT(*),
+               SUM(oi.quantity), {sum_subtotal}
+        FROM orders AS o {days_orders}
+        JOIN order_items AS oi ON oi.order_id = o.order_id
+        JOIN products AS p ON p.product_id = oi.product_id
+        GROUP BY 1, 2
+    """,
+    "city_revenue_daily": """
+        INSERT INTO city_revenue_daily(day, city, orders, {revenue})
+        SELECT substr(o.order_date, 1, 10), o.city, COUNT(*), {sum_total}
+        FROM orders AS o {days_orders}
+        GROUP BY 1, 2
+    """,
+    "payment_method_stats": """
+        INSERT INTO payment_method_stats(
+            day, payment_method, payments, successes, {amount}, {success_amount}
+        )
+        SELECT substr(pay.transaction_timestamp, 1, 10), pay.payment_method, COUNT(*),
+               SUM(pay.payment_status = 'success'), {sum_amount}, {sum_success_amount}
+        FROM payments AS pay {days_payments}
+        GROUP BY 1, 2
+    """,
+    "product_sales_daily": """
+        INSERT INTO product_sales_daily(day, product_id, units, {revenue})
+        SELECT substr(o.order_date, 1, 10), oi.product_id, SUM(oi.quantity), {sum_subtotal}
+        FROM orders AS o {days_orders}
+        JOIN order_items AS oi ON oi.order_id = o.order_id
+        GROUP BY 1, 2
+    """,
+}
+
+DAYS_JOIN = (
+    "JOIN (SELECT DISTINCT day FROM temp.{dirty}) AS d ON {alias}.{column} >= d.day "
+    "AND {alias}.{column} < date(d.day, '+1 day')"
+)
+
+# Temporary (connection-local) triggers recording the days touched by an
+# incremental load. Updates record both the old and the new day. The table has
+# no unique key: the upsert that fires the UPDATE triggers imposes its own
+# conflict handling on them, so INSERT OR IGNORE (or ON CONFLICT IGNORE) would
+# still fail on a repeated day. Readers take DISTINCT days instead.
+DIRTY_DAY_TRIGGERS = """
+CREATE TEMP TABLE IF NOT EXISTS {dirty}(day TEXT NOT NULL);
+
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_orders_insert AFTER INSERT ON main.orders BEGIN
+    INSERT INTO {dirty}(day) VALUES (substr(NEW.order_date, 1, 10));
+END;
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_orders_update AFTER UPDATE ON main.orders BEGIN
+    INSERT INTO {dirty}(day)
+    VALUES (substr(OLD.order_date, 1, 10)), (substr(NEW.order_date, 1, 10));
+END;
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_items_insert AFTER INSERT ON main.order_items BEGIN
+    INSERT INTO {dirty}(day)
+    SELECT substr(order_date, 1, 10) FROM main.orders WHERE order_id = NEW.order_id;
+END;
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_items_update AFTER UPDATE ON main.order_items BEGIN
+    INSERT INTO {dirty}(day)
+    SELECT substr(order_date, 1, 10) FROM main.orders
+    WHERE order_id IN (OLD.order_id, NEW.order_id);
+END;
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_products_update
+AFTER UPDATE OF category ON main.products WHEN OLD.category IS NOT NEW.category BEGIN
+    INSERT INTO {dirty}(day)
+    SELECT DISTINCT substr(o.order_date, 1, 10)
+    FROM main.order_items AS oi JOIN main.orders AS o ON o.order_id = oi.order_id
+    WHERE oi.product_id = NEW.product_id;
+END;
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_payments_insert AFTER INSERT ON main.payments BEGIN
+    INSERT INTO {dirty}(day) VALUES (substr(NEW.transaction_timestamp, 1, 10));
+END;
+CREATE TEMP TRIGGER IF NOT EXISTS rollup_payments_update AFTER UPDATE ON main.payments BEGIN
+    INSERT INTO {dirty}(day)
+    VALUES (substr(OLD.transaction_timestamp, 1, 10)), (substr(NEW.transaction_timestamp, 1, 10));
+END;
+"""
+
+
+def money_sum(expression, money_mode):
+    """SUM() of a money expression; REAL sums are rounded back to cents."""
+    if money_mode == "cents":
+        return f"SUM({expression})"
+    return f"ROUND(SUM({expression}), 2)"
+
+
+def rollups_exist(connection):
+    placeholders = ", ".join("?" for _ in ROLLUP_TABLES)
+    (found,) = connection.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        ROLLUP_TABLES,
+    ).fetchone()
+    return found == len(ROLLUP_TABLES)
+
+
+def rollup_money_mode(connection):
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(city_revenue_daily)")}
+    return "cents" if "revenue_cents" in columns else "decimal"
+
+
+def create_rollup_tables(connection, money_mode="decimal", if_not_exists=False):
+    """Create the rollup tables statement by statement, inside any open transaction.
+
+    executescript() would commit first, which breaks the single-transaction --bulk load.
+    """
+    schema = ROLLUP_SCHEMA.format(
+        exists="IF NOT EXISTS " if if_not_exists else "",
+        revenue=money_definition("revenue", money_mode),
+        amount=money_definition("amount", money_mode),
+        success_amount=money_definition("success_amount", money_mode),
+    )
+    for statement in schema.split(";"):
+        if statement.strip():
+            connection.execute(statement)
+    for name, table_name, columns in ROLLUP_INDEXES:
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table_name}({', '.join(columns)})"
+        )
+
+
+def drop_rollup_tables(connection):
+    for table_name in ROLLUP_TABLES:
+        connection.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+
+def rollup_inserts(money_mode="decimal", dirty_only=False):
+    subtotal = money_column("subtotal", money_mode)
+    amount = money_column("amount", money_mode)
+    if dirty_only:
+        days_orders = DAYS_JOIN.format(dirty=DIRTY_DAYS_TABLE, alias="o", column="order_date")
+        days_payments = DAYS_JOIN.format(
+            dirty=DIRTY_DAYS_TABLE, alias="pay", column="transaction_timestamp"
+        )
+    else:
+        days_orders = days_payments = ""
+    values = {
+        "revenue": money_column("revenue", money_mode),
+        "amount": amount,
+        "success_amount": money_column("success_amount", money_mode),
+        "sum_subtotal": money_sum(f"oi.{subtotal}", money_mode),
+        "sum_total": money_sum(f"o.{money_column('total_amount', money_mode)}", money_mode),
+        "sum_amount": money_sum(f"pay.{amount}", money_mode),
+        "sum_success_amount": money_sum(
+            f"CASE WHEN pay.payment_status = 'success' THEN pay.{amount} ELSE 0 END", money_mode
+        ),
+        "days_orders": days_orders,
+        "days_payments": days_payments,
+    }
+    return {table_name: sql.format(**values) for table_name, sql in ROLLUP_INSERTS.items()}
+
+
+def rebuild_rollups(connection, money_mode="decimal"):
+    """Recreate and fully repopulate every rollup table (after a full load)."""
+    drop_rollup_tables(connection)
+    create_rollup_tables(connection, money_mode)
+    for sql in rollup_inserts(money_mode).values():
+        connection.execute(sql)
+
+
+def track_rollup_changes(connection):
+    """Install the temporary dirty-day triggers; call before the load's transaction starts."""
+    connection.executescript(DIRTY_DAY_TRIGGERS.format(dirty=DIRTY_DAYS_TABLE))
+
+
+def refresh_rollups(connection, money_mode="decimal"):
+    """Re-aggregate the days collected by the dirty-day triggers; returns their count.
+
+    Runs inside the caller's transaction, so the rollups commit together with
+    the fact rows they summarise.
+    """
+    (dirty_days,) = connection.execute(
+        f"SELECT COUNT(DISTINCT day) FROM temp.{DIRTY_DAYS_TABLE}"
+    ).fetchone()
+    if not dirty_days:
+        return 0
+    for table_name in ROLLUP_TABLES:
+        connection.execute(
+            f"DELETE FROM {table_name} WHERE day IN (SELECT day FROM temp.{DIRTY_DAYS_TABLE})"
+        )
+    for sql in rollup_inserts(money_mode, dirty_only=True).values():
+        connection.execute(sql)
+    connection.execute(f"DELETE FROM temp.{DIRTY_DAYS_TABLE}")
+    return dirty_days
+
+
+def day_range_filter(start=None, end=None, column="day"):
+    """(SQL predicate, parameters) for an inclusive YYYY-MM-DD day range."""
+    predicates = []
+    parameters = []
+    if start is not None:
+        predicates.append(f"{column} >= ?")
+        parameters.append(start)
+    if end is not None:
+        predicates.append(f"{column} <= ?")
+        parameters.append(end)
+    return " AND ".join(predicates) or "1 = 1", parameters
+
+
+def daily_revenue(connection, start=None, end=None, city=None):
+    """[(day, orders, revenue)] for every day in range, optionally for one city."""
+    revenue = money_column("revenue", rollup_money_mode(connection))
+    where, parameters = day_range_filter(start, end)
+    if city is not None:
+        where += " AND city = ?"
+        parameters.append(city)
+    return connection.execute(
+        f"""
+        SELECT day, SUM(orders), SUM({revenue}) FROM city_revenue_daily
+        WHERE {where} GROUP BY day ORDER BY day
+        """,
+        parameters,
+    ).fetchall()
+
+
+def revenue_by_city(connection, start=None, end=None, limit=None):
+    """[(city, orders, revenue)] ordered by revenue, highest first."""
+    revenue = money_column("revenue", rollup_money_mode(connection))
+    where, parameters = day_range_filter(start, end)
+    return connection.execute(
+        f"""
+        SELECT city, SUM(orders), SUM({revenue}) AS total FROM city_revenue_daily
+        WHERE {where} GROUP BY city ORDER BY total DESC, city
+        LIMIT {int(limit) if limit else -1}
+        """,
+        parameters,
+    ).fetchall()
+
+
+def revenue_by_category(connection, start=None, end=None):
+    """[(category, items, units, revenue)] ordered by revenue, highest first."""
+    revenue = money_column("revenue", rollup_money_mode(connection))
+    where, parameters = day_range_filter(start, end)
+    return connection.execute(
+        f"""
+        SELECT category, SUM(items), SUM(units), SUM({revenue}) AS total
+        FROM daily_sales_by_category
+        WHERE {where} GROUP BY category ORDER BY total DESC, category
+        """,
+        parameters,
+    ).fetchall()
+
+
+def payment_method_success_rates(connection, start=None, end=None):
+    """[(payment_method, payments, successes, success_rate)] ordered by method."""
+    where, parameters = day_range_filter(start, end)
+    return connection.execute(
+        f"""
+        SELECT payment_method, SUM(payments), SUM(successes),
+               ROUND(1.0 * SUM(successes) / SUM(payments), 4)
+        FROM payment_method_stats
+        WHERE {where} GROUP BY payment_method ORDER BY payment_method
+        """,
+        parameters,
+    ).fetchall()
+
+
+def top_products(connection, start=None, end=None, limit=10):
+    """[(product_id, name, units, revenue)] for the best-selling products by revenue."""
+    revenue = money_column("revenue", rollup_money_mode(connection))
+    where, parameters = day_range_filter(start, end, "s.day")
+    return connection.execute(
+        f"""
+        SELECT s.product_id, p.name, s.units, s.total
+        FROM (
+            SELECT product_id, SUM(units) AS units, SUM({revenue}) AS total
+            FROM product_sales_daily AS s
+            WHERE {where} GROUP BY product_id
+            ORDER BY total DESC, product_id LIMIT ?
+        ) AS s
+        JOIN products AS p ON p.product_id = s.product_id
+        ORDER BY s.total DESC, s.product_id
+        """,
+        [*parameters, int(limit)],
+    ).fetchall()
+
+
+REPORTS = {
+    "daily-revenue": daily_revenue,
+    "revenue-by-city": revenue_by_city,
+    "revenue-by-category": revenue_by_category,
+    "payment-methods": payment_method_success_rates,
+    "top-products": top_products,
+}
+
+
+def parse_args(argv=None):
+    root_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("report", choices=sorted(REPORTS), help="Question to answer from the rollups.")
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=root_dir / "database" / "ecommerce.db",
+        help="SQLite file loaded with --rollups.",
+    )
+    parser.add_argument("--start", default=None, help="First day (YYYY-MM-DD), inclusive.")
+    parser.add_argument("--end", default=None, help="Last day (YYYY-MM-DD), inclusive.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    connection = connect_read_only(args.database)
+    try:
+        if not rollups_exist(connection):
+            raise ValueError(f"{args.database} has no rollup tables; load it with --rollups")
+        for row in REPORTS[args.report](connection, args.start, args.end):
+            print("\t".join("" if value is None else str(value) for value in row))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
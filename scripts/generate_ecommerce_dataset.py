@@ -3,13 +3,23 @@
 
 from __future__ import annotations
 
+import argparse
+import bisect
 import csv
+import hashlib
 import random
-import uuid
+import itertools
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from decimal import Decimal, getcontext
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import ecommerce_instrumentation as instrumentation
+from ecommerce_columnar import ColumnarTableWriter, table_dir
+from ecommerce_io import COMPRESSIONS, csv_name, open_csv, remove_stale_variants
 
 SEED = 42
 getcontext().prec = 28
@@ -18,6 +28,11 @@ OUTPUT_DIR = Path(__file__).resolve().parent / "ecommerce_dataset"
 DATE_RANGE_START = datetime(2022, 1, 1, 6, 0, 0)
 DATE_RANGE_END = datetime(2024, 12, 31, 22, 0, 0)
 
+BASE_CUSTOMERS = 1500
+BASE_ORDERS = 1500
+BASE_ITEM_RANGE = (4000, 6000)
+MAX_ITEMS_PER_ORDER = 5
+
 CATEGORY_PLAN = {
     "electronics": 60,
     "fashion": 75,
@@ -236,11 +251,166 @@ STREET_NAMES = [
 LOCALITY_SUFFIXES = ["Layout", "Enclave", "Nagar", "Heights", "Residency", "Gardens", "Phase", "Vista"]
 EMAIL_DOMAINS = ["gmail.com", "outlook.com", "yahoo.com"]
 
+CUSTOMER_FIELDS = [
+    "customer_id",
+    "full_name",
+    "email",
+    "phone",
+    "address",
+    "city",
+    "state",
+    "country",
+    "created_at",
+]
+PRODUCT_FIELDS = [
+    "product_id",
+    "name",
+    "category",
+    "sub_category",
+    "price",
+    "stock_quantity",
+    "added_at",
+]
+ORDER_FIELDS = [
+    "order_id",
+    "customer_id",
+    "order_date",
+    "total_amount",
+    "status",
+    "city",
+    "state",
+    "country",
+]
+ORDER_ITEM_FIELDS = [
+    "order_item_id",
+    "order_id",
+    "product_id",
+    "quantity",
+    "item_price",
+    "subtotal",
+]
+PAYMENT_FIELDS = [
+    "payment_id",
+    "order_id",
+    "payment_method",
+    "amount",
+    "payment_status",
+    "transaction_timestamp",
+]
+TABLE_NAMES = ("customers", "products", "orders", "order_items", "payments")
+
+MONEY_MODES = ("decimal", "cents")
+# "uuid" ids are RFC 4122 version-4 strings drawn from a seeded RNG; "integer"
+# ids count up from 1 per table.
+ID_STYLES = ("uuid", "integer")
+# Columns written as "<name>_cents" integers when money == "cents".
+MONEY_FIELDS = {"price", "total_amount", "item_price", "subtotal", "amount"}
+# "columnar" writes <output-dir>/columnar/<table>/ (see ecommerce_columnar).
+OUTPUT_FORMATS = ("csv", "columnar", "both")
+
+# (customer_id, city, state, country): the only customer columns orders need.
+CustomerRef = Tuple[str, str, str, str]
+OrderBundle = Tuple[Dict[str, object], List[Dict[str, object]], Dict[str, object]]
+IdFactory = Callable[[], str]
+UUID_CLEAR_MASK = ~((0xF000 << 64) | (0xC000 << 48))
+UUID_V4_BITS = (0x4000 << 64) | (0x8000 << 48)
+RowWriter = Callable[[Dict[str, object]], None]
+
+
+class DatasetSize(NamedTuple):
+    customers: int
+    category_plan: Dict[str, int]
+    orders: int
+    item_range: Tuple[int, int]
+
+
+def scale_count(base: int, scale_factor: float) -> int:
+    return max(1, int(round(base * scale_factor)))
+
+
+def dataset_size(scale_factor: float = 1.0) -> DatasetSize:
+    """Row counts for a TPC-H style scale factor; 1.0 is the reference dataset."""
+    if scale_factor <= 0:
+        raise ValueError(f"Scale factor must be positive, got {scale_factor}")
+    num_orders = scale_count(BASE_ORDERS, scale_factor)
+    low, high = (scale_count(bound, scale_factor) for bound in BASE_ITEM_RANGE)
+    max_items = num_orders * MAX_ITEMS_PER_ORDER
+    item_range = (min(max(low, num_orders), max_items), min(max(high, num_orders), max_items))
+    return DatasetSize(
+        customers=scale_count(BASE_CUSTOMERS, scale_factor),
+        category_plan={
+            category: scale_count(count, scale_factor) for category, count in CATEGORY_PLAN.items()
+        },
+        orders=num_orders,
+        item_range=item_range,
+    )
+
 
-def make_rng() -> random.Random:
+def make_rng(stream: str = "") -> random.Random:
+    if stream:
+        return random.Random(f"{SEED}:{stream}")
     return random.Random(SEED)
 
 
+def derive_seed(stream: str, shard: int, digest_size: int = 8) -> int:
+    """Stable seed for one shard (or row index) of one RNG stream, identical across processes."""
+    digest = hashlib.blake2b(
+        f"{SEED}:{stream}:{shard}".encode("ascii"), digest_size=digest_size
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shard_rng(stream: str, shard: int) -> random.Random:
+    return random.Random(derive_seed(stream, shard))
+
+
+def uuid_text(bits: int) -> str:
+    """Version-4 UUID text for 128 random bits; same as str(uuid.UUID(int=bits, version=4))."""
+    # Force the version nibble to 4 and the variant bits to 10.
+    h = f"{bits & UUID_CLEAR_MASK | UUID_V4_BITS:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def seeded_uuid_factory(rng: random.Random) -> IdFactory:
+    """Version-4 UUID strings from rng."""
+    getrandbits = rng.getrandbits
+    return lambda: uuid_text(getrandbits(128))
+
+
+def integer_id_factory(start: int = 0) -> IdFactory:
+    """Ids start + 1, start + 2, ... as text."""
+    counter = itertools.count(start + 1)
+    return lambda: str(next(counter))
+
+
+def id_factory(
+    table: str, shard: Optional[int] = None, style: str = "uuid", start: int = 0
+) -> IdFactory:
+    """Reproducible ids for one table (or one shard of it).
+
+    Integer ids begin after `start`, which sharded callers set to the shard's
+    first global row so shards never overlap.
+    """
+    if style == "integer":
+        return integer_id_factory(start)
+    if style != "uuid":
+        raise ValueError(f"Unknown id style {style!r}; expected one of {ID_STYLES}")
+    rng = make_rng(f"{table}:ids") if shard is None else shard_rng(f"{table}:ids", shard)
+    return seeded_uuid_factory(rng)
+
+
+def shard_ranges(total: int, shards: int) -> List[Tuple[int, int]]:
+    """Split range(total) into contiguous (start, count) pieces of near-equal size."""
+    base, remainder = divmod(total, shards)
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    for shard in range(shards):
+        count = base + (1 if shard < remainder else 0)
+        ranges.append((start, count))
+        start += count
+    return ranges
+
+
 def slugify(value: str) -> str:
     clean_chars: List[str] = []
     previous_dash = False
@@ -307,54 +477,124 @@ def weighted_choice(rng: random.Random, options: Sequence[Tuple[str, float]]) ->
     return options[-1][0]
 
 
-def generate_customers(num_customers: int = 1500) -> List[Dict[str, str]]:
-    rng = make_rng()
-    customers: List[Dict[str, str]] = []
-    used_emails = set()
-    used_phones = set()
-    for idx in range(num_customers):
+def iter_customers(
+    num_customers: int = BASE_CUSTOMERS,
+    start_index: int = 0,
+    shard: Optional[int] = None,
+    id_style: str = "uuid",
+) -> Iterator[Dict[str, str]]:
+    rng = make_rng() if shard is None else shard_rng("customers", shard)
+    check_phone_capacity(start_index + num_customers)
+    for idx in range(start_index, start_index + num_customers):
+        customer_id, city, state, country = customer_ref_at(idx, id_style)
         first = rng.choice(FIRST_NAMES)
         last = rng.choice(LAST_NAMES)
         full_name = f"{first} {last}"
-        slug = slugify(full_name)
+        # Slugs never contain ".", so the ".<idx>" suffix alone makes emails unique.
         domain = EMAIL_DOMAINS[idx % len(EMAIL_DOMAINS)]
-        email_candidate = f"{slug}.{idx + 1}@{domain}"
-        if email_candidate in used_emails:
-            email_candidate = f"{slug}.{idx + 1}.{rng.randint(10, 99)}@{domain}"
-        used_emails.add(email_candidate)
-
-        phone = create_phone_number(rng, idx, used_phones)
+        email = f"{slugify(full_name)}.{idx + 1}@{domain}"
+        phone = create_phone_number(idx)
 
-        location = rng.choice(CITY_OPTIONS)
         address = generate_address(rng)
         created_at = random_datetime_in_range(rng, DATE_RANGE_START, DATE_RANGE_END)
 
-        customers.append(
-            {
-                "customer_id": str(uuid.uuid4()),
-                "full_name": full_name,
-                "email": email_candidate,
-                "phone": phone,
-                "address": address,
-                "city": location["city"],
-                "state": location["state"],
-                "country": location["country"],
-                "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            }
+        yield {
+            "customer_id": customer_id,
+            "full_name": full_name,
+            "email": email,
+            "phone": phone,
+            "address": address,
+            "city": city,
+            "state": state,
+            "country": country,
+            "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+
+def generate_customers(
+    num_customers: int = BASE_CUSTOMERS, id_style: str = "uuid"
+) -> List[Dict[str, str]]:
+    return list(iter_customers(num_customers, id_style=id_style))
+
+
+def customer_ref(customer: Dict[str, str]) -> CustomerRef:
+    return (customer["customer_id"], customer["city"], customer["state"], customer["country"])
+
+
+def customer_ref_at(index: int, id_style: str = "uuid") -> CustomerRef:
+    """Id and location of a global customer index, derived from (SEED, index) alone.
+
+    Orders need only these columns, so order generators can look any customer
+    up by index instead of keeping one reference per customer in memory.
+    """
+    uuid_bits, choice_bits = divmod(derive_seed("customers:ref", index, 24), 1 << 64)
+    location = CITY_OPTIONS[choice_bits % len(CITY_OPTIONS)]
+    customer_id = str(index + 1) if id_style == "integer" else uuid_text(uuid_bits)
+    return (customer_id, location["city"], location["state"], location["country"])
+
+
+class CustomerRefs(Sequence[CustomerRef]):
+    """customer_ref_at() for indexes 0 .. count - 1; holds nothing per customer."""
+
+    def __init__(self, count: int, id_style: str = "uuid") -> None:
+        self.count = count
+        self.id_style = id_style
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> CustomerRef:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return customer_ref_at(index, self.id_style)
+
+
+def phone_permutation(code: str, length: int) -> Tuple[int, int]:
+    """Seeded (multiplier, offset) of an affine bijection on 0 .. 10**length - 1.
+
+    A multiplier coprime to 10 makes k -> (multiplier * k + offset) % 10**length a
+    permutation, so distinct k always give distinct numbers.
+    """
+    modulus = 10**length
+    seed = derive_seed(f"phones:{code}", length)
+    multiplier = (seed % modulus) | 1
+    if multiplier % 5 == 0:
+        multiplier = (multiplier + 2) % modulus
+    return multiplier, (seed >> 32) % modulus
+
+
+PHONE_PERMUTATIONS = [phone_permutation(code, length) for code, length in PHONE_PATTERNS]
+
+
+def phone_capacity() -> int:
+    """Customers that fit before some pattern would run out of distinct numbers."""
+    return min(
+        10**length * len(PHONE_PATTERNS) + position
+        for position, (_, length) in enumerate(PHONE_PATTERNS)
+    )
+
+
+def check_phone_capacity(num_customers: int) -> None:
+    if num_customers > phone_capacity():
+        raise ValueError(
+            f"{num_customers} customers exceed the {phone_capacity()} unique phone numbers "
+            "available in PHONE_PATTERNS"
         )
-    return customers
 
 
-def create_phone_number(rng: random.Random, seed_idx: int, used: set) -> str:
-    attempts = 0
-    while True:
-        code, length = PHONE_PATTERNS[(seed_idx + attempts) % len(PHONE_PATTERNS)]
-        digits = "".join(str(rng.randint(0, 9)) for _ in range(length))
-        number = f"{code}-{digits}"
-        if number not in used:
-            used.add(number)
-            return number
-        attempts += 1
+def create_phone_number(customer_index: int) -> str:
+    """Phone number for a global customer index; unique for every index below phone_capacity().
+
+    Indexes are dealt round-robin over PHONE_PATTERNS and the position within
+    a pattern goes through that pattern's seeded permutation, so no lookup of
+    earlier numbers is needed and shards agree without coordination.
+    """
+    pattern = customer_index % len(PHONE_PATTERNS)
+    code, length = PHONE_PATTERNS[pattern]
+    multiplier, offset = PHONE_PERMUTATIONS[pattern]
+    position = customer_index // len(PHONE_PATTERNS)
+    number = (multiplier * position + offset) % 10**length
+    return f"{code}-{number:0{length}d}"
 
 
 def generate_address(rng: random.Random) -> str:
@@ -365,13 +605,56 @@ def generate_address(rng: random.Random) -> str:
     return f"{number} {street}, Block {block}, {suffix}"
 
 
-def generate_products(num_products: int = 300) -> List[Dict[str, object]]:
+def product_ref_at(
+    index: int, category: str, id_style: str = "uuid", money: str = "decimal"
+) -> Dict[str, object]:
+    """product_id and price of a global product index, derived from (SEED, index) alone."""
+    uuid_bits, choice_bits = divmod(derive_seed("products:ref", index, 24), 1 << 64)
+    min_cents, max_cents = CATEGORY_SPECS[category]["price_range_cents"]
+    price_cents = min_cents + choice_bits % (max_cents - min_cents + 1)
+    return {
+        "product_id": str(index + 1) if id_style == "integer" else uuid_text(uuid_bits),
+        "price": price_cents if money == "cents" else Decimal(price_cents) / Decimal("100"),
+    }
+
+
+class ProductRefs(Sequence[Dict[str, object]]):
+    """product_ref_at() for every product in category_plan; holds nothing per product."""
+
+    def __init__(
+        self,
+        category_plan: Dict[str, int] = CATEGORY_PLAN,
+        id_style: str = "uuid",
+        money: str = "decimal",
+    ) -> None:
+        self.categories = list(category_plan)
+        self.ends = list(itertools.accumulate(category_plan.values()))
+        self.id_style = id_style
+        self.money = money
+
+    def __len__(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def __getitem__(self, index: int) -> Dict[str, object]:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        category = self.categories[bisect.bisect_right(self.ends, index)]
+        return product_ref_at(index, category, self.id_style, self.money)
+
+
+def iter_products(
+    category_plan: Dict[str, int] = CATEGORY_PLAN,
+    id_style: str = "uuid",
+    money: str = "decimal",
+) -> Iterator[Dict[str, object]]:
     rng = make_rng()
-    products: List[Dict[str, object]] = []
     counters: Dict[Tuple[str, str, str], int] = {}
-    for category, target_count in CATEGORY_PLAN.items():
+    index = 0
+    for category, target_count in category_plan.items():
         spec = CATEGORY_SPECS[category]
         for _ in range(target_count):
+            ref = product_ref_at(index, category, id_style, money)
+            index += 1
             sub_category = rng.choice(spec["sub_categories"])
             brand = rng.choice(spec["brands"])
             model = rng.choice(spec["models"])
@@ -379,110 +662,188 @@ def generate_products(num_products: int = 300) -> List[Dict[str, object]]:
             counters[key] = counters.get(key, 0) + 1
             suffix = counters[key]
             name = f"{brand} {model} {sub_category.title()} {suffix}"
-            min_cents, max_cents = spec["price_range_cents"]
-            price_cents = rng.randint(min_cents, max_cents)
-            price = Decimal(price_cents) / Decimal("100")
             stock_quantity = rng.randint(5, 500)
             added_at = random_datetime_in_range(rng, DATE_RANGE_START, DATE_RANGE_END)
-            products.append(
-                {
-                    "product_id": str(uuid.uuid4()),
-                    "name": name,
-                    "category": category,
-                    "sub_category": sub_category,
-                    "price": price,
-                    "stock_quantity": stock_quantity,
-                    "added_at": added_at.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            )
-    return products
+            yield {
+                "product_id": ref["product_id"],
+                "name": name,
+                "category": category,
+                "sub_category": sub_category,
+                "price": ref["price"],
+                "stock_quantity": stock_quantity,
+                "added_at": added_at.strftime("%Y-%m-%d %H:%M:%S"),
+            }
 
 
-def generate_orders(customers: Sequence[Dict[str, str]], num_orders: int = 1500) -> List[Dict[str, object]]:
+def generate_products(
+    category_plan: Dict[str, int] = CATEGORY_PLAN,
+    id_style: str = "uuid",
+    money: str = "decimal",
+) -> List[Dict[str, object]]:
+    return list(iter_products(category_plan, id_style, money))
+
+
+def build_order(rng: random.Random, customer: CustomerRef, new_id: IdFactory) -> Dict[str, object]:
+    customer_id, city, state, country = customer
+    order_datetime = pick_order_datetime(rng)
+    status = weighted_choice(rng, ORDER_STATUS_WEIGHTS)
+    return {
+        "order_id": new_id(),
+        "customer_id": customer_id,
+        "order_date": order_datetime,
+        "total_amount": 0,
+        "status": status,
+        "city": city,
+        "state": state,
+        "country": country,
+    }
+
+
+def generate_orders(
+    customers: Sequence[Dict[str, str]], num_orders: int = BASE_ORDERS, id_style: str = "uuid"
+) -> List[Dict[str, object]]:
     rng = make_rng()
+    new_id = id_factory("orders", style=id_style)
     orders: List[Dict[str, object]] = []
     for _ in range(num_orders):
         customer = rng.choice(customers)
-        order_datetime = pick_order_datetime(rng)
-        status = weighted_choice(rng, ORDER_STATUS_WEIGHTS)
-        order = {
-            "order_id": str(uuid.uuid4()),
-            "customer_id": customer["customer_id"],
-            "order_date": order_datetime,
-            "total_amount": Decimal("0"),
-            "status": status,
-            "city": customer["city"],
-            "state": customer["state"],
-            "country": customer["country"],
-        }
-        orders.append(order)
+        orders.append(build_order(rng, customer_ref(customer), new_id))
     return orders
 
 
-def allocate_item_counts(num_orders: int, rng: random.Random) -> List[int]:
-    counts = [1] * num_orders
-    target_total = rng.randint(4000, 6000)
-    total_items = num_orders
-    adjustable_indices = list(range(num_orders))
-    while total_items < target_total:
-        idx = rng.choice(adjustable_indices)
-        if counts[idx] < 5:
-            counts[idx] += 1
-            total_items += 1
-        else:
-            adjustable_indices.remove(idx)
-            if not adjustable_indices:
-                break
-    return counts
+def iter_item_counts(
+    num_orders: int, rng: random.Random, item_range: Tuple[int, int] = BASE_ITEM_RANGE
+) -> Iterator[int]:
+    """Yield 1-5 items per order so the total lands on a seeded target in item_range.
+
+    Every order beyond its first item owns four optional "slots"; exactly
+    (target - num_orders) of them are picked by selection sampling, which
+    visits each slot once. That keeps allocation linear and lets it stream.
+    """
+    slots_per_order = MAX_ITEMS_PER_ORDER - 1
+    target_total = rng.randint(*item_range)
+    slots_left = num_orders * slots_per_order
+    extra_needed = min(max(target_total - num_orders, 0), slots_left)
+    for _ in range(num_orders):
+        count = 1
+        for _ in range(slots_per_order):
+            if extra_needed and rng.random() * slots_left < extra_needed:
+                count += 1
+                extra_needed -= 1
+            slots_left -= 1
+        yield count
+
+
+def allocate_item_counts(
+    num_orders: int, rng: random.Random, item_range: Tuple[int, int] = BASE_ITEM_RANGE
+) -> List[int]:
+    return list(iter_item_counts(num_orders, rng, item_range))
+
+
+def build_order_items(
+    rng: random.Random,
+    order: Dict[str, object],
+    products: Sequence[Dict[str, object]],
+    item_count: int,
+    new_id: IdFactory,
+) -> List[Dict[str, object]]:
+    items: List[Dict[str, object]] = []
+    for _ in range(item_count):
+        product = rng.choice(products)
+        quantity = rng.randint(1, 3)
+        # Decimal in the default mode, int cents with money == "cents".
+        price = product["price"]
+        subtotal = price * quantity
+        order["total_amount"] += subtotal
+        items.append(
+            {
+                "order_item_id": new_id(),
+                "order_id": order["order_id"],
+                "product_id": product["product_id"],
+                "quantity": quantity,
+                "item_price": price,
+                "subtotal": subtotal,
+            }
+        )
+    return items
 
 
 def generate_order_items(
-    orders: Sequence[Dict[str, object]], products: Sequence[Dict[str, object]]
+    orders: Sequence[Dict[str, object]],
+    products: Sequence[Dict[str, object]],
+    item_range: Tuple[int, int] = BASE_ITEM_RANGE,
+    id_style: str = "uuid",
 ) -> List[Dict[str, object]]:
     rng = make_rng()
-    counts = allocate_item_counts(len(orders), rng)
+    new_id = id_factory("order_items", style=id_style)
+    counts = allocate_item_counts(len(orders), make_rng("item_counts"), item_range)
     order_items: List[Dict[str, object]] = []
     product_choices = list(products)
     for order, item_count in zip(orders, counts):
-        for _ in range(item_count):
-            product = rng.choice(product_choices)
-            quantity = rng.randint(1, 3)
-            price: Decimal = product["price"]
-            subtotal = price * Decimal(quantity)
-            order["total_amount"] += subtotal
-            order_items.append(
-                {
-                    "order_item_id": str(uuid.uuid4()),
-                    "order_id": order["order_id"],
-                    "product_id": product["product_id"],
-                    "quantity": quantity,
-                    "item_price": price,
-                    "subtotal": subtotal,
-                }
-            )
+        order_items.extend(build_order_items(rng, order, product_choices, item_count, new_id))
     return order_items
 
 
-def generate_payments(orders: Sequence[Dict[str, object]]) -> List[Dict[str, object]]:
+def build_payment(
+    rng: random.Random, order: Dict[str, object], new_id: IdFactory
+) -> Dict[str, object]:
+    payment_status = "success" if rng.random() < 0.92 else "failed"
+    payment_method = rng.choice(PAYMENT_METHODS)
+    offset_seconds = rng.randint(5, 180)
+    order_datetime: datetime = order["order_date"]
+    transaction_timestamp = order_datetime + timedelta(seconds=offset_seconds)
+    return {
+        "payment_id": new_id(),
+        "order_id": order["order_id"],
+        "payment_method": payment_method,
+        "amount": order["total_amount"],
+        "payment_status": payment_status,
+        "transaction_timestamp": transaction_timestamp,
+    }
+
+
+def generate_payments(
+    orders: Sequence[Dict[str, object]], id_style: str = "uuid"
+) -> List[Dict[str, object]]:
     rng = make_rng()
-    payments: List[Dict[str, object]] = []
-    for order in orders:
-        payment_status = "success" if rng.random() < 0.92 else "failed"
-        payment_method = rng.choice(PAYMENT_METHODS)
-        offset_seconds = rng.randint(5, 180)
-        order_datetime: datetime = order["order_date"]
-        transaction_timestamp = order_datetime + timedelta(seconds=offset_seconds)
-        payments.append(
-            {
-                "payment_id": str(uuid.uuid4()),
-                "order_id": order["order_id"],
-                "payment_method": payment_method,
-                "amount": order["total_amount"],
-                "payment_status": payment_status,
-                "transaction_timestamp": transaction_timestamp,
-            }
-        )
-    return payments
+    new_id = id_factory("payments", style=id_style)
+    return [build_payment(rng, order, new_id) for order in orders]
+
+
+def iter_order_bundles(
+    customers: Sequence[CustomerRef],
+    products: Sequence[Dict[str, object]],
+    num_orders: int = BASE_ORDERS,
+    item_range: Tuple[int, int] = BASE_ITEM_RANGE,
+    shard: Optional[int] = None,
+    id_style: str = "uuid",
+    order_start: int = 0,
+) -> Iterator[OrderBundle]:
+    """Yield (order, items, payment) one order at a time.
+
+    Each table keeps its own RNG seeded exactly like the list-based generators,
+    so interleaving them per order produces the same rows as
+    generate_orders/generate_order_items/generate_payments. With a shard
+    number every stream, including ids, is seeded from (SEED, table, shard).
+    order_start is the shard's first global order; integer order and payment
+    ids continue from it and item ids from order_start * MAX_ITEMS_PER_ORDER.
+    """
+    if shard is None:
+        order_rng, item_rng, payment_rng = make_rng(), make_rng(), make_rng()
+        count_rng = make_rng("item_counts")
+    else:
+        order_rng = shard_rng("orders", shard)
+        item_rng = shard_rng("order_items", shard)
+        payment_rng = shard_rng("payments", shard)
+        count_rng = shard_rng("item_counts", shard)
+    order_id = id_factory("orders", shard, id_style, order_start)
+    order_item_id = id_factory("order_items", shard, id_style, order_start * MAX_ITEMS_PER_ORDER)
+    payment_id = id_factory("payments", shard, id_style, order_start)
+    for item_count in iter_item_counts(num_orders, count_rng, item_range):
+        order = build_order(order_rng, order_rng.choice(customers), order_id)
+        items = build_order_items(item_rng, order, products, item_count, order_item_id)
+        payment = build_payment(payment_rng, order, payment_id)
+        yield order, items, payment
 
 
 def serialize_row(row: Dict[str, object]) -> Dict[str, object]:
@@ -497,99 +858,482 @@ def serialize_row(row: Dict[str, object]) -> Dict[str, object]:
     return serialized
 
 
-def write_csv(path: Path, headers: Sequence[str], rows: Iterable[Dict[str, object]]) -> None:
-    with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=headers)
-        writer.writeheader()
+def money_headers(fields: Sequence[str], money: str = "decimal") -> List[str]:
+    if money != "cents":
+        return list(fields)
+    return [f"{field}_cents" if field in MONEY_FIELDS else field for field in fields]
+
+
+def write_header(writer: csv.DictWriter, money: str = "decimal") -> None:
+    fields = writer.fieldnames
+    writer.writerow(dict(zip(fields, money_headers(fields, money))))
+
+
+def csv_row_writer(
+    stack: ExitStack, path: Path, headers: Sequence[str], money: str = "decimal"
+) -> RowWriter:
+    handle = stack.enter_context(open_csv(path, "w"))
+    writer = csv.DictWriter(handle, fieldnames=headers)
+    write_header(writer, money)
+    return lambda row: writer.writerow(serialize_row(row))
+
+
+def table_row_writer(
+    stack: ExitStack,
+    output_dir: Path,
+    table: str,
+    headers: Sequence[str],
+    money: str = "decimal",
+    output_format: str = "csv",
+    compression: str = "none",
+) -> RowWriter:
+    """Row writer for <table>.csv[.gz|.bz2|.xz], the columnar table directory, or both.
+
+    Columnar columns take the raw Decimal/int and datetime values, so rows
+    written only in columnar form are never formatted as text.
+    """
+    writers: List[RowWriter] = []
+    if output_format in ("csv", "both"):
+        remove_stale_variants(output_dir, table, compression)
+        path = output_dir / csv_name(table, compression)
+        writers.append(csv_row_writer(stack, path, headers, money))
+    if output_format in ("columnar", "both"):
+        columnar = stack.enter_context(ColumnarTableWriter(table_dir(output_dir, table), table))
+        writers.append(columnar.writerow)
+    if len(writers) == 1:
+        return writers[0]
+
+    def write_row(row: Dict[str, object]) -> None:
+        for writer in writers:
+            writer(row)
+
+    return write_row
+
+
+def write_bundle_rows(
+    bundles: Iterable[OrderBundle],
+    write_order: RowWriter,
+    write_item: RowWriter,
+    write_payment: RowWriter,
+) -> int:
+    """Write each order with its items and payment; returns the rows written."""
+    rows = 0
+    for order, items, payment in bundles:
+        write_order(order)
+        for item in items:
+            write_item(item)
+        write_payment(payment)
+        rows += len(items) + 2
+    return rows
+
+
+def write_csv(
+    path: Path,
+    headers: Sequence[str],
+    rows: Iterable[Dict[str, object]],
+    money: str = "decimal",
+) -> None:
+    with ExitStack() as stack:
+        write_row = csv_row_writer(stack, path, headers, money)
         for row in rows:
-            writer.writerow(serialize_row(row))
+            write_row(row)
+
+
+def write_table(
+    output_dir: Path,
+    table: str,
+    headers: Sequence[str],
+    rows: Iterable[Dict[str, object]],
+    money: str = "decimal",
+    output_format: str = "csv",
+    compression: str = "none",
+) -> None:
+    with ExitStack() as stack:
+        stage = stack.enter_context(instrumentation.current().stage(f"write:{table}"))
+        write_row = table_row_writer(
+            stack, output_dir, table, headers, money, output_format, compression
+        )
+        for row in rows:
+            write_row(row)
+            stage.rows += 1
+
+
+def write_order_tables(
+    orders_path: Path,
+    order_items_path: Path,
+    payments_path: Path,
+    bundles: Iterable[OrderBundle],
+    money: str = "decimal",
+) -> None:
+    with ExitStack() as stack:
+        write_bundle_rows(
+            bundles,
+            csv_row_writer(stack, orders_path, ORDER_FIELDS, money),
+            csv_row_writer(stack, order_items_path, ORDER_ITEM_FIELDS, money),
+            csv_row_writer(stack, payments_path, PAYMENT_FIELDS, money),
+        )
+
+
+def write_order_tables_to(
+    output_dir: Path,
+    bundles: Iterable[OrderBundle],
+    money: str = "decimal",
+    output_format: str = "csv",
+    compression: str = "none",
+) -> None:
+    with ExitStack() as stack:
+        stage = stack.enter_context(
+            instrumentation.current().stage("write:orders+order_items+payments")
+        )
+        writers = [
+            table_row_writer(stack, output_dir, table, fields, money, output_format, compression)
+            for table, fields in (
+                ("orders", ORDER_FIELDS),
+                ("order_items", ORDER_ITEM_FIELDS),
+                ("payments", PAYMENT_FIELDS),
+            )
+        ]
+        stage.rows = write_bundle_rows(bundles, *writers)
+
+
+def write_dataset_streaming(
+    output_dir: Path,
+    size: DatasetSize,
+    money: str = "decimal",
+    output_format: str = "csv",
+    id_style: str = "uuid",
+    compression: str = "none",
+) -> None:
+    """Write all five tables without materialising any table in memory.
+
+    Every row is written as it is built. Orders look customers and products up
+    through CustomerRefs and ProductRefs, which derive the columns they need
+    from the row index, so memory stays flat whatever the scale factor.
+    """
+    write_table(
+        output_dir,
+        "customers",
+        CUSTOMER_FIELDS,
+        iter_customers(size.customers, id_style=id_style),
+        output_format=output_format,
+        compression=compression,
+    )
+    write_table(
+        output_dir,
+        "products",
+        PRODUCT_FIELDS,
+        iter_products(size.category_plan, id_style, money),
+        money,
+        output_format,
+        compression,
+    )
+    write_order_tables_to(
+        output_dir,
+        iter_order_bundles(
+            CustomerRefs(size.customers, id_style),
+            ProductRefs(size.category_plan, id_style, money),
+            size.orders,
+            size.item_range,
+            id_style=id_style,
+        ),
+        money,
+        output_format,
+        compression,
+    )
 
 
-def main() -> None:
-    OUTPUT_DIR.mkdir(exist_ok=True)
+def part_path(output_dir: Path, table: str, shard: int) -> Path:
+    return output_dir / f"{table}.part-{shard:04d}.csv"
 
-    customers = generate_customers()
-    products = generate_products()
-    orders = generate_orders(customers)
-    order_items = generate_order_items(orders, products)
-    payments = generate_payments(orders)
 
-    customers_path = OUTPUT_DIR / "customers.csv"
-    products_path = OUTPUT_DIR / "products.csv"
-    orders_path = OUTPUT_DIR / "orders.csv"
-    order_items_path = OUTPUT_DIR / "order_items.csv"
-    payments_path = OUTPUT_DIR / "payments.csv"
+def shard_item_range(size: DatasetSize, shard_orders: int) -> Tuple[int, int]:
+    low, high = size.item_range
+    return (low * shard_orders // size.orders, high * shard_orders // size.orders)
 
+
+def generate_customer_shard(
+    output_dir: Path, shard: int, start_index: int, count: int, id_style: str = "uuid"
+) -> None:
     write_csv(
-        customers_path,
-        [
-            "customer_id",
-            "full_name",
-            "email",
-            "phone",
-            "address",
-            "city",
-            "state",
-            "country",
-            "created_at",
-        ],
-        customers,
+        part_path(output_dir, "customers", shard),
+        CUSTOMER_FIELDS,
+        iter_customers(count, start_index, shard, id_style),
     )
 
-    write_csv(
-        products_path,
-        [
-            "product_id",
-            "name",
-            "category",
-            "sub_category",
-            "price",
-            "stock_quantity",
-            "added_at",
-        ],
-        products,
+
+def generate_order_shard(
+    output_dir: Path,
+    shard: int,
+    count: int,
+    item_range: Tuple[int, int],
+    customers: Sequence[CustomerRef],
+    products: Sequence[Dict[str, object]],
+    money: str = "decimal",
+    id_style: str = "uuid",
+    order_start: int = 0,
+) -> None:
+    write_order_tables(
+        part_path(output_dir, "orders", shard),
+        part_path(output_dir, "order_items", shard),
+        part_path(output_dir, "payments", shard),
+        iter_order_bundles(
+            customers, products, count, item_range, shard, id_style, order_start
+        ),
+        money,
     )
 
+
+def merge_part_files(
+    output_dir: Path, table: str, shards: int, compression: str = "none"
+) -> None:
+    """Concatenate numbered part files in shard order, keeping one header.
+
+    Parts are always plain CSV; the merged file is compressed while copying.
+    """
+    remove_stale_variants(output_dir, table, compression)
+    with open_csv(output_dir / csv_name(table, compression), "wb") as target:
+        for shard in range(shards):
+            path = part_path(output_dir, table, shard)
+            with path.open("rb") as source:
+                header = source.readline()
+                if shard == 0:
+                    target.write(header)
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            path.unlink()
+
+
+def write_dataset_sharded(
+    output_dir: Path,
+    size: DatasetSize,
+    workers: int,
+    keep_parts: bool = False,
+    money: str = "decimal",
+    id_style: str = "uuid",
+    compression: str = "none",
+) -> None:
+    """Generate customers and orders in `workers` shards on a process pool.
+
+    Shard boundaries and seeds depend only on (SEED, scale, workers), so the
+    merged files are byte-identical between runs with the same triple.
+    Products are always written once in the parent. Order shards receive
+    CustomerRefs/ProductRefs, which pickle as a few counters and derive each
+    referenced row from its index in the worker.
+    """
+    customer_ranges = shard_ranges(size.customers, workers)
+    order_ranges = shard_ranges(size.orders, workers)
+    remove_stale_variants(output_dir, "products", compression)
     write_csv(
-        orders_path,
-        [
-            "order_id",
-            "customer_id",
-            "order_date",
-            "total_amount",
-            "status",
-            "city",
-            "state",
-            "country",
-        ],
-        orders,
+        output_dir / csv_name("products", compression),
+        PRODUCT_FIELDS,
+        iter_products(size.category_plan, id_style, money),
+        money,
     )
-
+    customer_refs = CustomerRefs(size.customers, id_style)
+    product_refs = ProductRefs(size.category_plan, id_style, money)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        customer_futures = [
+            pool.submit(generate_customer_shard, output_dir, shard, start, count, id_style)
+            for shard, (start, count) in enumerate(customer_ranges)
+        ]
+        for future in customer_futures:
+            future.result()
+
+        order_futures = [
+            pool.submit(
+                generate_order_shard,
+                output_dir,
+                shard,
+                count,
+                shard_item_range(size, count),
+                customer_refs,
+                product_refs,
+                money,
+                id_style,
+                start,
+            )
+            for shard, (start, count) in enumerate(order_ranges)
+        ]
+        for future in order_futures:
+            future.result()
+
+    if keep_parts:
+        return
+    for table in ("customers", "orders", "order_items", "payments"):
+        merge_part_files(output_dir, table, workers, compression)
+
+
+def write_dataset_numpy(
+    output_dir: Path,
+    size: DatasetSize,
+    money: str = "decimal",
+    id_style: str = "uuid",
+    compression: str = "none",
+) -> None:
+    """Streaming layout with orders, order_items and payments drawn by the numpy backend."""
+    from generate_ecommerce_numpy import require_order_capacity, write_order_tables_numpy
+
+    require_order_capacity(size.orders)
+    for table in TABLE_NAMES:
+        remove_stale_variants(output_dir, table, compression)
     write_csv(
-        order_items_path,
-        [
-            "order_item_id",
-            "order_id",
-            "product_id",
-            "quantity",
-            "item_price",
-            "subtotal",
-        ],
-        order_items,
+        output_dir / csv_name("customers", compression),
+        CUSTOMER_FIELDS,
+        iter_customers(size.customers, id_style=id_style),
     )
-
     write_csv(
-        payments_path,
-        [
-            "payment_id",
-            "order_id",
-            "payment_method",
-            "amount",
-            "payment_status",
-            "transaction_timestamp",
-        ],
-        payments,
+        output_dir / csv_name("products", compression),
+        PRODUCT_FIELDS,
+        iter_products(size.category_plan, id_style, money),
+        money,
+    )
+    write_order_tables_numpy(
+        output_dir / csv_name("orders", compression),
+        output_dir / csv_name("order_items", compression),
+        output_dir / csv_name("payments", compression),
+        CustomerRefs(size.customers, id_style),
+        ProductRefs(size.category_plan, id_style, money),
+        size.orders,
+        size.item_range,
+        money=money,
+        id_style=id_style,
+    )
+
+
+def write_dataset(
+    output_dir: Path,
+    size: DatasetSize,
+    money: str = "decimal",
+    output_format: str = "csv",
+    id_style: str = "uuid",
+    compression: str = "none",
+) -> None:
+    customers = generate_customers(size.customers, id_style)
+    products = generate_products(size.category_plan, id_style, money)
+    orders = generate_orders(customers, size.orders, id_style)
+    order_items = generate_order_items(orders, products, size.item_range, id_style)
+    payments = generate_payments(orders, id_style)
+
+    tables = (
+        ("customers", CUSTOMER_FIELDS, customers),
+        ("products", PRODUCT_FIELDS, products),
+        ("orders", ORDER_FIELDS, orders),
+        ("order_items", ORDER_ITEM_FIELDS, order_items),
+        ("payments", PAYMENT_FIELDS, payments),
+    )
+    for table, fields, rows in tables:
+        write_table(output_dir, table, fields, rows, money, output_format, compression)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=OUTPUT_DIR,
+        help="Directory the five CSV files are written to.",
+    )
+    parser.add_argument(
+        "--scale-factor",
+        type=float,
+        default=1.0,
+        help="Scale every table proportionally; 1.0 yields 1500 customers and 1500 orders.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Generate and write rows incrementally so memory stays flat as row counts grow.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Generate customers and orders in this many seeded shards on a process pool.",
+    )
+    parser.add_argument(
+        "--part-files",
+        action="store_true",
+        help="With --workers, keep numbered <table>.part-NNNN.csv files instead of merging them.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("python", "numpy"),
+        default="python",
+        help="Row generator for orders, order_items and payments; numpy draws whole arrays per chunk.",
+    )
+    parser.add_argument(
+        "--money",
+        choices=MONEY_MODES,
+        default="decimal",
+        help="Write amounts as decimal text or as integer <column>_cents columns.",
     )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=OUTPUT_FORMATS,
+        default="csv",
+        help="Write CSV files, memory-mappable columnar tables under <output-dir>/columnar, or both.",
+    )
+    parser.add_argument(
+        "--id-style",
+        choices=ID_STYLES,
+        default="uuid",
+        help="Seeded version-4 UUID ids, or integer ids counting up from 1 per table.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        default="none",
+        help="Compress the CSV files while writing them (<table>.csv.gz, .csv.bz2 or .csv.xz).",
+    )
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.validate_arguments(parser, args)
+    if args.backend == "numpy" and args.workers is not None:
+        parser.error("--backend numpy cannot be combined with --workers")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.part_files and args.workers is None:
+        parser.error("--part-files requires --workers")
+    if args.output_format == "columnar" and args.compression != "none":
+        parser.error("--compression applies to CSV output; use --format csv or both")
+    if args.output_format != "csv" and (args.backend == "numpy" or args.workers is not None):
+        parser.error("--format columnar/both is only supported by the single-process python backend")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    instrument = instrumentation.from_arguments(args, "generate_ecommerce_dataset")
+    with instrumentation.activate(instrument, args.instrument), instrument.stage("generate"):
+        run(args)
+
+
+def run(args: argparse.Namespace) -> None:
+    output_dir: Path = args.output_dir
+    output_dir.mkdir(exist_ok=True)
+    size = dataset_size(args.scale_factor)
+
+    if args.backend == "numpy":
+        write_dataset_numpy(output_dir, size, args.money, args.id_style, args.compression)
+    elif args.workers is not None:
+        write_dataset_sharded(
+            output_dir,
+            size,
+            args.workers,
+            args.part_files,
+            args.money,
+            args.id_style,
+            args.compression,
+        )
+    elif args.stream:
+        write_dataset_streaming(
+            output_dir, size, args.money, args.output_format, args.id_style, args.compression
+        )
+    else:
+        write_dataset(
+            output_dir, size, args.money, args.output_format, args.id_style, args.compression
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""NumPy-vectorised backend for orders, order_items and payments.
+
+Draws every per-row random value for a chunk of orders as whole arrays and
+derives subtotals and order totals with array arithmetic (integer cents and a
+grouped sum over each order's items). Rows are written with the same CSV
+schema as generate_ecommerce_dataset.write_order_tables.
+
+Decimal amounts are printed the way the Python backend's Decimal arithmetic
+prints them: a price shows as many fraction digits as it needs (49, 44.1,
+44.15), a subtotal keeps its price's digits (2 x 12.5 = 25.0) and an order
+total the most digits among its items.
+"""
+
+from __future__ import annotations
+
+import csv
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+from ecommerce_io import open_csv
+from generate_ecommerce_dataset import (
+    BASE_ITEM_RANGE,
+    DATE_RANGE_END,
+    DATE_RANGE_START,
+    MAX_ITEMS_PER_ORDER,
+    ORDER_FIELDS,
+    ORDER_ITEM_FIELDS,
+    ORDER_STATUS_WEIGHTS,
+    PAYMENT_FIELDS,
+    PAYMENT_METHODS,
+    SEASONAL_WINDOWS,
+    CustomerRef,
+    derive_seed,
+    money_headers,
+)
+
+EPOCH = datetime(1970, 1, 1)
+DEFAULT_CHUNK_ORDERS = 100_000
+SEASONAL_SHARE = 0.72
+PAYMENT_SUCCESS_RATE = 0.92
+# Generator.hypergeometric() needs fewer than 1e9 good and bad items, and an
+# order owns MAX_ITEMS_PER_ORDER - 1 optional item slots.
+HYPERGEOMETRIC_LIMIT = 10**9
+MAX_ORDERS = (HYPERGEOMETRIC_LIMIT - 1) // (MAX_ITEMS_PER_ORDER - 1)
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("The numpy backend requires numpy; install it or use --backend python.")
+
+
+def require_order_capacity(num_orders: int) -> None:
+    if num_orders > MAX_ORDERS:
+        raise ValueError(
+            f"The numpy backend draws at most {MAX_ORDERS:,} orders (numpy's hypergeometric "
+            f"sampler is limited to 1e9 item slots); got {num_orders:,}. Use --backend python."
+        )
+
+
+def epoch_seconds(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds())
+
+
+def fraction_digits(cents: "np.ndarray") -> "np.ndarray":
+    """Digits after the point of Decimal(cents) / 100: 0, 1 or 2."""
+    return np.where(cents % 100 == 0, 0, np.where(cents % 10 == 0, 1, 2))
+
+
+def format_cents(cents: int, places: int = 2) -> str:
+    """Decimal text of cents with `places` fraction digits (cents must fit)."""
+    whole, fraction = divmod(cents, 100)
+    if places == 0:
+        return str(whole)
+    if places == 1:
+        return f"{whole}.{fraction // 10}"
+    return f"{whole}.{fraction:02d}"
+
+
+def amount_values(
+    amount: Optional[Callable[[int], object]], cents: "np.ndarray", places: "np.ndarray"
+) -> List[object]:
+    """amount() of each value, or Decimal text with `places` digits when amount is None."""
+    if amount is None:
+        return [format_cents(value, digits) for value, digits in zip(cents.tolist(), places.tolist())]
+    return [amount(value) for value in cents.tolist()]
+
+
+def product_price_cents(product: Dict[str, object]) -> int:
+    price = product["price"]
+    if isinstance(price, int):
+        return price
+    return int(price * 100)
+
+
+def format_timestamps(seconds: "np.ndarray") -> List[str]:
+    stamps = np.datetime_as_string(seconds.astype("datetime64[s]"), unit="s")
+    return np.char.replace(stamps, "T", " ").tolist()
+
+
+def uuid_strings(rng: "np.random.Generator", count: int) -> List[str]:
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    data = raw.tobytes()
+    ids: List[str] = []
+    for offset in range(0, len(data), 16):
+        h = data[offset:offset + 16].hex()
+        ids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return ids
+
+
+def integer_strings(start: int, count: int) -> List[str]:
+    """Integer ids start + 1 .. start + count as text."""
+    return [str(value) for value in range(start + 1, start + count + 1)]
+
+
+def draw_order_datetimes(rng: "np.random.Generator", count: int) -> "np.ndarray":
+    window_starts = np.array([epoch_seconds(start) for start, _ in SEASONAL_WINDOWS], dtype=np.int64)
+    window_spans = np.array(
+        [epoch_seconds(end) - epoch_seconds(start) for start, end in SEASONAL_WINDOWS],
+        dtype=np.int64,
+    )
+    range_start = epoch_seconds(DATE_RANGE_START)
+    range_span = epoch_seconds(DATE_RANGE_END) - range_start
+
+    seasonal = rng.random(count) < SEASONAL_SHARE
+    windows = rng.integers(0, len(SEASONAL_WINDOWS), count)
+    seasonal_seconds = window_starts[windows] + rng.integers(0, window_spans[windows] + 1)
+    uniform_seconds = range_start + rng.integers(0, range_span + 1, count)
+    return np.where(seasonal, seasonal_seconds, uniform_seconds)
+
+
+def draw_status_codes(rng: "np.random.Generator", count: int) -> "np.ndarray":
+    cumulative = np.cumsum([weight for _, weight in ORDER_STATUS_WEIGHTS])
+    codes = np.searchsorted(cumulative, rng.random(count), side="left")
+    return np.minimum(codes, len(ORDER_STATUS_WEIGHTS) - 1)
+
+
+def draw_item_counts(
+    rng: "np.random.Generator", count: int, extra_left: int, slots_left: int
+) -> Tuple["np.ndarray", int]:
+    """Vectorised counterpart of iter_item_counts for one chunk of orders.
+
+    The number of optional slots this chunk receives is hypergeometric given
+    what is left overall; the slots themselves are sampled without replacement.
+    """
+    slots_per_order = MAX_ITEMS_PER_ORDER - 1
+    chunk_slots = count * slots_per_order
+    if extra_left <= 0:
+        taken = 0
+    elif extra_left >= slots_left:
+        taken = chunk_slots
+    else:
+        taken = int(rng.hypergeometric(extra_left, slots_left - extra_left, chunk_slots))
+    chosen = rng.choice(chunk_slots, size=taken, replace=False)
+    counts = 1 + np.bincount(chosen // slots_per_order, minlength=count)
+    return counts, taken
+
+
+def iter_order_rows_numpy(
+    customers: Sequence[CustomerRef],
+    products: Sequence[Dict[str, object]],
+    num_orders: int,
+    item_range: Tuple[int, int] = BASE_ITEM_RANGE,
+    chunk_orders: int = DEFAULT_CHUNK_ORDERS,
+    amount: Optional[Callable[[int], object]] = None,
+    timestamps: Callable[["np.ndarray"], List[object]] = format_timestamps,
+    id_style: str = "uuid",
+) -> Iterator[Tuple[List[tuple], List[tuple], List[tuple]]]:
+    """Yield (orders, order_items, payments) row tuples one chunk of orders at a time.
+
+    Tuples follow ORDER_FIELDS, ORDER_ITEM_FIELDS and PAYMENT_FIELDS. `amount`
+    maps integer cents and `timestamps` an array of epoch seconds to the values
+    placed in the rows, so callers pick text for CSV or numbers for SQLite.
+    Without `amount`, amounts are Decimal text as the Python backend prints it.
+    """
+    require_numpy()
+    require_order_capacity(num_orders)
+    rng = np.random.default_rng(derive_seed("numpy:orders", 0))
+
+    product_ids = [product["product_id"] for product in products]
+    price_cents = np.array([product_price_cents(product) for product in products], dtype=np.int64)
+    price_places = fraction_digits(price_cents)
+    price_values = amount_values(amount, price_cents, price_places)
+    status_names = [status for status, _ in ORDER_STATUS_WEIGHTS]
+
+    slots_left = num_orders * (MAX_ITEMS_PER_ORDER - 1)
+    target_total = int(rng.integers(item_range[0], item_range[1] + 1))
+    extra_left = min(max(target_total - num_orders, 0), slots_left)
+    items_written = 0
+
+    for chunk_start in range(0, num_orders, chunk_orders):
+        count = min(chunk_orders, num_orders - chunk_start)
+
+        customer_idx = rng.integers(0, len(customers), count)
+        order_seconds = draw_order_datetimes(rng, count)
+        status_codes = draw_status_codes(rng, count)
+        item_counts, taken = draw_item_counts(rng, count, extra_left, slots_left)
+        extra_left -= taken
+        slots_left -= count * (MAX_ITEMS_PER_ORDER - 1)
+
+        total_items = int(item_counts.sum())
+        item_order = np.repeat(np.arange(count), item_counts)
+        product_idx = rng.integers(0, len(products), total_items)
+        quantities = rng.integers(1, 4, total_items)
+        subtotals = price_cents[product_idx] * quantities
+        order_starts = np.cumsum(item_counts) - item_counts
+        totals = np.add.reduceat(subtotals, order_starts)
+        item_places = price_places[product_idx]
+        total_places = np.maximum.reduceat(item_places, order_starts)
+
+        success = rng.random(count) < PAYMENT_SUCCESS_RATE
+        method_idx = rng.integers(0, len(PAYMENT_METHODS), count)
+        payment_seconds = order_seconds + rng.integers(5, 181, count)
+
+        if id_style == "integer":
+            order_ids = integer_strings(chunk_start, count)
+            item_ids = integer_strings(items_written, total_items)
+            payment_ids = order_ids
+            items_written += total_items
+        else:
+            order_ids = uuid_strings(rng, count)
+            item_ids = uuid_strings(rng, total_items)
+            payment_ids = uuid_strings(rng, count)
+        order_dates = timestamps(order_seconds)
+        payment_dates = timestamps(payment_seconds)
+        total_values = amount_values(amount, totals, total_places)
+        subtotal_values = amount_values(amount, subtotals, item_places)
+
+        chosen_customers = [customers[idx] for idx in customer_idx.tolist()]
+        order_rows = [
+            (order_id, customer[0], order_date, total, status_names[code], *customer[1:])
+            for order_id, customer, order_date, total, code in zip(
+                order_ids, chosen_customers, order_dates, total_values, status_codes.tolist()
+            )
+        ]
+        item_rows = [
+            (
+                item_id,
+                order_ids[order_pos],
+                product_ids[product],
+                quantity,
+                price_values[product],
+                subtotal,
+            )
+            for item_id, order_pos, product, quantity, subtotal in zip(
+                item_ids,
+                item_order.tolist(),
+                product_idx.tolist(),
+                quantities.tolist(),
+                subtotal_values,
+            )
+        ]
+        payment_rows = [
+            (
+                payment_id,
+                order_id,
+                PAYMENT_METHODS[method],
+                total,
+                "success" if ok else "failed",
+                paid_at,
+            )
+            for payment_id, order_id, method, total, ok, paid_at in zip(
+                payment_ids,
+                order_ids,
+                method_idx.tolist(),
+                total_values,
+                success.tolist(),
+                payment_dates,
+            )
+        ]
+        yield order_rows, item_rows, payment_rows
+
+
+def write_order_tables_numpy(
+    orders_path: Path,
+    order_items_path: Path,
+    payments_path: Path,
+    customers: Sequence[CustomerRef],
+    products: Sequence[Dict[str, object]],
+    num_orders: int,
+    item_range: Tuple[int, int] = BASE_ITEM_RANGE,
+    chunk_orders: int = DEFAULT_CHUNK_ORDERS,
+    money: str = "decimal",
+    id_style: str = "uuid",
+) -> None:
+    require_numpy()
+    require_order_capacity(num_orders)
+    chunks = iter_order_rows_numpy(
+        customers,
+        products,
+        num_orders,
+        item_range,
+        chunk_orders,
+        amount=str if money == "cents" else None,
+        id_style=id_style,
+    )
+    with open_csv(orders_path, "w") as orders_handle, \
+            open_csv(order_items_path, "w") as items_handle, \
+            open_csv(payments_path, "w") as payments_handle:
+        orders_writer = csv.writer(orders_handle)
+        items_writer = csv.writer(items_handle)
+        payments_writer = csv.writer(payments_handle)
+        orders_writer.writerow(money_headers(ORDER_FIELDS, money))
+        items_writer.writerow(money_headers(ORDER_ITEM_FIELDS, money))
+        payments_writer.writerow(money_headers(PAYMENT_FIELDS, money))
+        for order_rows, item_rows, payment_rows in chunks:
+            orders_writer.writerows(order_rows)
+            items_writer.writerows(item_rows)
+            payments_writer.writerows(payment_rows)
@@ -1,23 +1,205 @@
 #!/usr/bin/env python3
 """Deterministic ingestion of ecommerce dataset into SQLite."""
 
+import argparse
 import csv
+import io
+import os
 import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from decimal import Decimal, getcontext
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 
+from ecommerce_checks import parse_threshold, raise_for_failures, run_checks
+import ecommerce_instrumentation as instrumentation
+from ecommerce_columnar import open_table, table_dir, timestamp_text
+from ecommerce_compact import (
+    SCHEMA_LAYOUTS,
+    TIMESTAMP_COLUMNS,
+    SurrogateKeys,
+    create_id_map_tables,
+    drop_id_map_tables,
+    epoch_from_text,
+    id_map_table,
+    schema_layout,
+)
+from ecommerce_db import money_column, money_definition, schema_money_mode
+from ecommerce_io import estimated_plain_size, find_csv, is_compressed, open_csv
+from ecommerce_manifest import drop_manifest_table, plan_reload, record_manifest
+from ecommerce_query_cache import bump_load_generation
+from ecommerce_rollups import (
+    drop_rollup_tables,
+    rebuild_rollups,
+    refresh_rollups,
+    rollups_exist,
+    track_rollup_changes,
+)
+
 getcontext().prec = 28
 
+MONEY_MODES = ("decimal", "cents")
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_PARSE_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_CHECK_WORKERS = 4
+INPUT_FORMATS = ("csv", "columnar")
+
+# Insert column order per table, in FK load order.
+TABLE_ORDER = ("customers", "products", "orders", "order_items", "payments")
+TABLE_COLUMNS = {
+    "customers": (
+        "customer_id",
+        "full_name",
+        "email",
+        "phone",
+        "address",
+        "city",
+        "state",
+        "country",
+        "created_at",
+    ),
+    "products": (
+        "product_id",
+        "name",
+        "category",
+        "sub_category",
+        "price",
+        "stock_quantity",
+        "added_at",
+    ),
+    "orders": (
+        "order_id",
+        "customer_id",
+        "order_date",
+        "total_amount",
+        "status",
+        "city",
+        "state",
+        "country",
+    ),
+    "order_items": (
+        "order_item_id",
+        "order_id",
+        "product_id",
+        "quantity",
+        "item_price",
+        "subtotal",
+    ),
+    "payments": (
+        "payment_id",
+        "order_id",
+        "payment_method",
+        "amount",
+        "payment_status",
+        "transaction_timestamp",
+    ),
+}
+MONEY_COLUMNS = {"price", "total_amount", "item_price", "subtotal", "amount"}
+INTEGER_COLUMNS = {"stock_quantity", "quantity"}
+
+# --incremental upserts rows whose timestamp is after the stored high-water
+# mark. order_items has no timestamp of its own and follows the orders (and
+# payments) touched in the same run. Every other row, including rows stamped
+# exactly at the mark, is compared with the stored row, LOOKUP_BATCH_ROWS
+# primary keys per query, and upserted if it is new or differs. The CSVs carry
+# no change marker, so that comparison reads every older row: an incremental
+# run writes only the delta but still costs one keyed read of each table.
+WATERMARK_COLUMNS = {
+    "customers": "created_at",
+    "products": "added_at",
+    "orders": "order_date",
+    "payments": "transaction_timestamp",
+}
+AFFECTED_ORDERS_TABLE = "ingest_affected_orders"
+LOOKUP_BATCH_ROWS = 500
+
+# Connection settings for --bulk: the whole load is one transaction whose
+# rollback journal lives in memory, and nothing is fsynced until the end.
+BULK_PAGE_SIZE = 8192
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# --in-memory builds the database in :memory: and copies it to disk with the
+# backup API, BACKUP_PAGES pages per step, unless the estimate below says it
+# would not fit in the memory budget.
+DEFAULT_MEMORY_BUDGET_MB = 1024
+DEFAULT_BACKUP_PAGES = 4096
+# Database bytes per plain input byte, indexes included (about 2.3 at sf=30).
+DATABASE_BYTES_PER_INPUT_BYTE = 2.5
+
+# Declared secondary indexes, built after the tables are loaded. Every FK
+# column leads an index, and the order_date/order_items/payments indexes also
+# cover the columns CANONICAL_JOIN_SQL reads, so the join walks orders in
+# order_date order with no temp B-tree sort. "{subtotal}" follows the money mode.
+SECONDARY_INDEXES = (
+    ("idx_orders_customer_id", "orders", ("customer_id",)),
+    ("idx_orders_order_date", "orders", ("order_date", "order_id", "customer_id")),
+    (
+        "idx_order_items_order_id",
+        "order_items",
+        ("order_id", "product_id", "quantity", "{subtotal}"),
+    ),
+    ("idx_order_items_product_id", "order_items", ("product_id",)),
+    ("idx_payments_order_id", "payments", ("order_id", "payment_method", "payment_status")),
+)
+
+# The five-table join from Prompts/sql_queries.
+CANONICAL_JOIN_SQL = """
+SELECT c.full_name,
+c.city,
+o.order_id,
+o.order_date,
+p.name AS product_name,
+oi.quantity,
+oi.{subtotal},
+pay.payment_method,
+pay.payment_status
+FROM order_items AS oi
+JOIN orders AS o ON oi.order_id = o.order_id
+JOIN customers AS c ON o.customer_id = c.customer_id
+JOIN products AS p ON oi.product_id = p.product_id
+JOIN payments AS pay ON o.order_id = pay.order_id
+ORDER BY o.order_date DESC
+"""
+
 
 def decimal_str(value):
     text = str(value).strip()
     return format(Decimal(text), "f")
 
 
-def decimal_from_db(value):
-    if isinstance(value, Decimal):
-        return value
-    return Decimal(str(value))
+def cents_from_text(value):
+    """Parse a decimal amount such as "7047.4" into integer cents without Decimal."""
+    text = str(value).strip()
+    sign = 1
+    if text.startswith("-"):
+        sign = -1
+        text = text[1:]
+    whole, _, fraction = text.partition(".")
+    if len(fraction) > 2:
+        if fraction[2:].strip("0"):
+            raise ValueError(f"Amount {value!r} has sub-cent precision")
+        fraction = fraction[:2]
+    return sign * (int(whole or "0") * 100 + int(fraction.ljust(2, "0")))
+
+
+def decimal_from_cents(value):
+    return format(Decimal(int(value)).scaleb(-2), "f")
+
+
+def money_reader(fieldnames, name, money_mode):
+    """Return (csv column, converter) for a money column in either CSV layout."""
+    if f"{name}_cents" in fieldnames:
+        return f"{name}_cents", int if money_mode == "cents" else decimal_from_cents
+    return name, cents_from_text if money_mode == "cents" else decimal_str
 
 
 def ensure_directories(root_path):
@@ -35,19 +217,148 @@ def enable_foreign_keys(connection):
         raise RuntimeError("Failed to enable SQLite foreign keys.")
 
 
-def reset_schema(connection):
+def remove_database_files(db_path):
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        path = db_path.with_name(db_path.name + suffix)
+        if path.exists():
+            path.unlink()
+
+
+def estimate_database_bytes(dataset_dir, input_format="csv"):
+    """Rough size of the loaded database, from the size of its input files."""
+    if input_format == "columnar":
+        input_bytes = sum(
+            path.stat().st_size
+            for table_name in TABLE_ORDER
+            for path in table_dir(dataset_dir, table_name).iterdir()
+        )
+    else:
+        input_bytes = sum(
+            estimated_plain_size(find_csv(dataset_dir, table_name)) for table_name in TABLE_ORDER
+        )
+    return int(input_bytes * DATABASE_BYTES_PER_INPUT_BYTE)
+
+
+def print_backup_progress(status, remaining, total):
+    print(f"backup: {total - remaining}/{total} pages", flush=True)
+
+
+def backup_to_file(source, db_path, pages=DEFAULT_BACKUP_PAGES, progress=None):
+    """Copy the source connection's database to db_path with the backup API.
+
+    Pages are copied in file order into <db_path>.tmp, which has no journal and
+    is only fsynced once at the end, so the file is written sequentially in a
+    single pass. It then replaces db_path, which never holds a partial copy.
+    """
+    temp_path = db_path.with_name(db_path.name + ".tmp")
+    remove_database_files(temp_path)
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            target.execute("PRAGMA journal_mode = OFF")
+            target.execute("PRAGMA synchronous = OFF")
+            source.backup(target, pages=pages, progress=progress)
+        finally:
+            target.close()
+        with open(temp_path, "rb+") as handle:
+            os.fsync(handle.fileno())
+    except BaseException:
+        remove_database_files(temp_path)
+        raise
+    remove_database_files(db_path)
+    os.replace(temp_path, db_path)
+
+
+def configure_bulk_connection(connection):
+    """Apply BULK_PRAGMAS and leave foreign keys off until foreign_key_check runs."""
+    connection.execute(f"PRAGMA page_size = {BULK_PAGE_SIZE}")
+    for pragma in BULK_PRAGMAS:
+        connection.execute(pragma)
+    connection.execute("PRAGMA foreign_keys = OFF")
+
+
+def canonical_join_sql(money_mode="decimal"):
+    return CANONICAL_JOIN_SQL.format(subtotal=money_column("subtotal", money_mode))
+
+
+def create_secondary_indexes(connection, money_mode="decimal"):
+    subtotal = money_column("subtotal", money_mode)
+    for index_name, table_name, columns in SECONDARY_INDEXES:
+        column_list = ", ".join(column.format(subtotal=subtotal) for column in columns)
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({column_list})"
+        )
+
+
+def build_indexes(connection, money_mode="decimal"):
+    """Create the declared index set and refresh planner statistics."""
+    create_secondary_indexes(connection, money_mode)
+    connection.execute("ANALYZE")
+
+
+def refresh_statistics(connection):
+    """ANALYZE on the first load; afterwards let PRAGMA optimize decide what is stale."""
+    has_stats = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    connection.execute("PRAGMA optimize" if has_stats else "ANALYZE")
+
+
+def check_foreign_keys(connection):
+    violations = connection.execute("PRAGMA foreign_key_check").fetchmany(5)
+    if violations:
+        details = ", ".join(
+            f"{table}(rowid {rowid}) -> {parent}" for table, rowid, parent, _ in violations
+        )
+        raise ValueError("Foreign key violations detected: " + details)
+
+
+def reset_schema(connection, money_mode="decimal", layout="text"):
     drop_sql = """
     DROP TABLE IF EXISTS order_items;
     DROP TABLE IF EXISTS payments;
     DROP TABLE IF EXISTS orders;
     DROP TABLE IF EXISTS products;
     DROP TABLE IF EXISTS customers;
-    """
+    DROP TABLE IF EXISTS ingest_watermarks;
+    DROP TABLE IF EXISTS {affected};
+    """.format(affected=AFFECTED_ORDERS_TABLE)
     connection.executescript(drop_sql)
+    drop_rollup_tables(connection)
+    drop_id_map_tables(connection)
+    drop_manifest_table(connection)
+    create_schema(connection, money_mode, layout=layout)
+    if layout == "compact":
+        create_id_map_tables(connection)
+    connection.commit()
+
+
+def clear_tables(connection, table_names):
+    """Empty table_names (children first), their id maps and secondary indexes.
+
+    Used by partial reloads, which only reach here with every table that
+    references a cleared one also in table_names.
+    """
+    compact = schema_layout(connection) == "compact"
+    for index_name, table_name, _ in SECONDARY_INDEXES:
+        if table_name in table_names:
+            connection.execute(f"DROP INDEX IF EXISTS {index_name}")
+    for table_name in reversed(TABLE_ORDER):
+        if table_name in table_names:
+            connection.execute(f"DELETE FROM {table_name}")
+            if compact:
+                connection.execute(f"DELETE FROM {id_map_table(table_name)}")
+
 
+def create_schema(connection, money_mode="decimal", if_not_exists=False, layout="text"):
+    """Create the five tables; layout "compact" uses INTEGER keys and epoch timestamps."""
+    if layout == "compact":
+        key, reference, timestamp = "INTEGER PRIMARY KEY", "INTEGER", "INTEGER"
+    else:
+        key, reference, timestamp = "TEXT PRIMARY KEY", "TEXT", "TEXT"
     create_sql = """
-    CREATE TABLE customers(
-        customer_id TEXT PRIMARY KEY,
+    CREATE TABLE {exists}customers(
+        customer_id {key},
         full_name TEXT NOT NULL,
         email TEXT UNIQUE NOT NULL,
         phone TEXT UNIQUE NOT NULL,
@@ -55,24 +366,24 @@ def reset_schema(connection):
         city TEXT NOT NULL,
         state TEXT NOT NULL,
         country TEXT NOT NULL,
-        created_at TEXT NOT NULL
+        created_at {timestamp} NOT NULL
     );
 
-    CREATE TABLE products(
-        product_id TEXT PRIMARY KEY,
+    CREATE TABLE {exists}products(
+        product_id {key},
         name TEXT NOT NULL,
         category TEXT NOT NULL,
         sub_category TEXT NOT NULL,
-        price REAL NOT NULL,
+        {price} NOT NULL,
         stock_quantity INTEGER NOT NULL,
-        added_at TEXT NOT NULL
+        added_at {timestamp} NOT NULL
     );
 
-    CREATE TABLE orders(
-        order_id TEXT PRIMARY KEY,
-        customer_id TEXT NOT NULL,
-        order_date TEXT NOT NULL,
-        total_amount REAL NOT NULL,
+    CREATE TABLE {exists}orders(
+        order_id {key},
+        customer_id {reference} NOT NULL,
+        order_date {timestamp} NOT NULL,
+        {total_amount} NOT NULL,
         status TEXT NOT NULL,
         city TEXT NOT NULL,
         state TEXT NOT NULL,
@@ -80,266 +391,1105 @@ def reset_schema(connection):
         FOREIGN KEY(customer_id) REFERENCES customers(customer_id)
     );
 
-    CREATE TABLE order_items(
-        order_item_id TEXT PRIMARY KEY,
-        order_id TEXT NOT NULL,
-        product_id TEXT NOT NULL,
+    CREATE TABLE {exists}order_items(
+        order_item_id {key},
+        order_id {reference} NOT NULL,
+        product_id {reference} NOT NULL,
         quantity INTEGER NOT NULL,
-        item_price REAL NOT NULL,
-        subtotal REAL NOT NULL,
+        {item_price} NOT NULL,
+        {subtotal} NOT NULL,
         FOREIGN KEY(order_id) REFERENCES orders(order_id),
         FOREIGN KEY(product_id) REFERENCES products(product_id)
     );
 
-    CREATE TABLE payments(
-        payment_id TEXT PRIMARY KEY,
-        order_id TEXT NOT NULL,
+    CREATE TABLE {exists}payments(
+        payment_id {key},
+        order_id {reference} NOT NULL,
         payment_method TEXT NOT NULL,
-        amount REAL NOT NULL,
+        {amount} NOT NULL,
         payment_status TEXT NOT NULL,
-        transaction_timestamp TEXT NOT NULL,
+        transaction_timestamp {timestamp} NOT NULL,
         FOREIGN KEY(order_id) REFERENCES orders(order_id)
     );
-    """
+    """.format(
+        exists="IF NOT EXISTS " if if_not_exists else "",
+        key=key,
+        reference=reference,
+        timestamp=timestamp,
+        price=money_definition("price", money_mode),
+        total_amount=money_definition("total_amount", money_mode),
+        item_price=money_definition("item_price", money_mode),
+        subtotal=money_definition("subtotal", money_mode),
+        amount=money_definition("amount", money_mode),
+    )
     connection.executescript(create_sql)
-    connection.commit()
 
 
-def ingest_customers(connection, csv_path):
-    rows = []
-    with csv_path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            rows.append(
-                (
-                    row["customer_id"],
-                    row["full_name"],
-                    row["email"],
-                    row["phone"],
-                    row["address"],
-                    row["city"],
-                    row["state"],
-                    row["country"],
-                    row["created_at"],
-                )
-            )
-    sql = """
-    INSERT INTO customers(
-        customer_id, full_name, email, phone, address, city, state, country, created_at
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
-    connection.executemany(sql, rows)
-    connection.commit()
-    return len(rows)
-
-
-def ingest_products(connection, csv_path):
-    rows = []
-    with csv_path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            rows.append(
-                (
-                    row["product_id"],
-                    row["name"],
-                    row["category"],
-                    row["sub_category"],
-                    decimal_str(row["price"]),
-                    int(row["stock_quantity"]),
-                    row["added_at"],
-                )
-            )
-    sql = """
-    INSERT INTO products(
-        product_id, name, category, sub_category, price, stock_quantity, added_at
-    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-    """
-    connection.executemany(sql, rows)
-    connection.commit()
-    return len(rows)
-
-
-def ingest_orders(connection, csv_path):
-    rows = []
-    with csv_path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            rows.append(
-                (
-                    row["order_id"],
-                    row["customer_id"],
-                    row["order_date"],
-                    decimal_str(row["total_amount"]),
-                    row["status"],
-                    row["city"],
-                    row["state"],
-                    row["country"],
-                )
-            )
-    sql = """
-    INSERT INTO orders(
-        order_id, customer_id, order_date, total_amount, status, city, state, country
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """
-    connection.executemany(sql, rows)
-    connection.commit()
-    return len(rows)
-
-
-def ingest_order_items(connection, csv_path):
-    rows = []
-    with csv_path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            rows.append(
-                (
-                    row["order_item_id"],
-                    row["order_id"],
-                    row["product_id"],
-                    int(row["quantity"]),
-                    decimal_str(row["item_price"]),
-                    decimal_str(row["subtotal"]),
-                )
-            )
-    sql = """
-    INSERT INTO order_items(
-        order_item_id, order_id, product_id, quantity, item_price, subtotal
-    ) VALUES (?, ?, ?, ?, ?, ?)
+def create_metadata_tables(connection):
+    connection.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS ingest_watermarks(
+            table_name TEXT PRIMARY KEY,
+            watermark_column TEXT NOT NULL,
+            high_water_mark TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS {AFFECTED_ORDERS_TABLE}(
+            order_id TEXT PRIMARY KEY
+        );
+        """
+    )
+
+
+def column_positions(header, *names):
+    positions = []
+    for name in names:
+        try:
+            positions.append(header.index(name))
+        except ValueError:
+            raise ValueError(f"CSV column {name!r} not found in header {header}") from None
+    return positions
+
+
+def insert_columns(table_name, money_mode="decimal"):
+    return [
+        money_column(column, money_mode) if column in MONEY_COLUMNS else column
+        for column in TABLE_COLUMNS[table_name]
+    ]
+
+
+def insert_sql(table_name, money_mode="decimal"):
+    columns = insert_columns(table_name, money_mode)
+    placeholders = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {table_name}({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def upsert_sql(table_name, money_mode="decimal"):
+    """INSERT ... ON CONFLICT on the primary key that only rewrites rows that changed."""
+    key, *columns = insert_columns(table_name, money_mode)
+    assignments = ", ".join(f"{column} = excluded.{column}" for column in columns)
+    changed = " OR ".join(f"{table_name}.{column} IS NOT excluded.{column}" for column in columns)
+    return (
+        f"{insert_sql(table_name, money_mode)} "
+        f"ON CONFLICT({key}) DO UPDATE SET {assignments} WHERE {changed}"
+    )
+
+
+def row_converter(table_name, header, money_mode="decimal", layout="text"):
+    """Build a function turning one csv.reader row into the insert tuple for table_name.
+
+    Plain text columns are picked with a single itemgetter call; only integer
+    and money columns (and timestamps in the compact layout) go through a converter.
     """
-    connection.executemany(sql, rows)
-    connection.commit()
-    return len(rows)
-
-
-def ingest_payments(connection, csv_path):
-    rows = []
-    with csv_path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            rows.append(
-                (
-                    row["payment_id"],
-                    row["order_id"],
-                    row["payment_method"],
-                    decimal_str(row["amount"]),
-                    row["payment_status"],
-                    row["transaction_timestamp"],
-                )
-            )
-    sql = """
-    INSERT INTO payments(
-        payment_id, order_id, payment_method, amount, payment_status, transaction_timestamp
-    ) VALUES (?, ?, ?, ?, ?, ?)
+    fields = []
+    conversions = []
+    epoch_column = TIMESTAMP_COLUMNS.get(table_name) if layout == "compact" else None
+    for index, column in enumerate(TABLE_COLUMNS[table_name]):
+        if column in MONEY_COLUMNS:
+            field, convert = money_reader(header, column, money_mode)
+            conversions.append((index, convert))
+        else:
+            field = column
+            if column in INTEGER_COLUMNS:
+                conversions.append((index, int))
+            elif column == epoch_column:
+                conversions.append((index, epoch_from_text))
+        fields.append(field)
+    pick = itemgetter(*column_positions(header, *fields))
+    if not conversions:
+        return pick
+
+    def convert_row(row):
+        values = list(pick(row))
+        for index, convert in conversions:
+            values[index] = convert(values[index])
+        return values
+
+    return convert_row
+
+
+def iter_chunks(rows, chunk_size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def print_progress(table_name, rows_done, elapsed, final=False):
+    rate = rows_done / elapsed if elapsed > 0 else 0.0
+    state = "loaded" if final else "loading"
+    print(
+        f"{table_name}: {state} {rows_done} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)",
+        flush=True,
+    )
+
+
+def insert_rows(connection, table_name, sql, rows, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """executemany() bounded batches of rows so memory does not grow with the file.
+
+    Time spent producing each batch (reading and converting rows) and inserting
+    it are reported separately as "<table>:parse" and "<table>:insert".
     """
-    connection.executemany(sql, rows)
-    connection.commit()
-    return len(rows)
+    instrument = instrumentation.current()
+    started = time.perf_counter()
+    total = 0
+    chunks = iter_chunks(rows, chunk_size)
+    while True:
+        wall, cpu = time.perf_counter(), time.process_time()
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        parsed_wall, parsed_cpu = time.perf_counter(), time.process_time()
+        instrument.record(f"{table_name}:parse", parsed_wall - wall, parsed_cpu - cpu, len(chunk))
+        connection.executemany(sql, chunk)
+        instrument.record(
+            f"{table_name}:insert",
+            time.perf_counter() - parsed_wall,
+            time.process_time() - parsed_cpu,
+            len(chunk),
+        )
+        total += len(chunk)
+        if progress is not None and len(chunk) == chunk_size:
+            progress(table_name, total, time.perf_counter() - started)
+    if progress is not None:
+        progress(table_name, total, time.perf_counter() - started, final=True)
+    return total
+
+
+def ingest_table(
+    connection,
+    table_name,
+    csv_path,
+    money_mode="decimal",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    progress=None,
+    keys=None,
+):
+    """Insert one CSV; with keys (compact layout) ids are replaced by surrogate keys."""
+    with open_csv(csv_path) as handle:
+        reader = csv.reader(handle)
+        header = next(reader)
+        layout = "text" if keys is None else "compact"
+        rows = map(row_converter(table_name, header, money_mode, layout), reader)
+        if keys is not None:
+            rows = keys.translate(table_name, TABLE_COLUMNS[table_name], rows)
+        return insert_rows(
+            connection,
+            table_name,
+            insert_sql(table_name, money_mode),
+            rows,
+            chunk_size,
+            progress,
+        )
+
+
+def columnar_converter(kind, money_mode="decimal", layout="text"):
+    """Converter from a decoded columnar value to its insert value, or None."""
+    if kind == "money":
+        return None if money_mode == "cents" else decimal_from_cents
+    if kind == "timestamp":
+        # Columnar timestamps are already epoch seconds.
+        return None if layout == "compact" else timestamp_text
+    return None
+
+
+def ingest_table_columnar(
+    connection,
+    table_name,
+    dataset_dir,
+    money_mode="decimal",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    progress=None,
+    keys=None,
+):
+    """Insert a table from <dataset_dir>/columnar, decoding it one batch of columns at a time."""
+    columns = TABLE_COLUMNS[table_name]
+    layout = "text" if keys is None else "compact"
+    with open_table(dataset_dir, table_name) as table:
+        converters = [
+            columnar_converter(table.kind(column), money_mode, layout) for column in columns
+        ]
+
+        def iter_rows():
+            for batch in table.iter_batches(columns, chunk_size):
+                for index, convert in enumerate(converters):
+                    if convert is not None:
+                        batch[index] = list(map(convert, batch[index]))
+                yield from zip(*batch)
+
+        rows = iter_rows()
+        if keys is not None:
+            rows = keys.translate(table_name, columns, rows)
+        return insert_rows(
+            connection,
+            table_name,
+            insert_sql(table_name, money_mode),
+            rows,
+            chunk_size,
+            progress,
+        )
 
 
-def ingest_all_tables(connection, dataset_dir):
+def ingest_customers(connection, csv_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    return ingest_table(connection, "customers", csv_path, "decimal", chunk_size, progress)
+
+
+def ingest_products(
+    connection, csv_path, money_mode="decimal", chunk_size=DEFAULT_CHUNK_SIZE, progress=None
+):
+    return ingest_table(connection, "products", csv_path, money_mode, chunk_size, progress)
+
+
+def ingest_orders(
+    connection, csv_path, money_mode="decimal", chunk_size=DEFAULT_CHUNK_SIZE, progress=None
+):
+    return ingest_table(connection, "orders", csv_path, money_mode, chunk_size, progress)
+
+
+def ingest_order_items(
+    connection, csv_path, money_mode="decimal", chunk_size=DEFAULT_CHUNK_SIZE, progress=None
+):
+    return ingest_table(connection, "order_items", csv_path, money_mode, chunk_size, progress)
+
+
+def ingest_payments(
+    connection, csv_path, money_mode="decimal", chunk_size=DEFAULT_CHUNK_SIZE, progress=None
+):
+    return ingest_table(connection, "payments", csv_path, money_mode, chunk_size, progress)
+
+
+def ingest_all_tables(
+    connection,
+    dataset_dir,
+    money_mode="decimal",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    progress=None,
+    single_transaction=False,
+    input_format="csv",
+    layout="text",
+    table_names=TABLE_ORDER,
+):
+    """Load table_names in FK order, committing after each unless single_transaction."""
     counts = {}
-    counts["customers"] = ingest_customers(connection, dataset_dir / "customers.csv")
-    counts["products"] = ingest_products(connection, dataset_dir / "products.csv")
-    counts["orders"] = ingest_orders(connection, dataset_dir / "orders.csv")
-    counts["order_items"] = ingest_order_items(connection, dataset_dir / "order_items.csv")
-    counts["payments"] = ingest_payments(connection, dataset_dir / "payments.csv")
+    keys = SurrogateKeys(connection) if layout == "compact" else None
+    if keys is not None:
+        keys.load_retained(table_names)
+    for table_name in table_names:
+        if input_format == "columnar":
+            source, ingest = dataset_dir, ingest_table_columnar
+        else:
+            source, ingest = find_csv(dataset_dir, table_name), ingest_table
+        counts[table_name] = ingest(
+            connection,
+            table_name,
+            source,
+            money_mode,
+            chunk_size,
+            progress,
+            keys,
+        )
+        if not single_transaction:
+            with instrumentation.current().stage("commit"):
+                connection.commit()
     return counts
 
 
-def verify_row_counts(connection, expected_counts):
-    for table_name, expected in expected_counts.items():
-        query = f"SELECT COUNT(*) FROM {table_name}"
-        actual = connection.execute(query).fetchone()[0]
-        if actual != expected:
-            raise ValueError(
-                f"Row count mismatch for {table_name}: expected {expected}, found {actual}"
-            )
+def read_watermarks(connection):
+    return dict(
+        connection.execute("SELECT table_name, high_water_mark FROM ingest_watermarks")
+    )
 
 
-def verify_order_amounts(connection):
-    order_totals = {}
-    cursor = connection.execute("SELECT order_id, total_amount FROM orders")
-    for order_id, total_amount in cursor:
-        order_totals[order_id] = decimal_from_db(total_amount)
+def store_watermark(connection, table_name, high_water_mark):
+    connection.execute(
+        """
+        INSERT INTO ingest_watermarks(table_name, watermark_column, high_water_mark, updated_at)
+        VALUES (?, ?, ?, datetime('now'))
+        ON CONFLICT(table_name) DO UPDATE SET
+            high_water_mark = excluded.high_water_mark,
+            updated_at = excluded.updated_at
+        """,
+        (table_name, WATERMARK_COLUMNS[table_name], high_water_mark),
+    )
 
-    computed_totals = {}
-    cursor = connection.execute("SELECT order_id, subtotal FROM order_items")
-    for order_id, subtotal in cursor:
-        subtotal_decimal = decimal_from_db(subtotal)
-        current = computed_totals.get(order_id)
-        if current is None:
-            computed_totals[order_id] = subtotal_decimal
-        else:
-            computed_totals[order_id] = current + subtotal_decimal
 
-    missing = [order_id for order_id in order_totals if order_id not in computed_totals]
-    if missing:
-        raise ValueError(
-            "Orders missing order_items: " + ", ".join(missing[:5])
+def seed_watermarks(connection):
+    """Store each table's newest timestamp after a full load, where incremental runs start."""
+    create_metadata_tables(connection)
+    for table_name, column in WATERMARK_COLUMNS.items():
+        (newest,) = connection.execute(f"SELECT MAX({column}) FROM {table_name}").fetchone()
+        if newest is not None:
+            store_watermark(connection, table_name, newest)
+
+
+def changed_rows(connection, table_name, rows, money_mode="decimal"):
+    """Return the rows (insert tuples) that are missing from table_name or differ from it."""
+    columns = insert_columns(table_name, money_mode)
+    # Decimal amounts arrive as text and are stored with REAL affinity.
+    as_stored = [
+        float if money_mode == "decimal" and column in MONEY_COLUMNS else None
+        for column in TABLE_COLUMNS[table_name]
+    ]
+    placeholders = ", ".join("?" for _ in rows)
+    stored = {
+        row[0]: row
+        for row in connection.execute(
+            f"SELECT {', '.join(columns)} FROM {table_name} WHERE {columns[0]} IN ({placeholders})",
+            [row[0] for row in rows],
+        )
+    }
+    changed = []
+    for row in rows:
+        values = tuple(
+            value if convert is None else convert(value) for convert, value in zip(as_stored, row)
+        )
+        if stored.get(row[0]) != values:
+            changed.append(row)
+    return changed
+
+
+def ingest_table_incremental(
+    connection,
+    table_name,
+    csv_path,
+    watermark,
+    affected_orders,
+    money_mode="decimal",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    progress=None,
+):
+    """Upsert the delta of one table; returns (candidate rows, rows written, new watermark).
+
+    Rows after the watermark, and order_items/payments of orders already in
+    affected_orders, are upserted as they are; every other row only if it is
+    new or differs from the stored row. Orders and payments add their order_id
+    to affected_orders, as do changed order_items.
+    """
+    columns = TABLE_COLUMNS[table_name]
+    watermark_column = WATERMARK_COLUMNS.get(table_name)
+    stamp_index = columns.index(watermark_column) if watermark_column else None
+    order_index = columns.index("order_id") if "order_id" in columns else None
+    newest = [watermark]
+
+    def is_candidate(row):
+        if stamp_index is not None and (watermark is None or row[stamp_index] > watermark):
+            if newest[0] is None or row[stamp_index] > newest[0]:
+                newest[0] = row[stamp_index]
+            if order_index is not None:
+                affected_orders.add(row[order_index])
+            return True
+        if table_name in ("order_items", "payments"):
+            return row[order_index] in affected_orders
+        return False
+
+    def iter_candidates(rows):
+        for batch in iter_chunks(rows, LOOKUP_BATCH_ROWS):
+            unmatched = []
+            for row in batch:
+                if is_candidate(row):
+                    yield row
+                else:
+                    unmatched.append(row)
+            if unmatched:
+                for row in changed_rows(connection, table_name, unmatched, money_mode):
+                    if order_index is not None:
+                        affected_orders.add(row[order_index])
+                    yield row
+
+    changes_before = connection.total_changes
+    with open_csv(csv_path) as handle:
+        reader = csv.reader(handle)
+        header = next(reader)
+        rows = iter_candidates(map(row_converter(table_name, header, money_mode), reader))
+        candidates = insert_rows(
+            connection,
+            table_name,
+            upsert_sql(table_name, money_mode),
+            rows,
+            chunk_size,
+            progress,
         )
+    return candidates, connection.total_changes - changes_before, newest[0]
 
-    mismatches = []
-    for order_id, total_amount in order_totals.items():
-        if total_amount != computed_totals.get(order_id, Decimal("0")):
-            mismatches.append(order_id)
-            if len(mismatches) == 5:
+
+def ingest_all_tables_incremental(
+    connection, dataset_dir, money_mode="decimal", chunk_size=DEFAULT_CHUNK_SIZE, progress=None
+):
+    """Upsert new or changed rows in FK order and record the affected orders.
+
+    Runs inside the caller's transaction; returns ({table: rows written},
+    affected order count).
+    """
+    watermarks = read_watermarks(connection)
+    affected_orders = set()
+    written = {}
+    for table_name in TABLE_ORDER:
+        _, written[table_name], newest = ingest_table_incremental(
+            connection,
+            table_name,
+            find_csv(dataset_dir, table_name),
+            watermarks.get(table_name),
+            affected_orders,
+            money_mode,
+            chunk_size,
+            progress,
+        )
+        if table_name in WATERMARK_COLUMNS and newest is not None:
+            store_watermark(connection, table_name, newest)
+
+    connection.execute(f"DELETE FROM {AFFECTED_ORDERS_TABLE}")
+    connection.executemany(
+        f"INSERT INTO {AFFECTED_ORDERS_TABLE}(order_id) VALUES (?)",
+        ((order_id,) for order_id in affected_orders),
+    )
+    return written, len(affected_orders)
+
+
+def plan_csv_ranges(csv_path, chunk_bytes=DEFAULT_PARSE_CHUNK_BYTES):
+    """Split a plain CSV into line-aligned byte ranges after its header.
+
+    Assumes no quoted field spans a line break, which holds for every file the
+    generator writes. Compressed files cannot be split this way.
+    """
+    with csv_path.open("rb") as handle:
+        header = next(csv.reader([handle.readline().decode("utf-8")]))
+        data_start = handle.tell()
+        file_size = csv_path.stat().st_size
+        boundaries = [data_start]
+        position = data_start + chunk_bytes
+        while position < file_size:
+            handle.seek(position)
+            handle.readline()
+            boundary = handle.tell()
+            if boundary >= file_size:
                 break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            position = boundary + chunk_bytes
+        boundaries.append(file_size)
+    ranges = [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start
+    ]
+    return header, ranges
 
-    if mismatches:
-        raise ValueError(
-            "Order total mismatch detected for IDs: " + ", ".join(mismatches)
+
+def parse_csv_range(
+    table_name, csv_path, start, end, header, money_mode="decimal", layout="text"
+):
+    """Worker task: parse and type-convert one byte range of a CSV file."""
+    with open(csv_path, "rb") as handle:
+        handle.seek(start)
+        text = handle.read(end - start).decode("utf-8")
+    convert = row_converter(table_name, header, money_mode, layout)
+    return [convert(row) for row in csv.reader(io.StringIO(text, newline=""))]
+
+
+def iter_parse_tasks(dataset_dir, chunk_bytes=DEFAULT_PARSE_CHUNK_BYTES, table_names=TABLE_ORDER):
+    for table_name in table_names:
+        csv_path = find_csv(dataset_dir, table_name)
+        header, ranges = plan_csv_ranges(csv_path, chunk_bytes)
+        for start, end in ranges:
+            yield table_name, csv_path, start, end, header
+
+
+def ingest_all_tables_parallel(
+    connection,
+    dataset_dir,
+    money_mode="decimal",
+    workers=2,
+    progress=None,
+    single_transaction=False,
+    chunk_bytes=DEFAULT_PARSE_CHUNK_BYTES,
+    layout="text",
+    table_names=TABLE_ORDER,
+):
+    """Parse CSV chunks on a process pool while this connection is the only writer.
+
+    Tasks are submitted in TABLE_ORDER and their results consumed in submission
+    order, so customers/products land before orders, and orders before
+    order_items/payments. At most 2 * workers parsed batches are in flight,
+    which bounds memory while parsing runs ahead of the writer. In the compact
+    layout workers convert timestamps and the writer assigns surrogate keys.
+    """
+    counts = {table_name: 0 for table_name in table_names}
+    keys = SurrogateKeys(connection) if layout == "compact" else None
+    if keys is not None:
+        keys.load_retained(table_names)
+    instrument = instrumentation.current()
+    tasks = iter_parse_tasks(dataset_dir, chunk_bytes, table_names)
+    max_pending = 2 * workers
+    pending = deque()
+    current_table = None
+    table_started = time.perf_counter()
+
+    def finish_table():
+        if progress is not None:
+            progress(
+                current_table,
+                counts[current_table],
+                time.perf_counter() - table_started,
+                final=True,
+            )
+        if not single_transaction:
+            with instrumentation.current().stage("commit"):
+                connection.commit()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def fill():
+            while len(pending) < max_pending:
+                task = next(tasks, None)
+                if task is None:
+                    return
+                table_name, csv_path, start, end, header = task
+                future = pool.submit(
+                    parse_csv_range,
+                    table_name,
+                    str(csv_path),
+                    start,
+                    end,
+                    header,
+                    money_mode,
+                    layout,
+                )
+                pending.append((table_name, future))
+
+        fill()
+        while pending:
+            table_name, future = pending.popleft()
+            waited = time.perf_counter()
+            rows = future.result()
+            instrument.record(f"{table_name}:parse_wait", time.perf_counter() - waited, rows=len(rows))
+            fill()
+            if table_name != current_table:
+                if current_table is not None:
+                    finish_table()
+                current_table = table_name
+                table_started = time.perf_counter()
+            wall, cpu = time.perf_counter(), time.process_time()
+            if keys is not None:
+                rows = list(keys.translate(table_name, TABLE_COLUMNS[table_name], rows))
+            connection.executemany(insert_sql(table_name, money_mode), rows)
+            instrument.record(
+                f"{table_name}:insert",
+                time.perf_counter() - wall,
+                time.process_time() - cpu,
+                len(rows),
+            )
+            counts[table_name] += len(rows)
+            if progress is not None and pending and pending[0][0] == table_name:
+                progress(table_name, counts[table_name], time.perf_counter() - table_started)
+        if current_table is not None:
+            finish_table()
+    return counts
+
+
+def verify_row_counts(connection, expected_counts):
+    raise_for_failures(
+        run_checks(connection=connection, names=["row_counts"], expected_counts=expected_counts)
+    )
+
+
+def verify_order_amounts(connection, money_mode="decimal", scope_table=None):
+    """Check order totals, optionally only for order ids listed in scope_table."""
+    raise_for_failures(
+        run_checks(
+            connection=connection,
+            names=["order_totals"],
+            money_mode=money_mode,
+            scope_table=scope_table,
         )
+    )
 
 
 def verify_payment_success_rate(connection):
-    cursor = connection.execute(
-        "SELECT payment_status, COUNT(*) FROM payments GROUP BY payment_status"
+    raise_for_failures(run_checks(connection=connection, names=["payment_success_rate"]))
+
+
+def print_check_result(result):
+    state = "ok" if result.passed else "FAILED"
+    print(f"check {result.name}: {state} in {result.seconds:.3f}s", flush=True)
+
+
+def explain_query_plan(connection, sql, parameters=()):
+    return [row[3] for row in connection.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+
+
+def verify_canonical_query_plan(connection, money_mode="decimal"):
+    """Require index lookups for every table and no temp B-tree sort in the canonical join."""
+    plan = explain_query_plan(connection, canonical_join_sql(money_mode))
+    problems = [
+        detail
+        for detail in plan
+        if "TEMP B-TREE" in detail
+        or "AUTOMATIC" in detail
+        or (detail.startswith("SCAN") and "INDEX" not in detail)
+    ]
+    if problems:
+        raise ValueError("Canonical join query plan is not indexed: " + "; ".join(problems))
+
+
+def run_verifications(
+    connection,
+    counts,
+    money_mode="decimal",
+    db_path=None,
+    scope_table=None,
+    thresholds=None,
+    sample_every=None,
+    max_workers=DEFAULT_CHECK_WORKERS,
+    report=None,
+):
+    """Run the registered data-quality checks, then the canonical join plan check.
+
+    With db_path the checks run concurrently on read-only connections, so every
+    write must already be committed. Scoped runs (incremental loads) skip the
+    table-wide row count and payment ratio checks.
+    """
+    results = run_checks(
+        db_path=db_path,
+        connection=connection,
+        money_mode=money_mode,
+        thresholds=thresholds,
+        scope_table=scope_table,
+        sample_every=sample_every,
+        expected_counts=counts,
+        max_workers=max_workers,
     )
-    total = 0
-    success = 0
-    for status, count in cursor:
-        total += count
-        if str(status).strip().lower() == "success":
-            success += count
-
-    if total == 0:
-        raise ValueError("Payments table is empty; cannot verify success rate.")
-
-    ratio = Decimal(success) / Decimal(total)
-    expected_ratio = Decimal("0.92")
-    tolerance = Decimal("0.01")
-    difference = ratio - expected_ratio
-    if difference.copy_abs() > tolerance:
-        raise ValueError(
-            f"Payment success ratio {format(ratio, '.5f')} outside tolerance for expected 0.92"
+    instrument = instrumentation.current()
+    for result in results:
+        instrument.record(f"check:{result.name}", result.seconds)
+        if report is not None:
+            report(result)
+    raise_for_failures(results)
+    verify_canonical_query_plan(connection, money_mode)
+
+
+@contextmanager
+def timed_phase(metrics, name):
+    started = time.perf_counter()
+    try:
+        with instrumentation.current().stage(name):
+            yield
+    finally:
+        metrics[name] = time.perf_counter() - started
+
+
+def print_load_metrics(mode, metrics, counts, db_path):
+    total_rows = sum(counts.values())
+    load_seconds = metrics.get("load", 0.0)
+    rate = total_rows / load_seconds if load_seconds > 0 else 0.0
+    phases = " ".join(f"{name}={seconds:.2f}s" for name, seconds in metrics.items())
+    size_mib = db_path.stat().st_size / (1024 * 1024)
+    print(
+        f"Load metrics ({mode}): {total_rows} rows, {rate:,.0f} rows/s, {phases}, "
+        f"database {size_mib:.1f} MiB"
+    )
+
+
+def parse_args(argv=None):
+    root_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dataset-dir",
+        type=Path,
+        default=root_dir / "ecommerce_dataset",
+        help=(
+            "Directory containing the five CSV files, plain or compressed as .csv.gz/.bz2/.xz "
+            "(and/or the columnar/ tables)."
+        ),
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=INPUT_FORMATS,
+        default="csv",
+        help="Read the CSV files or the memory-mapped tables under <dataset-dir>/columnar.",
+    )
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=None,
+        help="SQLite file to create (default: database/ecommerce.db under the project root).",
+    )
+    parser.add_argument(
+        "--money",
+        choices=MONEY_MODES,
+        default="decimal",
+        help="Store amounts as REAL columns or as exact INTEGER <column>_cents columns.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Rows parsed and inserted per executemany() batch.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not report per-table progress and rows/sec.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parse CSV chunks on this many processes, feeding a single writer connection.",
+    )
+    parser.add_argument(
+        "--wal",
+        action="store_true",
+        help="Leave the database in WAL mode so readers (serve_ecommerce_sqlite.py) never block the writer.",
+    )
+    parser.add_argument(
+        "--rollups",
+        action="store_true",
+        help=(
+            "Build the daily rollup tables (see ecommerce_rollups.py). Incremental loads "
+            "refresh existing rollups for the days they touch."
+        ),
+    )
+    parser.add_argument(
+        "--check-workers",
+        type=int,
+        default=DEFAULT_CHECK_WORKERS,
+        help="Run data-quality checks concurrently on this many read-only connections.",
+    )
+    parser.add_argument(
+        "--check-threshold",
+        action="append",
+        default=[],
+        metavar="CHECK.KEY=VALUE",
+        help="Override a check threshold, e.g. payment_success_rate.expected=0.9 (repeatable).",
+    )
+    parser.add_argument(
+        "--sample-every",
+        type=int,
+        default=None,
+        help="Quick checks: only verify orders whose rowid is a multiple of this value.",
+    )
+    parser.add_argument(
+        "--schema",
+        choices=SCHEMA_LAYOUTS,
+        default="text",
+        help=(
+            "Table layout: TEXT ids and timestamps, or compact INTEGER surrogate keys and "
+            "epoch timestamps with <table>_id_map tables holding the original ids."
+        ),
+    )
+    instrumentation.add_arguments(parser)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Keep existing tables and upsert rows after each table's stored "
+            "high-water mark, plus older rows that are new or changed, verifying only "
+            "the affected orders. Finding the older changes compares every row with the "
+            "stored one, so each run still reads every input row and table once."
+        ),
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help=(
+            "Record an input manifest (file sizes, mtimes, SHA-256, row counts) and on later "
+            "runs reload only the tables whose CSV changed, plus their dependents, or nothing."
+        ),
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help=(
+            "Build the database in memory and write it to --database in one sequential pass "
+            "with the backup API; loads directly on disk above --memory-budget-mb."
+        ),
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=int,
+        default=DEFAULT_MEMORY_BUDGET_MB,
+        help="Largest estimated database size --in-memory builds in memory.",
+    )
+    parser.add_argument(
+        "--backup-pages",
+        type=int,
+        default=DEFAULT_BACKUP_PAGES,
+        help="Pages copied per backup step for --in-memory; 0 or less copies all at once.",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help=(
+            "Recreate the database file and load it in one transaction with tuned pragmas, "
+            "deferred indexes and a final foreign_key_check."
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.incremental and (args.bulk or args.workers is not None):
+        parser.error("--incremental cannot be combined with --bulk or --workers")
+    if args.input_format == "columnar" and (args.incremental or args.workers is not None):
+        parser.error("--input-format columnar cannot be combined with --incremental or --workers")
+    if args.skip_unchanged and (args.incremental or args.input_format == "columnar"):
+        parser.error(
+            "--skip-unchanged cannot be combined with --incremental or --input-format columnar"
         )
+    if args.in_memory and args.incremental:
+        parser.error("--in-memory cannot be combined with --incremental")
+    if args.memory_budget_mb < 1:
+        parser.error("--memory-budget-mb must be at least 1")
+    if args.schema == "compact" and (args.incremental or args.rollups):
+        parser.error("--schema compact cannot be combined with --incremental or --rollups")
+    if args.check_workers < 1:
+        parser.error("--check-workers must be at least 1")
+    if args.sample_every is not None and args.sample_every < 1:
+        parser.error("--sample-every must be at least 1")
+    instrumentation.validate_arguments(parser, args)
+    args.thresholds = {}
+    for text in args.check_threshold:
+        try:
+            name, key, value = parse_threshold(text)
+        except ValueError as error:
+            parser.error(str(error))
+        args.thresholds.setdefault(name, {})[key] = value
+    return args
 
 
-def run_verifications(connection, counts):
-    verify_row_counts(connection, counts)
-    verify_order_amounts(connection)
-    verify_payment_success_rate(connection)
+def main(argv=None):
+    args = parse_args(argv)
+    instrument = instrumentation.from_arguments(args, "ingest_ecommerce_sqlite")
+    with instrumentation.activate(instrument, args.instrument):
+        run(args)
 
 
-def main():
+def run(args):
     root_dir = Path(__file__).resolve().parent.parent
-    dataset_dir = root_dir / "ecommerce_dataset"
+    dataset_dir = args.dataset_dir
     if not dataset_dir.exists():
         raise FileNotFoundError(f"Dataset directory not found: {dataset_dir}")
 
-    database_dir = ensure_directories(root_dir)
-    db_path = database_dir / "ecommerce.db"
+    if args.database is None:
+        database_dir = ensure_directories(root_dir)
+        db_path = database_dir / "ecommerce.db"
+    else:
+        db_path = args.database
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    plan = None
+    if args.skip_unchanged:
+        plan = plan_manifest_reload(db_path, dataset_dir, args)
+        if not plan.tables:
+            print(f"Inputs unchanged since the last load of {db_path}; skipping ingest")
+            return
+        if len(plan.tables) < len(TABLE_ORDER):
+            print("Reloading changed tables and their dependents: " + ", ".join(plan.tables))
+    full_load = not args.incremental and (plan is None or len(plan.tables) == len(TABLE_ORDER))
+    in_memory = args.in_memory and full_load and fits_memory_budget(dataset_dir, args)
+    if args.bulk and full_load and not in_memory:
+        remove_database_files(db_path)
 
+    metrics = {}
+    started = time.perf_counter()
+    progress = None if args.quiet else print_progress
+    connection = sqlite3.connect(":memory:" if in_memory else db_path)
+    try:
+        if args.incremental:
+            mode = "incremental"
+            counts = run_incremental_load(connection, dataset_dir, args, metrics, progress)
+            scope_table = AFFECTED_ORDERS_TABLE
+        else:
+            mode = "bulk" if args.bulk else "safe"
+            counts = run_full_load(connection, dataset_dir, args, metrics, progress, plan)
+            scope_table = None
+            if in_memory:
+                mode += ", in memory"
+                with timed_phase(metrics, "backup"):
+                    backup_to_file(
+                        connection,
+                        db_path,
+                        args.backup_pages,
+                        None if args.quiet else print_backup_progress,
+                    )
+                connection.close()
+                connection = sqlite3.connect(db_path)
+        if args.wal:
+            connection.execute("PRAGMA journal_mode = WAL")
+        with timed_phase(metrics, "verify"):
+            run_verifications(
+                connection,
+                counts if plan is None else {**plan.row_counts, **counts},
+                args.money,
+                db_path=db_path,
+                scope_table=scope_table,
+                thresholds=args.thresholds,
+                sample_every=args.sample_every,
+                max_workers=args.check_workers,
+                report=None if args.quiet else print_check_result,
+            )
+    finally:
+        connection.close()
+    metrics["total"] = time.perf_counter() - started
+
+    print(f"Created SQLite database at {db_path}")
+    print_load_metrics(mode, metrics, counts, db_path)
+
+
+def fits_memory_budget(dataset_dir, args):
+    """Whether an --in-memory load's estimated database fits --memory-budget-mb."""
+    estimate_mb = estimate_database_bytes(dataset_dir, args.input_format) / (1024 * 1024)
+    if estimate_mb <= args.memory_budget_mb:
+        return True
+    print(
+        f"Estimated database size {estimate_mb:,.0f} MiB exceeds --memory-budget-mb "
+        f"{args.memory_budget_mb}; loading directly on disk"
+    )
+    return False
+
+
+def plan_manifest_reload(db_path, dataset_dir, args):
+    """Compare the inputs with db_path's manifest, refreshing touched files' mtimes."""
+    if not db_path.exists():
+        return plan_reload(None, dataset_dir, TABLE_ORDER, args.money, args.schema)
     connection = sqlite3.connect(db_path)
     try:
-        enable_foreign_keys(connection)
-        reset_schema(connection)
-        counts = ingest_all_tables(connection, dataset_dir)
-        run_verifications(connection, counts)
+        plan = plan_reload(connection, dataset_dir, TABLE_ORDER, args.money, args.schema)
+        if not plan.tables and plan.restat:
+            record_manifest(connection, plan.entries, plan.row_counts, args.money, args.schema)
+            connection.commit()
     finally:
         connection.close()
+    return plan
 
-    print("Created SQLite database at database/ecommerce.db")
+
+def run_full_load(connection, dataset_dir, args, metrics, progress, plan=None):
+    """Load every table, or with a partial plan only plan.tables; returns the loaded counts."""
+    table_names = TABLE_ORDER if plan is None else plan.tables
+    if args.bulk:
+        configure_bulk_connection(connection)
+    else:
+        enable_foreign_keys(connection)
+    if len(table_names) < len(TABLE_ORDER):
+        clear_tables(connection, table_names)
+    else:
+        reset_schema(connection, args.money, args.schema)
+    workers = args.workers
+    if workers is not None and args.input_format == "csv" and any(
+        is_compressed(find_csv(dataset_dir, table_name)) for table_name in TABLE_ORDER
+    ):
+        # Byte-range parsing needs seekable plain text; decompress in this process.
+        print("Compressed CSV input: ignoring --workers and loading sequentially")
+        workers = None
+    with timed_phase(metrics, "load"):
+        if workers is not None:
+            counts = ingest_all_tables_parallel(
+                connection,
+                dataset_dir,
+                args.money,
+                workers,
+                progress,
+                single_transaction=args.bulk,
+                layout=args.schema,
+                table_names=table_names,
+            )
+        else:
+            counts = ingest_all_tables(
+                connection,
+                dataset_dir,
+                args.money,
+                args.chunk_size,
+                progress,
+                single_transaction=args.bulk,
+                input_format=args.input_format,
+                layout=args.schema,
+                table_names=table_names,
+            )
+    # A partial reload keeps the existing rollups, which must follow the new rows.
+    rollups = args.rollups or rollups_exist(connection)
+    if args.bulk:
+        try:
+            with timed_phase(metrics, "indexes"):
+                build_indexes(connection, args.money)
+            if rollups:
+                with timed_phase(metrics, "rollups"):
+                    rebuild_rollups(connection, args.money)
+            with timed_phase(metrics, "foreign_key_check"):
+                check_foreign_keys(connection)
+            with timed_phase(metrics, "commit"):
+                if plan is not None:
+                    store_manifest(connection, plan, counts, args)
+                if args.schema == "text":
+                    seed_watermarks(connection)
+                bump_load_generation(connection)
+                connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        enable_foreign_keys(connection)
+    else:
+        with timed_phase(metrics, "indexes"):
+            build_indexes(connection, args.money)
+            connection.commit()
+        if rollups:
+            with timed_phase(metrics, "rollups"):
+                rebuild_rollups(connection, args.money)
+        if plan is not None:
+            store_manifest(connection, plan, counts, args)
+        if args.schema == "text":
+            seed_watermarks(connection)
+        bump_load_generation(connection)
+        connection.commit()
+    return counts
+
+
+def store_manifest(connection, plan, counts, args):
+    record_manifest(
+        connection, plan.entries, {**plan.row_counts, **counts}, args.money, args.schema
+    )
+
+
+def run_incremental_load(connection, dataset_dir, args, metrics, progress):
+    """Upsert the delta in one transaction, recording the affected orders for verification."""
+    enable_foreign_keys(connection)
+    if schema_layout(connection) == "compact":
+        raise ValueError("Incremental loads need the text layout; rerun a full load instead")
+    existing_mode = schema_money_mode(connection)
+    if existing_mode is not None and existing_mode != args.money:
+        raise ValueError(
+            f"Database stores {existing_mode} amounts; rerun with --money {existing_mode}"
+        )
+    create_schema(connection, args.money, if_not_exists=True)
+    create_metadata_tables(connection)
+    # Upserted rows no longer match the manifest's files; the next
+    # --skip-unchanged run reloads everything.
+    drop_manifest_table(connection)
+    maintain_rollups = rollups_exist(connection)
+    if maintain_rollups:
+        track_rollup_changes(connection)
+    try:
+        with timed_phase(metrics, "load"):
+            counts, affected = ingest_all_tables_incremental(
+                connection, dataset_dir, args.money, args.chunk_size, progress
+            )
+        with timed_phase(metrics, "indexes"):
+            create_secondary_indexes(connection, args.money)
+            refresh_statistics(connection)
+        if maintain_rollups or args.rollups:
+            with timed_phase(metrics, "rollups"):
+                if maintain_rollups:
+                    print(f"Refreshed rollups for {refresh_rollups(connection, args.money)} days")
+                else:
+                    rebuild_rollups(connection, args.money)
+        with timed_phase(metrics, "commit"):
+            bump_load_generation(connection)
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    print(f"Incremental load touched {affected} orders")
+    return counts
 
 
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Stream the canonical five-table join out of the ecommerce SQLite database.
+
+Rows come back newest first, ordered by (order_date, order_item_id) so every
+row has a unique position. Results are pulled with fetchmany() and written as
+they arrive, so exports use bounded memory. Pages continue from a cursor (the
+last row's order_date and order_item_id) instead of an OFFSET, so page N is an
+index range scan just like page 1.
+
+Databases in the compact layout (see ecommerce_compact) are queried on their
+integer keys and epoch timestamps; order_date is rendered back as text and ids
+are the surrogate keys.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+from ecommerce_compact import day_seconds, epoch_from_text, schema_layout
+from ecommerce_db import connect_read_only, money_column, schema_money_mode
+
+DEFAULT_BATCH_SIZE = 10_000
+OUTPUT_FORMATS = ("csv", "jsonl")
+CURSOR_SEPARATOR = "|"
+
+SELECT_COLUMNS = (
+    ("full_name", "c.full_name"),
+    ("city", "c.city"),
+    ("order_id", "o.order_id"),
+    ("order_date", "{order_date}"),
+    ("product_name", "p.name"),
+    ("quantity", "oi.quantity"),
+    ("{subtotal}", "oi.{subtotal}"),
+    ("payment_method", "pay.payment_method"),
+    ("payment_status", "pay.payment_status"),
+    ("order_item_id", "oi.order_item_id"),
+)
+
+JOIN_SQL = """
+SELECT {columns}
+FROM order_items AS oi
+JOIN orders AS o ON oi.order_id = o.order_id
+JOIN customers AS c ON o.customer_id = c.customer_id
+JOIN products AS p ON oi.product_id = p.product_id
+JOIN payments AS pay ON o.order_id = pay.order_id
+WHERE {where}
+ORDER BY o.order_date DESC, oi.order_item_id DESC
+"""
+
+# Rows strictly after the cursor in (order_date DESC, order_item_id DESC)
+# order. Spelled out rather than as a row-value comparison so the leading
+# order_date bound is a range on idx_orders_order_date.
+AFTER_CURSOR_SQL = (
+    "o.order_date <= :after_date "
+    "AND (o.order_date < :after_date OR oi.order_item_id < :after_item)"
+)
+
+
+def output_columns(money_mode="decimal"):
+    subtotal = money_column("subtotal", money_mode)
+    return [name.format(subtotal=subtotal) for name, _ in SELECT_COLUMNS]
+
+
+def build_query(money_mode="decimal", start=None, end=None, city=None, status=None,
+                after=None, limit=None, layout="text"):
+    """Return (sql, parameters) for the join with optional filters and cursor.
+
+    start/end are inclusive YYYY-MM-DD days; after is an (order_date,
+    order_item_id) cursor from a previous page.
+    """
+    compact = layout == "compact"
+    expressions = {
+        "subtotal": money_column("subtotal", money_mode),
+        "order_date": "datetime(o.order_date, 'unixepoch')" if compact else "o.order_date",
+    }
+    columns = ",\n       ".join(
+        f"{expression.format(**expressions)} AS {name.format(**expressions)}"
+        for name, expression in SELECT_COLUMNS
+    )
+    predicates = []
+    parameters = {}
+    if start is not None:
+        predicates.append("o.order_date >= :start")
+        parameters["start"] = day_seconds(start) if compact else start
+    if end is not None:
+        if compact:
+            predicates.append("o.order_date < :end")
+            parameters["end"] = day_seconds(end) + 86400
+        else:
+            predicates.append("o.order_date < date(:end, '+1 day')")
+            parameters["end"] = end
+    if city is not None:
+        predicates.append("c.city = :city")
+        parameters["city"] = city
+    if status is not None:
+        predicates.append("o.status = :status")
+        parameters["status"] = status
+    if after is not None:
+        predicates.append(AFTER_CURSOR_SQL)
+        after_date, after_item = after
+        if compact:
+            after_date, after_item = epoch_from_text(after_date), int(after_item)
+        parameters["after_date"], parameters["after_item"] = after_date, after_item
+    sql = JOIN_SQL.format(columns=columns, where=" AND ".join(predicates) or "1 = 1")
+    if limit is not None:
+        sql += "LIMIT :limit\n"
+        parameters["limit"] = int(limit)
+    return sql, parameters
+
+
+def stream_rows(connection, batch_size=DEFAULT_BATCH_SIZE, **filters):
+    """Yield join rows batch by batch through fetchmany()."""
+    sql, parameters = build_query(
+        schema_money_mode(connection), layout=schema_layout(connection), **filters
+    )
+    cursor = connection.execute(sql, parameters)
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+    finally:
+        cursor.close()
+
+
+def fetch_page(connection, page_size, after=None, **filters):
+    """Return (rows, next cursor); the cursor is None after the last page."""
+    sql, parameters = build_query(
+        schema_money_mode(connection),
+        after=after,
+        limit=page_size,
+        layout=schema_layout(connection),
+        **filters,
+    )
+    rows = connection.execute(sql, parameters).fetchall()
+    if len(rows) < page_size:
+        return rows, None
+    return rows, row_cursor(rows[-1])
+
+
+def row_cursor(row):
+    return row[3], row[-1]
+
+
+def encode_cursor(cursor):
+    return CURSOR_SEPARATOR.join(map(str, cursor))
+
+
+def decode_cursor(text):
+    order_date, separator, order_item_id = text.partition(CURSOR_SEPARATOR)
+    if not separator or not order_date or not order_item_id:
+        raise ValueError(f"Invalid cursor {text!r}; expected <order_date>|<order_item_id>")
+    return order_date, order_item_id
+
+
+def write_csv_rows(handle, columns, rows):
+    writer = csv.writer(handle)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl_rows(handle, columns, rows):
+    count = 0
+    for row in rows:
+        handle.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        handle.write("\n")
+        count += 1
+    return count
+
+
+WRITERS = {"csv": write_csv_rows, "jsonl": write_jsonl_rows}
+
+
+def parse_args(argv=None):
+    root_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=root_dir / "database" / "ecommerce.db",
+        help="SQLite file to query.",
+    )
+    parser.add_argument("--start", default=None, help="First order day (YYYY-MM-DD), inclusive.")
+    parser.add_argument("--end", default=None, help="Last order day (YYYY-MM-DD), inclusive.")
+    parser.add_argument("--city", default=None, help="Only orders from customers in this city.")
+    parser.add_argument("--status", default=None, help="Only orders with this status.")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", help="Output format.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="File to write (default: stdout).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Rows fetched per fetchmany() call when exporting.",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=None,
+        help="Write a single page of this many rows and print the next cursor to stderr.",
+    )
+    parser.add_argument(
+        "--after",
+        default=None,
+        help="Cursor (<order_date>|<order_item_id>) returned by the previous page.",
+    )
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.page_size is not None and args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    if args.after is not None and args.page_size is None:
+        parser.error("--after requires --page-size")
+    if args.after is not None:
+        try:
+            args.after = decode_cursor(args.after)
+        except ValueError as error:
+            parser.error(str(error))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database.exists():
+        raise FileNotFoundError(f"Database not found: {args.database}")
+    filters = {"start": args.start, "end": args.end, "city": args.city, "status": args.status}
+
+    connection = connect_read_only(args.database)
+    handle = sys.stdout if args.output is None else args.output.open("w", newline="", encoding="utf-8")
+    try:
+        columns = output_columns(schema_money_mode(connection))
+        write_rows = WRITERS[args.format]
+        if args.page_size is None:
+            write_rows(handle, columns, stream_rows(connection, args.batch_size, **filters))
+        else:
+            rows, next_cursor = fetch_page(connection, args.page_size, args.after, **filters)
+            write_rows(handle, columns, rows)
+            if next_cursor is not None:
+                print(f"next cursor: {encode_cursor(next_cursor)}", file=sys.stderr)
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
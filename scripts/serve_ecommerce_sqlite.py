@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""Concurrent read-only query service over the ecommerce SQLite database.
+
+QueryService keeps a fixed pool of read-only connections to a WAL database,
+so readers see a consistent snapshot while an ingest writer commits. Queries
+run on a thread pool sized to the pool and wait in a bounded queue. Each query
+has a deadline enforced with a progress handler, and queue wait and execution
+time are recorded in latency histograms.
+
+Run as a script, it serves the named reports over a minimal asyncio HTTP
+front end:
+
+    GET /query/<name>?start=2023-01-01&end=2023-12-31   -> {"rows": [...]}
+    GET /stats                                          -> pool, queue and latency stats
+"""
+
+import argparse
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from ecommerce_db import connect_read_only
+from ecommerce_rollups import (
+    daily_revenue,
+    payment_method_success_rates,
+    revenue_by_category,
+    revenue_by_city,
+    top_products,
+)
+from query_ecommerce_sqlite import decode_cursor, encode_cursor, fetch_page
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_TIMEOUT = 5.0
+PROGRESS_STEPS = 10_000
+
+# Upper bounds in milliseconds; the final bucket catches everything slower.
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class ServiceOverloaded(RuntimeError):
+    """Raised when the request queue is full."""
+
+
+class QueryTimeout(TimeoutError):
+    """Raised when a query misses its deadline, waiting or running."""
+
+
+class LatencyHistogram:
+    def __init__(self, bounds_ms=LATENCY_BUCKETS_MS):
+        self.bounds_ms = bounds_ms
+        self.counts = [0] * (len(bounds_ms) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        milliseconds = seconds * 1000
+        index = next(
+            (i for i, bound in enumerate(self.bounds_ms) if milliseconds <= bound),
+            len(self.bounds_ms),
+        )
+        with self._lock:
+            self.counts[index] += 1
+            self.total_ms += milliseconds
+            self.max_ms = max(self.max_ms, milliseconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples."""
+        with self._lock:
+            counts = list(self.counts)
+            max_ms = self.max_ms
+        target = fraction * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= target:
+                return self.bounds_ms[index] if index < len(self.bounds_ms) else max_ms
+        return 0.0
+
+    def snapshot(self):
+        with self._lock:
+            count = sum(self.counts)
+            summary = {
+                "count": count,
+                "mean_ms": self.total_ms / count if count else 0.0,
+                "max_ms": self.max_ms,
+                "buckets": {
+                    **{f"<={bound}ms": n for bound, n in zip(self.bounds_ms, self.counts)},
+                    f">{self.bounds_ms[-1]}ms": self.counts[-1],
+                },
+            }
+        summary["p50_ms"] = self.percentile(0.50)
+        summary["p95_ms"] = self.percentile(0.95)
+        summary["p99_ms"] = self.percentile(0.99)
+        return summary
+
+
+def ensure_wal(db_path):
+    """Switch the database to WAL (persistent) so pooled readers never block the writer."""
+    connection = sqlite3.connect(db_path)
+    try:
+        (mode,) = connection.execute("PRAGMA journal_mode = WAL").fetchone()
+    finally:
+        connection.close()
+    if mode.lower() != "wal":
+        raise ValueError(f"Could not switch {db_path} to WAL (journal_mode={mode})")
+
+
+class ConnectionPool:
+    """Fixed set of read-only connections handed out one per running query."""
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE):
+        self._idle = queue.LifoQueue()
+        self._connections = [connect_read_only(db_path) for _ in range(size)]
+        for connection in self._connections:
+            self._idle.put(connection)
+
+    def acquire(self):
+        return self._idle.get()
+
+    def release(self, connection):
+        connection.set_progress_handler(None, 0)
+        self._idle.put(connection)
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+
+
+class QueryService:
+    """Library API: submit SQL or helper calls and get futures back."""
+
+    def __init__(self, db_path, pool_size=DEFAULT_POOL_SIZE, max_queue=DEFAULT_MAX_QUEUE,
+                 default_timeout=DEFAULT_TIMEOUT, wal=True):
+        if wal:
+            ensure_wal(db_path)
+        self.default_timeout = default_timeout
+        self.pool = ConnectionPool(db_path, pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="query")
+        self._slots = threading.BoundedSemaphore(pool_size + max_queue)
+        self._lock = threading.Lock()
+        self.histograms = {"queue_wait": LatencyHistogram(), "execute": LatencyHistogram()}
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _histogram(self, name):
+        with self._lock:
+            return self.histograms.setdefault(name, LatencyHistogram())
+
+    def _run(self, name, func, args, kwargs, submitted, deadline):
+        started = time.perf_counter()
+        self.histograms["queue_wait"].record(started - submitted)
+        try:
+            if started >= deadline:
+                raise QueryTimeout(f"{name} timed out waiting in the queue")
+            connection = self.pool.acquire()
+            try:
+                connection.set_progress_handler(
+                    lambda: time.perf_counter() >= deadline, PROGRESS_STEPS
+                )
+                try:
+                    result = func(connection, *args, **kwargs)
+                except sqlite3.OperationalError as error:
+                    if "interrupted" in str(error) and time.perf_counter() >= deadline:
+                        raise QueryTimeout(f"{name} exceeded its deadline") from error
+                    raise
+            finally:
+                self.pool.release(connection)
+        except QueryTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.histograms["execute"].record(elapsed)
+            self._histogram(name).record(elapsed)
+            self._slots.release()
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def submit_call(self, func, *args, name=None, timeout=None, **kwargs):
+        """Run func(connection, *args, **kwargs) on a pooled connection; returns a Future.
+
+        Raises ServiceOverloaded immediately when pool_size + max_queue
+        requests are already pending.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ServiceOverloaded("Query queue is full")
+        submitted = time.perf_counter()
+        deadline = submitted + (self.default_timeout if timeout is None else timeout)
+        try:
+            return self._executor.submit(
+                self._run, name or func.__name__, func, args, kwargs, submitted, deadline
+            )
+        except Exception:
+            self._slots.release()
+            raise
+
+    def submit(self, sql, parameters=(), timeout=None, name="sql"):
+        return self.submit_call(
+            lambda connection: connection.execute(sql, parameters).fetchall(),
+            name=name,
+            timeout=timeout,
+        )
+
+    def query(self, sql, parameters=(), timeout=None):
+        return self.submit(sql, parameters, timeout).result()
+
+    def stats(self):
+        with self._lock:
+            histograms = dict(self.histograms)
+            counters = {
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+        return {
+            **counters,
+            "latency": {name: histogram.snapshot() for name, histogram in histograms.items()},
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def orders_page(connection, page_size="100", after=None, **filters):
+    rows, next_cursor = fetch_page(
+        connection, int(page_size), decode_cursor(after) if after else None, **filters
+    )
+    return {"rows": rows, "next": encode_cursor(next_cursor) if next_cursor else None}
+
+
+# name -> (function, accepted query-string parameters)
+ENDPOINTS = {
+    "daily-revenue": (daily_revenue, {"start", "end", "city"}),
+    "revenue-by-city": (revenue_by_city, {"start", "end", "limit"}),
+    "revenue-by-category": (revenue_by_category, {"start", "end"}),
+    "payment-methods": (payment_method_success_rates, {"start", "end"}),
+    "top-products": (top_products, {"start", "end", "limit"}),
+    "orders": (orders_page, {"page_size", "after", "start", "end", "city", "status"}),
+}
+
+
+def json_response(writer, status, payload):
+    body = json.dumps(payload, default=list).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii")
+        + body
+    )
+
+
+def parse_timeout(text, default):
+    """Seconds from a ?timeout= value; ValueError unless it is a positive number."""
+    if text is None:
+        return default
+    try:
+        timeout = float(text)
+    except ValueError:
+        timeout = None
+    if timeout is None or not timeout > 0:
+        raise ValueError(f"timeout must be a positive number of seconds, got {text!r}")
+    return timeout
+
+
+async def handle_request(service, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        if len(request_line) < 2 or request_line[0] != "GET":
+            json_response(writer, "405 Method Not Allowed", {"error": "only GET is supported"})
+            return
+        url = urlsplit(request_line[1])
+        parameters = dict(parse_qsl(url.query))
+        if url.path == "/stats":
+            json_response(writer, "200 OK", service.stats())
+            return
+        name = url.path[len("/query/"):]
+        if not url.path.startswith("/query/") or name not in ENDPOINTS:
+            json_response(writer, "404 Not Found", {"error": f"unknown query {url.path}"})
+            return
+        func, accepted = ENDPOINTS[name]
+        try:
+            timeout = parse_timeout(parameters.pop("timeout", None), service.default_timeout)
+            unknown = set(parameters) - accepted
+            if unknown:
+                raise ValueError(f"unknown parameters {sorted(unknown)}")
+            future = service.submit_call(func, name=name, timeout=timeout, **parameters)
+            result = await asyncio.wrap_future(future)
+        except ServiceOverloaded as error:
+            json_response(writer, "503 Service Unavailable", {"error": str(error)})
+        except QueryTimeout as error:
+            json_response(writer, "504 Gateway Timeout", {"error": str(error)})
+        except (ValueError, sqlite3.Error) as error:
+            json_response(writer, "400 Bad Request", {"error": str(error)})
+        else:
+            json_response(writer, "200 OK", result if isinstance(result, dict) else {"rows": result})
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_request(service, reader, writer), host, port
+    )
+    print(f"Serving {', '.join(sorted(ENDPOINTS))} on http://{host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None):
+    root_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=root_dir / "database" / "ecommerce.db",
+        help="SQLite file to serve (switched to WAL on start-up).",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help="Read-only connections, and threads running queries on them.",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help="Requests allowed to wait for a connection before new ones get 503.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Default per-query deadline in seconds, queue wait included.",
+    )
+    args = parser.parse_args(argv)
+    if args.pool_size < 1:
+        parser.error("--pool-size must be at least 1")
+    if args.max_queue < 0:
+        parser.error("--max-queue cannot be negative")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database.exists():
+        raise FileNotFoundError(f"Database not found: {args.database}")
+    with QueryService(args.database, args.pool_size, args.max_queue, args.timeout) as service:
+        try:
+            asyncio.run(serve(service, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
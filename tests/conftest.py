@@ -0,0 +1,57 @@
+"""Shared fixtures: the scripts are run as modules from scripts/."""
+
+import csv
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = ROOT_DIR / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+TABLES = ("customers", "products", "orders", "order_items", "payments")
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    """A private copy of the committed dataset that tests may edit."""
+    target = tmp_path / "dataset"
+    shutil.copytree(ROOT_DIR / "ecommerce_dataset", target)
+    return target
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as handle:
+        return list(csv.reader(handle))
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        csv.writer(handle).writerows(rows)
+
+
+def ingest(dataset_dir, db_path, *options):
+    import ingest_ecommerce_sqlite
+
+    ingest_ecommerce_sqlite.main(
+        ["--dataset-dir", str(dataset_dir), "--database", str(db_path), "--quiet", *options]
+    )
+
+
+def describe_database(db_path):
+    """integrity_check result, schema entries and every table's rows, for comparisons."""
+    connection = sqlite3.connect(db_path)
+    try:
+        return {
+            "integrity": connection.execute("PRAGMA integrity_check").fetchall(),
+            "schema": sorted(connection.execute("SELECT type, name, sql FROM sqlite_master")),
+            "rows": {
+                table: connection.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+                for table in TABLES
+            },
+        }
+    finally:
+        connection.close()
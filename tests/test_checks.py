@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from conftest import ingest
+from ecommerce_checks import check_context, parse_threshold, run_check, run_checks
+from generate_ecommerce_dataset import dataset_size, write_dataset_streaming
+
+
+def payments_database(successes, failures):
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE payments(order_id TEXT, payment_status TEXT)")
+    statuses = ["success"] * successes + ["failed"] * failures
+    connection.executemany(
+        "INSERT INTO payments VALUES (?, ?)",
+        ((str(number), status) for number, status in enumerate(statuses)),
+    )
+    return connection
+
+
+def success_rate_result(connection, **thresholds):
+    context = check_context("payment_success_rate", thresholds={"payment_success_rate": thresholds})
+    return run_check("payment_success_rate", connection, context)
+
+
+def test_success_rate_tolerance_widens_for_few_payments():
+    # 13 of 15 is 0.867: 0.053 from 0.92 but within four standard errors (0.28).
+    assert success_rate_result(payments_database(13, 2)).passed
+    assert not success_rate_result(payments_database(13, 2), sigmas=0).passed
+
+
+def test_success_rate_fails_far_from_expected():
+    result = success_rate_result(payments_database(700, 300))
+    assert not result.passed
+    assert "1000 payments" in result.error
+
+
+def test_committed_dataset_passes_sampled_checks(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path)
+    results = run_checks(db_path=db_path, sample_every=100)
+    assert [result.error for result in results if not result.passed] == []
+
+
+@pytest.mark.parametrize("scale_factor", [0.1, 0.01])
+def test_small_scale_factors_pass_default_checks(tmp_path, scale_factor):
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    write_dataset_streaming(dataset, dataset_size(scale_factor))
+    ingest(dataset, tmp_path / "ecommerce.db")
+    results = run_checks(db_path=tmp_path / "ecommerce.db")
+    assert [result.error for result in results if not result.passed] == []
+
+
+def test_parse_threshold():
+    assert parse_threshold("payment_success_rate.expected=0.9") == (
+        "payment_success_rate",
+        "expected",
+        0.9,
+    )
+    with pytest.raises(ValueError):
+        parse_threshold("unknown.key=1")
+    with pytest.raises(ValueError):
+        parse_threshold("order_totals.tolerence=0.1")
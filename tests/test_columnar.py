@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import describe_database, ingest
+from generate_ecommerce_dataset import dataset_size, write_dataset_streaming
+
+
+@pytest.mark.parametrize("money_mode", ["decimal", "cents"])
+def test_columnar_ingest_matches_csv_ingest(tmp_path, money_mode):
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    write_dataset_streaming(dataset, dataset_size(0.5), money=money_mode, output_format="both")
+    assert (dataset / "columnar" / "orders").is_dir()
+
+    ingest(dataset, tmp_path / "csv.db", "--money", money_mode)
+    ingest(dataset, tmp_path / "columnar.db", "--money", money_mode, "--input-format", "columnar")
+
+    from_csv = describe_database(tmp_path / "csv.db")
+    from_columnar = describe_database(tmp_path / "columnar.db")
+    assert from_columnar["integrity"] == [("ok",)]
+    assert from_columnar["schema"] == from_csv["schema"]
+    assert from_columnar["rows"] == from_csv["rows"]
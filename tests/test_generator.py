@@ -0,0 +1,124 @@
+import filecmp
+import pickle
+
+import pytest
+
+from conftest import read_csv
+from generate_ecommerce_dataset import (
+    TABLE_NAMES,
+    CustomerRefs,
+    ProductRefs,
+    dataset_size,
+    generate_products,
+    iter_customers,
+    write_dataset,
+    write_dataset_sharded,
+    write_dataset_streaming,
+)
+
+
+def output_dir(tmp_path, name):
+    path = tmp_path / name
+    path.mkdir()
+    return path
+
+
+def assert_same_files(left, right):
+    for table in TABLE_NAMES:
+        assert filecmp.cmp(left / f"{table}.csv", right / f"{table}.csv", shallow=False), table
+
+
+@pytest.mark.parametrize("id_style", ["uuid", "integer"])
+def test_streaming_matches_list_generation(tmp_path, id_style):
+    size = dataset_size(0.5)
+    write_dataset(output_dir(tmp_path, "list"), size, id_style=id_style)
+    write_dataset_streaming(output_dir(tmp_path, "stream"), size, id_style=id_style)
+    assert_same_files(tmp_path / "list", tmp_path / "stream")
+
+
+def test_streaming_is_reproducible(tmp_path):
+    size = dataset_size(0.5)
+    write_dataset_streaming(output_dir(tmp_path, "first"), size, money="cents")
+    write_dataset_streaming(output_dir(tmp_path, "second"), size, money="cents")
+    assert_same_files(tmp_path / "first", tmp_path / "second")
+
+
+def test_refs_match_written_rows():
+    size = dataset_size(0.2)
+    customers = CustomerRefs(size.customers)
+    assert [
+        (row["customer_id"], row["city"], row["state"], row["country"])
+        for row in iter_customers(size.customers)
+    ] == list(customers)
+    products = ProductRefs(size.category_plan, money="cents")
+    assert [
+        {"product_id": row["product_id"], "price": row["price"]}
+        for row in generate_products(size.category_plan, money="cents")
+    ] == list(products)
+    with pytest.raises(IndexError):
+        customers[len(customers)]
+
+
+def test_orders_reference_written_customers_and_products(tmp_path):
+    write_dataset_streaming(tmp_path, dataset_size(0.2), id_style="integer")
+    customer_ids = {row[0] for row in read_csv(tmp_path / "customers.csv")[1:]}
+    product_ids = {row[0] for row in read_csv(tmp_path / "products.csv")[1:]}
+    assert {row[1] for row in read_csv(tmp_path / "orders.csv")[1:]} <= customer_ids
+    assert {row[2] for row in read_csv(tmp_path / "order_items.csv")[1:]} <= product_ids
+
+
+def test_sharded_generation_is_reproducible(tmp_path):
+    size = dataset_size(0.5)
+    write_dataset_sharded(output_dir(tmp_path, "first"), size, workers=3)
+    write_dataset_sharded(output_dir(tmp_path, "second"), size, workers=3)
+    assert_same_files(tmp_path / "first", tmp_path / "second")
+    orders = read_csv(tmp_path / "first" / "orders.csv")[1:]
+    assert len(orders) == size.orders
+    customer_ids = {row[0] for row in read_csv(tmp_path / "first" / "customers.csv")[1:]}
+    assert {row[1] for row in orders} <= customer_ids
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_sharded_customers_are_unique_across_shards(tmp_path, workers):
+    write_dataset_sharded(tmp_path, dataset_size(2), workers=workers)
+    header, *customers = read_csv(tmp_path / "customers.csv")
+    for column in ("customer_id", "email", "phone"):
+        values = [row[header.index(column)] for row in customers]
+        assert len(set(values)) == len(values), column
+
+
+def test_refs_pickle_without_rows():
+    size = dataset_size(100)
+    for refs in (CustomerRefs(size.customers), ProductRefs(size.category_plan)):
+        assert len(pickle.dumps(refs)) < 1024
+
+
+def test_numpy_amounts_print_like_decimal_arithmetic(tmp_path):
+    pytest.importorskip("numpy")
+    from decimal import Decimal
+
+    from generate_ecommerce_dataset import write_dataset_numpy
+
+    write_dataset_numpy(output_dir(tmp_path, "numpy"), dataset_size(1))
+    prices = {
+        row[0]: Decimal(row[4]) for row in read_csv(tmp_path / "numpy" / "products.csv")[1:]
+    }
+    totals = {}
+    for _, order_id, product_id, quantity, item_price, subtotal in read_csv(
+        tmp_path / "numpy" / "order_items.csv"
+    )[1:]:
+        price = Decimal(item_price)
+        assert price == prices[product_id]
+        assert subtotal == format(price * int(quantity), "f")
+        totals[order_id] = totals.get(order_id, 0) + price * int(quantity)
+    for row in read_csv(tmp_path / "numpy" / "orders.csv")[1:]:
+        assert row[3] == format(totals[row[0]], "f")
+
+
+def test_numpy_backend_rejects_more_orders_than_it_can_draw():
+    pytest.importorskip("numpy")
+    from generate_ecommerce_numpy import MAX_ORDERS, require_order_capacity
+
+    require_order_capacity(MAX_ORDERS)
+    with pytest.raises(ValueError, match="--backend python"):
+        require_order_capacity(MAX_ORDERS + 1)
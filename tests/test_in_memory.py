@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import describe_database, ingest
+
+
+@pytest.mark.parametrize("backup_pages", ["16", "0"])
+def test_in_memory_backup_matches_disk_load(dataset_dir, tmp_path, backup_pages):
+    ingest(dataset_dir, tmp_path / "disk.db")
+    ingest(dataset_dir, tmp_path / "memory.db", "--in-memory", "--backup-pages", backup_pages)
+
+    disk = describe_database(tmp_path / "disk.db")
+    memory = describe_database(tmp_path / "memory.db")
+    assert memory["integrity"] == [("ok",)]
+    assert memory["schema"] == disk["schema"]
+    assert {table: len(rows) for table, rows in memory["rows"].items()} == {
+        table: len(rows) for table, rows in disk["rows"].items()
+    }
+    assert memory["rows"] == disk["rows"]
+    assert sorted(path.name for path in tmp_path.glob("memory.db*")) == ["memory.db"]
+
+
+def test_in_memory_over_budget_loads_on_disk(dataset_dir, tmp_path, capsys):
+    ingest(dataset_dir, tmp_path / "ecommerce.db", "--in-memory", "--memory-budget-mb", "1")
+    assert "loading directly on disk" in capsys.readouterr().out
+    assert describe_database(tmp_path / "ecommerce.db")["integrity"] == [("ok",)]
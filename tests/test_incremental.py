@@ -0,0 +1,163 @@
+import sqlite3
+
+import pytest
+
+from conftest import ingest, read_csv, write_csv
+from ingest_ecommerce_sqlite import WATERMARK_COLUMNS, ingest_all_tables_incremental
+
+
+def fetch_watermarks(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return dict(connection.execute("SELECT table_name, high_water_mark FROM ingest_watermarks"))
+    finally:
+        connection.close()
+
+
+def newest_timestamps(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return {
+            table_name: connection.execute(f"SELECT MAX({column}) FROM {table_name}").fetchone()[0]
+            for table_name, column in WATERMARK_COLUMNS.items()
+        }
+    finally:
+        connection.close()
+
+
+def append_order(dataset_dir, order_date):
+    """Copy the first order with its items and payment under new ids and order_date."""
+    order_id = "00000000-0000-4000-8000-000000000001"
+    header, *orders = read_csv(dataset_dir / "orders.csv")
+    source = list(orders[0])
+    source_id = source[0]
+    source[0], source[header.index("order_date")] = order_id, order_date
+    write_csv(dataset_dir / "orders.csv", [header, *orders, source])
+
+    header, *items = read_csv(dataset_dir / "order_items.csv")
+    order_index = header.index("order_id")
+    copies = []
+    for number, item in enumerate(row for row in items if row[order_index] == source_id):
+        copy = list(item)
+        copy[0], copy[order_index] = f"00000000-0000-4000-9000-{number:012d}", order_id
+        copies.append(copy)
+    write_csv(dataset_dir / "order_items.csv", [header, *items, *copies])
+
+    header, *payments = read_csv(dataset_dir / "payments.csv")
+    order_index = header.index("order_id")
+    payment = list(next(row for row in payments if row[order_index] == source_id))
+    payment[0], payment[order_index] = "00000000-0000-4000-a000-000000000001", order_id
+    payment[header.index("transaction_timestamp")] = order_date
+    write_csv(dataset_dir / "payments.csv", [header, *payments, payment])
+    return order_id
+
+
+def test_full_load_seeds_watermarks(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path)
+    assert fetch_watermarks(db_path) == newest_timestamps(db_path)
+
+
+def test_full_reload_replaces_stale_watermarks(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path)
+    connection = sqlite3.connect(db_path)
+    connection.execute("UPDATE ingest_watermarks SET high_water_mark = '9999-12-31 00:00:00'")
+    connection.commit()
+    connection.close()
+
+    ingest(dataset_dir, db_path, "--bulk")
+    assert fetch_watermarks(db_path) == newest_timestamps(db_path)
+
+
+def test_incremental_load_adds_new_order(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path)
+    order_id = append_order(dataset_dir, "2099-01-01 12:00:00")
+    ingest(dataset_dir, db_path, "--incremental")
+
+    connection = sqlite3.connect(db_path)
+    try:
+        assert connection.execute(
+            "SELECT COUNT(*) FROM payments WHERE order_id = ?", (order_id,)
+        ).fetchone() == (1,)
+        affected = connection.execute("SELECT order_id FROM ingest_affected_orders").fetchall()
+        assert (order_id,) in affected
+    finally:
+        connection.close()
+    assert fetch_watermarks(db_path)["orders"] == "2099-01-01 12:00:00"
+
+
+@pytest.mark.parametrize("money_mode", ["decimal", "cents"])
+def test_unchanged_rerun_writes_nothing(dataset_dir, tmp_path, money_mode):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--money", money_mode)
+    connection = sqlite3.connect(db_path)
+    try:
+        written, affected = ingest_all_tables_incremental(connection, dataset_dir, money_mode)
+        connection.rollback()
+    finally:
+        connection.close()
+    assert written == dict.fromkeys(written, 0)
+    assert affected == 0
+
+
+def test_new_row_at_the_watermark_is_added(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path)
+    order_id = append_order(dataset_dir, fetch_watermarks(db_path)["orders"])
+    connection = sqlite3.connect(db_path)
+    try:
+        written, affected = ingest_all_tables_incremental(connection, dataset_dir)
+        connection.commit()
+        assert connection.execute(
+            "SELECT COUNT(*) FROM orders WHERE order_id = ?", (order_id,)
+        ).fetchone() == (1,)
+    finally:
+        connection.close()
+    assert written["orders"] == written["payments"] == 1
+    assert affected == 1
+
+
+def test_incremental_load_applies_change_below_watermark(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path)
+
+    orders_path = dataset_dir / "orders.csv"
+    header, *orders = read_csv(orders_path)
+    date_index, status_index = header.index("order_date"), header.index("status")
+    oldest = min(orders, key=lambda row: row[date_index])
+    status = "cancelled" if oldest[status_index] != "cancelled" else "delivered"
+    oldest[status_index] = status
+    write_csv(orders_path, [header, *orders])
+    ingest(dataset_dir, db_path, "--incremental")
+
+    connection = sqlite3.connect(db_path)
+    try:
+        assert connection.execute(
+            "SELECT status FROM orders WHERE order_id = ?", (oldest[0],)
+        ).fetchone() == (status,)
+        affected = connection.execute("SELECT order_id FROM ingest_affected_orders").fetchall()
+        assert (oldest[0],) in affected
+    finally:
+        connection.close()
+
+
+def test_direct_build_seeds_watermarks(tmp_path):
+    import build_ecommerce_sqlite
+
+    db_path = tmp_path / "ecommerce.db"
+    csv_dir = tmp_path / "dataset"
+    build_ecommerce_sqlite.main(
+        ["--database", str(db_path), "--scale-factor", "0.2", "--csv-dir", str(csv_dir), "--quiet"]
+    )
+    assert fetch_watermarks(db_path) == newest_timestamps(db_path)
+
+    connection = sqlite3.connect(db_path)
+    try:
+        written, affected = ingest_all_tables_incremental(connection, csv_dir)
+        connection.rollback()
+    finally:
+        connection.close()
+    assert written == dict.fromkeys(written, 0)
+    assert affected == 0
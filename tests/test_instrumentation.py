@@ -0,0 +1,24 @@
+import pytest
+
+from ecommerce_instrumentation import Instrumentation, peak_rss_mb
+
+
+def test_stage_reports_process_peak_and_its_own_growth():
+    if peak_rss_mb() is None:
+        pytest.skip("resource module unavailable")
+    instrumentation = Instrumentation("test")
+    instrumentation.start()
+    with instrumentation.stage("allocate"):
+        block = bytearray(64 * 1024 * 1024)
+        block[::4096] = b"x" * len(block[::4096])
+    del block
+    with instrumentation.stage("idle"):
+        pass
+    instrumentation.stop()
+    stages = {stage["name"]: stage for stage in instrumentation.report()["stages"]}
+
+    assert stages["allocate"]["rss_growth_mb"] >= 48
+    assert stages["idle"]["rss_growth_mb"] == 0
+    # The high-water mark is process-wide, so it carries over to later stages.
+    assert stages["idle"]["process_peak_rss_mb"] >= stages["allocate"]["process_peak_rss_mb"]
+    assert "peak_rss_mb" not in stages["idle"]
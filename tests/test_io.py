@@ -0,0 +1,52 @@
+import csv
+
+import pytest
+
+from conftest import describe_database, ingest
+from ecommerce_io import (
+    COMPRESSIONS,
+    csv_compression,
+    csv_name,
+    find_csv,
+    open_csv,
+    remove_stale_variants,
+)
+from generate_ecommerce_dataset import dataset_size, write_dataset_streaming
+
+ROWS = [["order_id", "city"], ["1", "Pune"], ["2", "Zürich, \"Altstadt\""]]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_csv_round_trip(tmp_path, compression):
+    path = tmp_path / csv_name("orders", compression)
+    with open_csv(path, "w") as handle:
+        csv.writer(handle).writerows(ROWS)
+    assert csv_compression(path) == compression
+    with open_csv(path) as handle:
+        assert list(csv.reader(handle)) == ROWS
+    with open_csv(path, "rb") as handle:
+        assert handle.read().decode("utf-8").splitlines()[0] == "order_id,city"
+
+
+def test_remove_stale_variants_keeps_only_the_new_compression(tmp_path):
+    for compression in COMPRESSIONS:
+        (tmp_path / csv_name("orders", compression)).write_bytes(b"")
+    (tmp_path / "payments.csv").write_bytes(b"")
+    with pytest.raises(ValueError, match="Several CSVs"):
+        find_csv(tmp_path, "orders")
+
+    remove_stale_variants(tmp_path, "orders", "xz")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["orders.csv.xz", "payments.csv"]
+    assert find_csv(tmp_path, "orders") == tmp_path / "orders.csv.xz"
+    with pytest.raises(FileNotFoundError):
+        find_csv(tmp_path, "customers")
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_compressed_dataset_ingests_like_plain(tmp_path, compression):
+    size = dataset_size(0.2)
+    for name, codec in (("plain", "none"), ("packed", compression)):
+        (tmp_path / name).mkdir()
+        write_dataset_streaming(tmp_path / name, size, compression=codec)
+        ingest(tmp_path / name, tmp_path / f"{name}.db")
+    assert describe_database(tmp_path / "packed.db") == describe_database(tmp_path / "plain.db")
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+
+from conftest import ingest, read_csv, write_csv
+from ecommerce_manifest import read_manifest
+
+
+def manifest(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return read_manifest(connection)
+    finally:
+        connection.close()
+
+
+def test_unchanged_rerun_is_a_no_op(dataset_dir, tmp_path, capsys):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--skip-unchanged")
+    recorded = manifest(db_path)
+    assert set(recorded) == {"customers", "products", "orders", "order_items", "payments"}
+    modified = db_path.stat().st_mtime_ns
+    capsys.readouterr()
+
+    ingest(dataset_dir, db_path, "--skip-unchanged")
+    assert "skipping ingest" in capsys.readouterr().out
+    assert manifest(db_path) == recorded
+    assert db_path.stat().st_mtime_ns == modified
+
+
+def test_touched_file_with_same_content_is_skipped(dataset_dir, tmp_path, capsys):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--skip-unchanged")
+    orders_path = dataset_dir / "orders.csv"
+    mtime_ns = orders_path.stat().st_mtime_ns + 5_000_000_000
+    os.utime(orders_path, ns=(mtime_ns, mtime_ns))
+    capsys.readouterr()
+
+    ingest(dataset_dir, db_path, "--skip-unchanged")
+    assert "skipping ingest" in capsys.readouterr().out
+    # The new mtime is recorded, so the next run skips without hashing.
+    assert manifest(db_path)["orders"]["mtime_ns"] == mtime_ns
+
+
+def test_edited_products_reload_products_and_order_items(dataset_dir, tmp_path, capsys):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--skip-unchanged")
+    before = manifest(db_path)
+
+    products_path = dataset_dir / "products.csv"
+    header, *products = read_csv(products_path)
+    products[0][header.index("name")] = "Renamed product"
+    write_csv(products_path, [header, *products])
+    connection = sqlite3.connect(db_path)
+    connection.execute("UPDATE orders SET status = 'kept' WHERE rowid = 1")
+    connection.commit()
+    connection.close()
+    capsys.readouterr()
+
+    ingest(dataset_dir, db_path, "--skip-unchanged")
+    assert (
+        "Reloading changed tables and their dependents: products, order_items"
+        in capsys.readouterr().out
+    )
+    assert manifest(db_path)["products"]["sha256"] != before["products"]["sha256"]
+
+    connection = sqlite3.connect(db_path)
+    try:
+        assert connection.execute(
+            "SELECT name FROM products WHERE product_id = ?", (products[0][0],)
+        ).fetchone() == ("Renamed product",)
+        (items,) = connection.execute("SELECT COUNT(*) FROM order_items").fetchone()
+        assert items == len(read_csv(dataset_dir / "order_items.csv")) - 1
+        assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+        # Kept tables are not rewritten, so an edit made in the database survives.
+        assert connection.execute(
+            "SELECT COUNT(*) FROM orders WHERE status = 'kept'"
+        ).fetchone() == (1,)
+    finally:
+        connection.close()
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import ingest
+from ecommerce_db import connect_read_only
+from query_ecommerce_sqlite import decode_cursor, encode_cursor, fetch_page, stream_rows
+
+
+def all_pages(connection, page_size, **filters):
+    pages = []
+    after = None
+    while True:
+        rows, after = fetch_page(connection, page_size, after, **filters)
+        pages.append(rows)
+        if after is None:
+            return pages
+        after = decode_cursor(encode_cursor(after))
+
+
+@pytest.fixture(params=["text", "compact"])
+def connection(request, dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--schema", request.param)
+    read_only = connect_read_only(db_path)
+    yield read_only
+    read_only.close()
+
+
+def test_pages_concatenate_to_the_stream(connection):
+    expected = list(stream_rows(connection, batch_size=500))
+    pages = all_pages(connection, 1000)
+    assert all(len(page) == 1000 for page in pages[:-1])
+    assert [row for page in pages for row in page] == expected
+
+
+def test_filtered_pages_match_filtered_stream(connection):
+    filters = {"start": "2024-01-01", "end": "2024-06-30", "status": "delivered"}
+    expected = list(stream_rows(connection, **filters))
+    assert expected
+    pages = all_pages(connection, 97, **filters)
+    assert [row for page in pages for row in page] == expected
+
+
+def test_exact_multiple_ends_with_an_empty_page(connection):
+    total = len(list(stream_rows(connection)))
+    pages = all_pages(connection, total)
+    assert [len(page) for page in pages] == [total, 0]
+
+
+def test_decode_cursor_rejects_malformed_text():
+    with pytest.raises(ValueError):
+        decode_cursor("2024-01-01 00:00:00")
@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from ecommerce_query_cache import CachedConnection, bump_load_generation, normalize_sql
+
+QUERY = "SELECT status, COUNT(*) FROM orders GROUP BY status ORDER BY status"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "cache.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE orders(order_id INTEGER PRIMARY KEY, status TEXT)")
+    connection.executemany(
+        "INSERT INTO orders(status) VALUES (?)", [("delivered",), ("delivered",), ("cancelled",)]
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture
+def cached(db_path):
+    connection = sqlite3.connect(db_path)
+    yield CachedConnection(connection)
+    connection.close()
+
+
+def test_repeated_query_is_a_hit(cached):
+    first = cached.execute(QUERY).fetchall()
+    # Whitespace and comments do not change the cache key.
+    second = cached.execute(
+        "SELECT status, COUNT(*)  -- per status\nFROM orders\n  GROUP BY status ORDER BY status;"
+    ).fetchall()
+    assert first == second == [("cancelled", 1), ("delivered", 2)]
+    assert cached.cache.stats()["hits"] == 1
+    assert cached.cache.stats()["misses"] == 1
+
+
+def test_write_from_another_connection_invalidates(cached, db_path):
+    cached.execute(QUERY).fetchall()
+    writer = sqlite3.connect(db_path)
+    writer.execute("INSERT INTO orders(status) VALUES ('cancelled')")
+    writer.commit()
+    writer.close()
+
+    assert cached.execute(QUERY).fetchall() == [("cancelled", 2), ("delivered", 2)]
+    stats = cached.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (0, 2, 1)
+
+
+def test_own_write_invalidates(cached):
+    cached.execute(QUERY).fetchall()
+    cached.execute("UPDATE orders SET status = 'returned' WHERE status = 'cancelled'")
+    assert cached.execute(QUERY).fetchall() == [("delivered", 2), ("returned", 1)]
+    assert cached.cache.stats()["invalidations"] == 1
+
+
+def test_load_generation_bump_invalidates(cached):
+    cached.execute(QUERY).fetchall()
+    # A PRAGMA changes neither data_version (same connection) nor total_changes.
+    bump_load_generation(cached.connection)
+    cached.execute(QUERY).fetchall()
+    stats = cached.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (0, 2, 1)
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT  'a  b' -- note\n /* more */ FROM t ;") == "SELECT 'a  b' FROM t"
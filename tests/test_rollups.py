@@ -0,0 +1,33 @@
+import sqlite3
+
+from conftest import ingest, read_csv, write_csv
+from ecommerce_rollups import ROLLUP_TABLES
+
+
+def rollup_rows(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return {
+            table_name: sorted(connection.execute(f"SELECT * FROM {table_name}"))
+            for table_name in ROLLUP_TABLES
+        }
+    finally:
+        connection.close()
+
+
+def test_incremental_update_refreshes_rollups(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--rollups")
+
+    # The newest order is at the watermark, so the upsert updates it in place.
+    orders_path = dataset_dir / "orders.csv"
+    header, *orders = read_csv(orders_path)
+    date_index, status_index = header.index("order_date"), header.index("status")
+    newest = max(orders, key=lambda row: row[date_index])
+    newest[status_index] = "cancelled" if newest[status_index] != "cancelled" else "delivered"
+    write_csv(orders_path, [header, *orders])
+    ingest(dataset_dir, db_path, "--incremental")
+
+    reference_path = tmp_path / "reference.db"
+    ingest(dataset_dir, reference_path, "--rollups")
+    assert rollup_rows(db_path) == rollup_rows(reference_path)
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import ingest
+from serve_ecommerce_sqlite import QueryService, handle_request
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def service(dataset_dir, tmp_path):
+    db_path = tmp_path / "ecommerce.db"
+    ingest(dataset_dir, db_path, "--rollups")
+    with QueryService(db_path, pool_size=2) as query_service:
+        yield query_service
+
+
+def get(service, target):
+    writer = RecordingWriter()
+
+    async def request():
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"GET {target} HTTP/1.1\r\nHost: test\r\n\r\n".encode("ascii"))
+        reader.feed_eof()
+        await handle_request(service, reader, writer)
+
+    asyncio.run(request())
+    assert writer.closed
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0].decode("ascii"), json.loads(body)
+
+
+def test_query_returns_rows(service):
+    status, payload = get(service, "/query/payment-methods?timeout=2")
+    assert status == "HTTP/1.1 200 OK"
+    assert payload["rows"]
+
+
+@pytest.mark.parametrize("timeout", ["abc", "0", "-1", "nan"])
+def test_bad_timeout_is_a_bad_request(service, timeout):
+    status, payload = get(service, f"/query/payment-methods?timeout={timeout}")
+    assert status == "HTTP/1.1 400 Bad Request"
+    assert "timeout" in payload["error"]
+
+
+def test_unknown_parameter_is_a_bad_request(service):
+    status, payload = get(service, "/query/payment-methods?city=Paris")
+    assert status == "HTTP/1.1 400 Bad Request"
+    assert "city" in payload["error"]